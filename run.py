@@ -1,7 +1,136 @@
 """
 BRRR Bot - Run this file to start the bot
+
+    python run.py                                  # single process
+    python run.py --processes 4                    # 4 worker processes, shard count from Discord
+    python run.py --processes 4 --shard-count 16   # 4 workers running 4 shards each
 """
-from src.bot import main
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from typing import List
+
+logger = logging.getLogger('brrr.launcher')
+
+# Seconds to wait before restarting a worker that exited unexpectedly
+RESTART_DELAY = 5.0
+
+
+def fetch_recommended_shards(token: str) -> int:
+    """Ask Discord how many shards it recommends for this bot"""
+    import asyncio
+    import aiohttp
+
+    async def fetch():
+        async with aiohttp.ClientSession() as session:
+            async with session.get(
+                "https://discord.com/api/v10/gateway/bot",
+                headers={"Authorization": f"Bot {token}"}
+            ) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"Gateway lookup failed {response.status}: {await response.text()}")
+                data = await response.json()
+                return data["shards"]
+
+    return asyncio.run(fetch())
+
+
+def assign_shards(shard_count: int, processes: int) -> List[List[int]]:
+    """Split shard ids into contiguous ranges, one per process"""
+    processes = min(processes, shard_count)
+    base, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+    for i in range(processes):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def run_worker(shard_ids: List[int], shard_count: int):
+    """Entry point for a worker process - configures sharding before the bot module is imported"""
+    os.environ['SHARDED'] = '1'
+    os.environ['SHARD_COUNT'] = str(shard_count)
+    os.environ['SHARD_IDS'] = ",".join(str(s) for s in shard_ids)
+
+    from src.bot import main
+    main()
+
+
+def launch(processes: int, shard_count: int):
+    """Run one worker per shard range and restart any that crash"""
+    ranges = assign_shards(shard_count, processes)
+    ctx = multiprocessing.get_context('spawn')
+    workers = {}
+    stopping = False
+
+    def start(index: int):
+        proc = ctx.Process(
+            target=run_worker,
+            args=(ranges[index], shard_count),
+            name=f"brrr-shards-{ranges[index][0]}-{ranges[index][-1]}"
+        )
+        proc.start()
+        workers[index] = proc
+        logger.info(f"Started {proc.name} (pid {proc.pid}) for shards {ranges[index]} of {shard_count}")
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    for index in range(len(ranges)):
+        start(index)
+
+    while not stopping:
+        time.sleep(1)
+        for index, proc in list(workers.items()):
+            if not proc.is_alive() and not stopping:
+                logger.warning(f"{proc.name} exited with code {proc.exitcode} - restarting in {RESTART_DELAY:.0f}s")
+                time.sleep(RESTART_DELAY)
+                start(index)
+
+    logger.info("Shutting down workers")
+    for proc in workers.values():
+        proc.terminate()
+    for proc in workers.values():
+        proc.join(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run BRRR Bot")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="Number of worker processes (each runs a range of shards)")
+    parser.add_argument('--shard-count', type=int, default=None,
+                        help="Total shard count (default: Discord's recommendation)")
+    args = parser.parse_args()
+
+    if args.processes <= 1 and args.shard_count is None:
+        from src.bot import main as run_bot
+        run_bot()
+        return
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    token = os.getenv('DISCORD_TOKEN')
+    if not token:
+        raise ValueError("DISCORD_TOKEN not found in environment variables!")
+
+    shard_count = args.shard_count or fetch_recommended_shards(token)
+    launch(max(1, args.processes), shard_count)
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,132 @@
+"""
+BRRR Bot - Chat history compression benchmark
+
+Builds the same synthetic conversation history with and without compression and reports
+the database size, SQLite page-cache hit rate and latency of the recent-history read the
+chat command makes. Run from the repository root:
+
+    python -m scripts.bench_compression
+    python -m scripts.bench_compression --messages 200000 --cache-mb 8
+"""
+
+import argparse
+import asyncio
+import ctypes
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import Optional, Tuple
+
+from src.database import Database, pack_text, unpack_text
+
+WORDS = (
+    "project task week plan ship build test deploy parser docs release bot discord python "
+    "feature bug fix review refactor idea sprint goal deadline design api database cache "
+    "the a to and of for with on this that it we you should could will next then"
+).split()
+
+# sqlite3_db_status() counters - not exposed by the sqlite3 module
+SQLITE_DBSTATUS_CACHE_HIT = 7
+SQLITE_DBSTATUS_CACHE_MISS = 8
+
+
+def _libsqlite() -> Optional[ctypes.CDLL]:
+    """The SQLite library the sqlite3 module is using, if it's a shared one we can find"""
+    try:
+        with open('/proc/self/maps') as maps:
+            for line in maps:
+                if 'libsqlite3' in line:
+                    return ctypes.CDLL(line.split()[-1])
+    except OSError:
+        pass
+    return None
+
+
+def cache_counters(lib: Optional[ctypes.CDLL], conn: sqlite3.Connection) -> Optional[Tuple[int, int]]:
+    """(hits, misses) of the connection's page cache, or None where they can't be read"""
+    if lib is None:
+        return None
+    # The sqlite3* handle is the first field after the object header
+    handle = ctypes.c_void_p.from_address(id(conn) + object.__basicsize__)
+    counts = []
+    for op in (SQLITE_DBSTATUS_CACHE_HIT, SQLITE_DBSTATUS_CACHE_MISS):
+        current, high = ctypes.c_int(), ctypes.c_int()
+        if lib.sqlite3_db_status(handle, op, ctypes.byref(current), ctypes.byref(high), 0) != 0:
+            return None
+        counts.append(current.value)
+    return counts[0], counts[1]
+
+
+def make_history(count: int, users: int, seed: int = 1):
+    """(user_id, channel_id, role, content) rows - short questions, longer replies"""
+    rng = random.Random(seed)
+    for n in range(count):
+        role = 'user' if n % 2 == 0 else 'assistant'
+        length = rng.randint(5, 40) if role == 'user' else rng.randint(60, 400)
+        yield rng.randrange(users), rng.randrange(4), role, " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def build(path: str, threshold: Optional[int], args) -> int:
+    """Create the database and fill it - returns its size in bytes"""
+    asyncio.run(Database(path, compress_threshold=threshold).init())
+    with sqlite3.connect(path) as conn:
+        now = int(time.time())
+        conn.executemany("""
+            INSERT INTO conversation_history (user_id, guild_id, channel_id, role, content, created_at, created_ts)
+            VALUES (?, 1, ?, ?, ?, datetime(?, 'unixepoch'), ?)
+        """, (
+            (user_id, channel_id, role, pack_text(content, threshold), now - args.messages + n, now - args.messages + n)
+            for n, (user_id, channel_id, role, content) in enumerate(make_history(args.messages, args.users))
+        ))
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(path)
+
+
+def read_back(path: str, args, lib: Optional[ctypes.CDLL]):
+    """Time the recent-history read for random conversations, with a fixed page cache"""
+    rng = random.Random(2)
+    timings = []
+    with sqlite3.connect(path) as conn:
+        conn.execute(f"PRAGMA cache_size = -{args.cache_mb * 1024}")
+        for _ in range(args.reads):
+            started = time.perf_counter()
+            rows = conn.execute("""
+                SELECT role, content FROM conversation_history
+                WHERE user_id = ? AND guild_id = 1 AND channel_id = ?
+                ORDER BY created_ts DESC, id DESC LIMIT 20
+            """, (rng.randrange(args.users), rng.randrange(4))).fetchall()
+            [unpack_text(content) for _, content in rows]
+            timings.append((time.perf_counter() - started) * 1000)
+        counters = cache_counters(lib, conn)
+    return timings, counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compressed chat history storage")
+    parser.add_argument('--messages', type=int, default=50000, help="History rows to write")
+    parser.add_argument('--users', type=int, default=500, help="Distinct users the rows belong to")
+    parser.add_argument('--reads', type=int, default=5000, help="Recent-history reads to time")
+    parser.add_argument('--cache-mb', type=int, default=2, help="SQLite page cache size for the reads")
+    parser.add_argument('--threshold', type=int, default=512, help="Compression threshold in bytes")
+    args = parser.parse_args()
+
+    lib = _libsqlite()
+    print(f"{args.messages} messages, {args.reads} reads, {args.cache_mb} MB page cache")
+    print(f"{'':<12}{'size':>10}{'cache hit':>11}{'read p50':>10}{'read p95':>10}")
+    for label, threshold in (('plain', None), ('compressed', args.threshold)):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            size = build(path, threshold, args)
+            timings, counters = read_back(path, args, lib)
+        hit_rate = f"{counters[0] / max(1, sum(counters)) * 100:.1f}%" if counters else "n/a"
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        print(f"{label:<12}{size / 1024 / 1024:>8.1f}MB{hit_rate:>11}"
+              f"{statistics.median(timings):>8.3f}ms{p95:>8.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
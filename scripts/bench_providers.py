@@ -0,0 +1,101 @@
+"""
+BRRR Bot - Local vs hosted model benchmark
+
+Sends the same chat and memory-extraction calls to each model and reports latency,
+completion throughput and how often extraction came back as valid structured output.
+Providers are configured from the same environment variables as the bot
+(REQUESTY_API_KEY, LLM_LOCAL_BASE_URL, LLM_LOCAL_API_KEY, LLM_LOCAL_JSON_SCHEMA).
+Run from the repository root:
+
+    python -m scripts.bench_providers --models local:qwen2.5-7b-instruct,openai/gpt-4o-mini
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import List
+
+from dotenv import load_dotenv
+
+from src.llm import ChatTurn, LLMClient
+from src.metrics import metrics
+from src.model_router import Route
+from src.providers import REQUESTY_BASE_URL, Provider, Providers
+
+QUESTIONS = [
+    "I want to build a CLI todo app in Rust this week - what should I do first?",
+    "How do I split a Discord bot into cogs?",
+    "Give me three small project ideas for learning Go.",
+    "What's a good way to test async Python code?",
+]
+
+TURNS = [
+    ChatTurn(1, 1, "Alice", "I mostly write Python and I'm on UTC+2", "Nice, I'll keep that in mind!", {}),
+    ChatTurn(2, 1, "Bob", "my editor is helix, and I'm learning rust", "Helix is great for Rust.", {'language': 'go'}),
+    ChatTurn(3, 1, "Cara", "lol ok", "😄", {}),
+]
+
+
+def providers_from_env() -> Providers:
+    configured = []
+    if os.getenv('REQUESTY_API_KEY'):
+        configured.append(Provider('requesty', REQUESTY_BASE_URL, os.getenv('REQUESTY_API_KEY')))
+    if os.getenv('LLM_LOCAL_BASE_URL'):
+        configured.append(Provider(
+            'local', os.getenv('LLM_LOCAL_BASE_URL'), os.getenv('LLM_LOCAL_API_KEY') or None,
+            json_schema=os.getenv('LLM_LOCAL_JSON_SCHEMA', '0') == '1'
+        ))
+    if not configured:
+        raise SystemExit("Set REQUESTY_API_KEY and/or LLM_LOCAL_BASE_URL")
+    return Providers(configured, default=configured[0].name)
+
+
+def p95(values: List[float]) -> float:
+    return statistics.quantiles(values, n=20)[-1] if len(values) > 1 else values[0]
+
+
+async def bench(llm: LLMClient, model: str, calls: int):
+    chat_ms, completion_tokens = [], 0
+    for n in range(calls):
+        started = time.perf_counter()
+        response = await llm.chat([{"role": "user", "content": QUESTIONS[n % len(QUESTIONS)]}], max_tokens=300,
+                                  model=model)
+        chat_ms.append((time.perf_counter() - started) * 1000)
+        completion_tokens += response.usage.get('completion_tokens') or 0
+
+    llm.router.routes['memory'] = Route(model)
+    parsed_before = metrics.counters.get('llm.memory.parsed', 0)
+    extract_ms = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        await llm.extract_memories(TURNS)
+        extract_ms.append((time.perf_counter() - started) * 1000)
+    parsed = metrics.counters.get('llm.memory.parsed', 0) - parsed_before
+
+    print(f"{model:<40}{statistics.median(chat_ms):>9.0f}ms{p95(chat_ms):>9.0f}ms"
+          f"{completion_tokens / (sum(chat_ms) / 1000):>10.1f}"
+          f"{statistics.median(extract_ms):>9.0f}ms{parsed / calls * 100:>10.0f}%")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare chat and extraction calls across models")
+    parser.add_argument('--models', required=True, help="Comma-separated models, e.g. local:qwen2.5-7b-instruct,openai/gpt-4o-mini")
+    parser.add_argument('--calls', type=int, default=10, help="Calls of each kind per model")
+    args = parser.parse_args()
+
+    load_dotenv()
+    models = [model.strip() for model in args.models.split(',') if model.strip()]
+    llm = LLMClient(providers_from_env(), models[0])
+    await llm.ensure_session()
+    print(f"{'model':<40}{'chat p50':>11}{'chat p95':>11}{'tok/s':>10}{'extract':>11}{'valid':>11}")
+    try:
+        for model in models:
+            await bench(llm, model, args.calls)
+    finally:
+        await llm.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -3,12 +3,22 @@ BRRR Bot - Main Entry Point
 A Discord bot that goes brrrrrrrr for weekly coding projects
 """
 
+import time
+
+# Captured before the heavy imports so the startup timeline covers them
+BOOT_STARTED = time.perf_counter()
+
 import os
+import hashlib
+import json
 import discord
-from discord.ext import commands
+from discord import app_commands
+from discord.ext import commands, tasks
 from dotenv import load_dotenv
 import asyncio
 import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 
 # Set up logging
 logging.basicConfig(
@@ -22,17 +32,118 @@ load_dotenv()
 
 TOKEN = os.getenv('DISCORD_TOKEN')
 REQUESTY_API_KEY = os.getenv('REQUESTY_API_KEY')
+# A local OpenAI-compatible server (e.g. llama.cpp at http://localhost:8080/v1). Its models
+# are addressed as 'local:<model>' anywhere a model is configured, or without the prefix
+# when it is the default provider. Local servers often can't enforce a JSON schema -
+# LLM_LOCAL_JSON_SCHEMA=0 falls back to JSON mode with the schema in the prompt.
+LLM_LOCAL_BASE_URL = os.getenv('LLM_LOCAL_BASE_URL', '')
+LLM_LOCAL_API_KEY = os.getenv('LLM_LOCAL_API_KEY', '')
+LLM_LOCAL_JSON_SCHEMA = os.getenv('LLM_LOCAL_JSON_SCHEMA', '0') == '1'
+# Provider for model names without a prefix - requesty, or local to run fully offline
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'requesty' if REQUESTY_API_KEY or not LLM_LOCAL_BASE_URL else 'local')
 LLM_MODEL = os.getenv('LLM_MODEL', 'openai/gpt-4o-mini')
 DATABASE_PATH = os.getenv('DATABASE_PATH', 'data/brrr.db')
+# postgres://... stores everything in PostgreSQL instead (needs asyncpg); the SQLite-only
+# options below (cold tier, compression, per-guild files) are then ignored
+DATABASE_URL = os.getenv('DATABASE_URL', '')
+DATABASE_POOL_SIZE = int(os.getenv('DATABASE_POOL_SIZE', '10'))
+# Cold tier for archived projects and old chat history (set to empty to disable)
+COLD_DATABASE_PATH = os.getenv('COLD_DATABASE_PATH', os.path.splitext(DATABASE_PATH)[0] + '_cold.db')
+# Days after archiving / after being said before rows move to the cold tier
+ARCHIVE_COLD_AFTER_DAYS = int(os.getenv('ARCHIVE_COLD_AFTER_DAYS', '30'))
+HISTORY_COLD_AFTER_DAYS = int(os.getenv('HISTORY_COLD_AFTER_DAYS', '30'))
+# Chat history and project descriptions at least this many bytes are stored compressed (0 disables)
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '512'))
+# Give each guild its own SQLite file in this directory (empty keeps one shared file),
+# with at most GUILD_DB_MAX_OPEN of them open at once
+GUILD_DB_DIR = os.getenv('GUILD_DB_DIR', '')
+GUILD_DB_MAX_OPEN = int(os.getenv('GUILD_DB_MAX_OPEN', '64'))
+# Where /admin backup and /admin export write their files
+BACKUP_DIR = os.getenv('BACKUP_DIR', 'data/backups')
+# Sync commands to a single guild during development (instant, no global rate limit)
+DEV_GUILD_ID = os.getenv('DEV_GUILD_ID')
+# Set to 1 to sync even when the command tree hash is unchanged
+FORCE_COMMAND_SYNC = os.getenv('FORCE_COMMAND_SYNC', '0') == '1'
+# Sharding - SHARDED=1 lets discord.py pick the shard count, SHARD_COUNT/SHARD_IDS pin it
+# (run.py --processes sets these for each worker process)
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+SHARD_IDS = [int(s) for s in os.getenv('SHARD_IDS').split(',')] if os.getenv('SHARD_IDS') else None
+SHARDED = os.getenv('SHARDED', '0') == '1' or SHARD_COUNT is not None
+# Memory extraction runs in the background on finished turns - optionally on a cheaper
+# model - in batches of up to MEMORY_BATCH_SIZE turns, waiting at most MEMORY_BATCH_DELAY seconds
+MEMORY_MODEL = os.getenv('MEMORY_MODEL', '')
+# Models per call type (chat, plan, retro, memory) as 'type=primary|fallback,...' - unlisted
+# types use LLM_MODEL. A primary whose p95 latency or error rate over the last few minutes
+# crosses these limits is skipped for its fallback until it recovers.
+LLM_ROUTES = os.getenv('LLM_ROUTES', '')
+LLM_FAILOVER_P95_MS = float(os.getenv('LLM_FAILOVER_P95_MS', '15000'))
+LLM_FAILOVER_ERROR_RATE = float(os.getenv('LLM_FAILOVER_ERROR_RATE', '0.3'))
+# Hedged chat requests (off by default) - a chat call with no response after the model's
+# LLM_HEDGE_PERCENTILE latency gets a second request raced against it, on the route's
+# fallback (LLM_HEDGE_MODEL=fallback) or the same model (=same). At most LLM_HEDGE_BUDGET
+# of recent chat calls may hedge. LLM_HEDGE_HOLDOUT of chat calls never hedge, so /metrics
+# can compare hedged latency with an unhedged baseline.
+LLM_HEDGE = os.getenv('LLM_HEDGE', '0') == '1'
+LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', '95'))
+LLM_HEDGE_BUDGET = float(os.getenv('LLM_HEDGE_BUDGET', '0.1'))
+LLM_HEDGE_MODEL = os.getenv('LLM_HEDGE_MODEL', 'fallback')
+LLM_HEDGE_HOLDOUT = float(os.getenv('LLM_HEDGE_HOLDOUT', '0.05'))
+# Daily prompt + completion tokens per guild (0 = unlimited). Past half of it chat sends less
+# history, past 80% calls use LLM_BUDGET_MODEL (if set), and at the limit the bot stops
+# calling the LLM for that guild until midnight UTC. Usage totals are written to the
+# database every LLM_USAGE_FLUSH_INTERVAL seconds.
+LLM_DAILY_TOKEN_BUDGET = int(os.getenv('LLM_DAILY_TOKEN_BUDGET', '0'))
+LLM_BUDGET_MODEL = os.getenv('LLM_BUDGET_MODEL', '')
+LLM_USAGE_FLUSH_INTERVAL = float(os.getenv('LLM_USAGE_FLUSH_INTERVAL', '60'))
+MEMORY_BATCH_SIZE = int(os.getenv('MEMORY_BATCH_SIZE', '8'))
+MEMORY_BATCH_DELAY = float(os.getenv('MEMORY_BATCH_DELAY', '5'))
+# AI project plans and retro summaries run from a job queue in the database, so they
+# survive restarts - JOB_WORKERS at a time per process, each leased for JOB_LEASE_SECONDS
+# and tried up to JOB_MAX_ATTEMPTS times
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '120'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+# Mention handling - max messages processed at once, and max queued per channel
+INGRESS_WORKERS = int(os.getenv('INGRESS_WORKERS', '8'))
+INGRESS_QUEUE_LIMIT = int(os.getenv('INGRESS_QUEUE_LIMIT', '20'))
+# Seconds to wait for follow-up messages from the same user before replying (0 disables)
+COALESCE_WINDOW = float(os.getenv('COALESCE_WINDOW', '1.5'))
 
 if not TOKEN:
     raise ValueError("DISCORD_TOKEN not found in environment variables!")
 
-if not REQUESTY_API_KEY:
-    logger.warning("REQUESTY_API_KEY not found - LLM features will be disabled")
+if not REQUESTY_API_KEY and not LLM_LOCAL_BASE_URL:
+    logger.warning("Neither REQUESTY_API_KEY nor LLM_LOCAL_BASE_URL set - LLM features will be disabled")
+
+
+# Startup timeline: (stage, seconds since BOOT_STARTED)
+_boot_marks: List[Tuple[str, float]] = []
+
+
+def mark_boot(stage: str):
+    """Record that a startup stage has finished"""
+    _boot_marks.append((stage, time.perf_counter() - BOOT_STARTED))
+
+
+def format_boot_timeline() -> str:
+    """Render the startup timeline as 'stage=total (+delta)' pairs"""
+    parts = []
+    previous = 0.0
+    for stage, elapsed in _boot_marks:
+        parts.append(f"{stage}={elapsed:.2f}s (+{elapsed - previous:.2f}s)")
+        previous = elapsed
+    return ", ".join(parts)
 
 
-class BrrrBot(commands.Bot):
+mark_boot('imports')
+
+from src.metrics import metrics
+
+# One gateway connection per process unless sharding is enabled
+_BotBase = commands.AutoShardedBot if SHARDED else commands.Bot
+
+
+class BrrrBot(_BotBase):
     def __init__(self):
         # Set up intents - we need message content and members
         intents = discord.Intents.default()
@@ -40,45 +151,253 @@ class BrrrBot(commands.Bot):
         intents.members = True
         intents.guilds = True
         
+        shard_kwargs = {}
+        if SHARDED:
+            shard_kwargs = {'shard_count': SHARD_COUNT, 'shard_ids': SHARD_IDS}
+        
         super().__init__(
             command_prefix='!',
             intents=intents,
-            help_command=None
+            help_command=None,
+            **shard_kwargs
         )
         
         self.db = None
         self.llm = None
+        self.memory_extractor = None
+        self.usage = None
+        self.jobs = None
+        self.ingress = None
+        self.dashboard = None
+        self.backup_dir = BACKUP_DIR
+        
+        from src.outbound import SendScheduler
+        self.outbound = SendScheduler()
+        
+        from src.render_cache import RenderCache
+        self.render_cache = RenderCache()
+        self._boot_logged = False
         
     async def setup_hook(self):
         """Called when the bot is starting up"""
         # Initialize database
-        from src.database import Database
-        self.db = Database(DATABASE_PATH)
+        if DATABASE_URL.startswith(('postgres://', 'postgresql://')):
+            from src.storage_postgres import PostgresStorage
+            self.db = PostgresStorage(DATABASE_URL, max_size=DATABASE_POOL_SIZE)
+        else:
+            from src.database import Database
+            self.db = Database(
+                DATABASE_PATH,
+                cold_path=COLD_DATABASE_PATH or None,
+                compress_threshold=COMPRESS_MIN_BYTES,
+                guild_db_dir=GUILD_DB_DIR or None,
+                guild_db_max_open=GUILD_DB_MAX_OPEN
+            )
         await self.db.init()
-        logger.info("Database initialized")
+        mark_boot('db_init')
+        logger.info(f"Database initialized ({type(self.db).__name__})")
         
         # Initialize LLM client
-        if REQUESTY_API_KEY:
+        if REQUESTY_API_KEY or LLM_LOCAL_BASE_URL:
             from src.llm import LLMClient
-            self.llm = LLMClient(REQUESTY_API_KEY, LLM_MODEL)
-            logger.info(f"LLM client initialized with model: {LLM_MODEL}")
+            from src.model_router import HedgePolicy, ModelRouter, Route, parse_routes
+            from src.providers import REQUESTY_BASE_URL, Provider, Providers
+            configured = []
+            if REQUESTY_API_KEY:
+                configured.append(Provider('requesty', REQUESTY_BASE_URL, REQUESTY_API_KEY))
+            if LLM_LOCAL_BASE_URL:
+                configured.append(Provider(
+                    'local', LLM_LOCAL_BASE_URL, LLM_LOCAL_API_KEY or None, json_schema=LLM_LOCAL_JSON_SCHEMA
+                ))
+            providers = Providers(configured, default=LLM_PROVIDER)
+            defaults = {'memory': Route(MEMORY_MODEL, LLM_MODEL)} if MEMORY_MODEL else None
+            router = ModelRouter(
+                parse_routes(LLM_ROUTES, LLM_MODEL, defaults),
+                max_p95_ms=LLM_FAILOVER_P95_MS,
+                max_error_rate=LLM_FAILOVER_ERROR_RATE
+            )
+            hedge = HedgePolicy(
+                percentile=LLM_HEDGE_PERCENTILE,
+                budget=LLM_HEDGE_BUDGET,
+                alternate=LLM_HEDGE_MODEL != 'same',
+                holdout=LLM_HEDGE_HOLDOUT
+            ) if LLM_HEDGE else None
+            from src.usage import UsageLedger
+            self.usage = UsageLedger(
+                self.db,
+                daily_budget=LLM_DAILY_TOKEN_BUDGET,
+                cheap_model=LLM_BUDGET_MODEL or None,
+                flush_interval=LLM_USAGE_FLUSH_INTERVAL
+            )
+            self.usage.start()
+            self.llm = LLMClient(providers, LLM_MODEL, router=router, hedge=hedge, ledger=self.usage)
+            logger.info(f"LLM client initialized with providers {', '.join(providers.names())} "
+                        f"(default {providers.default}) and routes: " + ", ".join(
+                f"{call_type}={route.primary}" + (f"|{route.fallback}" if route.fallback else "")
+                for call_type, route in router.routes.items()
+            ))
+            
+            from src.memory_worker import MemoryExtractor
+            self.memory_extractor = MemoryExtractor(
+                self.llm, self.db,
+                batch_size=MEMORY_BATCH_SIZE,
+                max_delay=MEMORY_BATCH_DELAY,
+                ledger=self.usage
+            )
+            self.memory_extractor.start()
+            
+            from src.jobs import JobQueue
+            self.jobs = JobQueue(
+                self.db,
+                workers=JOB_WORKERS,
+                lease_seconds=JOB_LEASE_SECONDS,
+                max_attempts=JOB_MAX_ATTEMPTS,
+                # With shards split across processes, only run jobs for our own guilds
+                shards=(SHARD_COUNT, SHARD_IDS) if SHARD_COUNT and SHARD_IDS else None
+            )
         
-        # Load cogs
+        # Load cogs (they register their job handlers)
         await self.load_extension('src.cogs.projects')
         await self.load_extension('src.cogs.weekly')
         await self.load_extension('src.cogs.ideas')
         await self.load_extension('src.cogs.chat')
+        await self.load_extension('src.cogs.admin')
+        mark_boot('cogs')
         logger.info("All cogs loaded")
         
-        # Sync commands
-        await self.tree.sync()
-        logger.info("Commands synced")
+        if self.jobs:
+            self.jobs.start()
+        
+        # Live dashboards follow database writes
+        from src.dashboard import DashboardManager
+        self.dashboard = DashboardManager(self)
+        await self.dashboard.load()
+        
+        # Sync commands (only when the tree actually changed). The tree is global, so with
+        # shards split across processes only the one running shard 0 syncs it
+        if SHARD_IDS is None or 0 in SHARD_IDS:
+            await self.sync_commands()
+        mark_boot('sync')
+        
+        # Start the mention pipeline
+        from src.ingress import MessageIngress
+        self.ingress = MessageIngress(
+            self.handle_addressed_message,
+            workers=INGRESS_WORKERS,
+            max_queue_per_channel=INGRESS_QUEUE_LIMIT,
+            coalesce_window=COALESCE_WINDOW
+        )
+        self.ingress.start()
+        
+        self.sample_shard_latency.start()
+        # Each process moves its own guilds' rows, since moving projects bumps data versions
+        if COLD_DATABASE_PATH:
+            self.move_cold_data.start()
+    
+    async def budget_level(self, guild_id: int) -> int:
+        """How far a guild's LLM calls are degraded by its daily token budget"""
+        from src.usage import BUDGET_NORMAL
+        if self.usage is None:
+            return BUDGET_NORMAL
+        return await self.usage.budget_level(guild_id)
+    
+    def budget_model(self, level: int) -> Optional[str]:
+        """Model override for a budget level - None keeps the call type's route"""
+        return self.usage.model_for(level) if self.usage else None
+    
+    def _command_tree_hash(self, guild: Optional[discord.abc.Snowflake] = None) -> str:
+        """Hash the command tree (names, options, descriptions) for change detection"""
+        commands_payload = sorted(
+            (cmd.to_dict(self.tree) for cmd in self.tree.get_commands(guild=guild)),
+            key=lambda c: c['name']
+        )
+        encoded = json.dumps(commands_payload, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(encoded.encode()).hexdigest()
+    
+    async def sync_commands(self):
+        """Sync the command tree, skipping the call if nothing changed since the last sync"""
+        guild = None
+        if DEV_GUILD_ID:
+            guild = discord.Object(id=int(DEV_GUILD_ID))
+            self.tree.copy_global_to(guild=guild)
+        
+        tree_hash = self._command_tree_hash(guild)
+        state_key = f"command_tree_hash:{self.application_id}:{guild.id if guild else 'global'}"
+        
+        if not FORCE_COMMAND_SYNC and await self.db.get_state(state_key) == tree_hash:
+            logger.info("Command tree unchanged - skipping sync")
+            return
+        
+        await self.tree.sync(guild=guild)
+        await self.db.set_state(state_key, tree_hash)
+        logger.info(f"Commands synced ({'guild ' + str(guild.id) if guild else 'global'})")
+    
+    def shard_latencies(self) -> List[Tuple[int, float]]:
+        """(shard_id, latency in seconds) for every shard this process runs"""
+        if SHARDED:
+            return self.latencies
+        return [(self.shard_id or 0, self.latency)]
+    
+    @tasks.loop(seconds=30)
+    async def sample_shard_latency(self):
+        """Record gateway heartbeat latency per shard"""
+        for shard_id, latency in self.shard_latencies():
+            # latency is inf/nan until the first heartbeat ack
+            if latency == latency and latency != float('inf'):
+                metrics.observe(f'shard.{shard_id}.latency_ms', latency * 1000)
+    
+    @sample_shard_latency.before_loop
+    async def before_sample_shard_latency(self):
+        await self.wait_until_ready()
+    
+    @tasks.loop(hours=6)
+    async def move_cold_data(self):
+        """Move long-archived projects and old chat history to the cold tier"""
+        now = datetime.utcnow()
+        try:
+            projects, history = await self.db.move_to_cold(
+                archived_before=now - timedelta(days=ARCHIVE_COLD_AFTER_DAYS),
+                history_before=now - timedelta(days=HISTORY_COLD_AFTER_DAYS),
+                shards=(SHARD_COUNT, SHARD_IDS) if SHARD_COUNT and SHARD_IDS else None
+            )
+        except Exception as e:
+            logger.error(f"Cold tier move failed: {e}", exc_info=True)
+            return
+        metrics.incr('cold_tier.projects_moved', projects)
+        metrics.incr('cold_tier.history_moved', history)
+        if projects or history:
+            logger.info(f"Moved {projects} project(s) and {history} history row(s) to the cold tier")
+    
+    @move_cold_data.before_loop
+    async def before_move_cold_data(self):
+        await self.wait_until_ready()
+    
+    async def on_shard_ready(self, shard_id: int):
+        logger.info(f"Shard {shard_id} ready")
+    
+    async def on_shard_disconnect(self, shard_id: int):
+        metrics.incr(f'shard.{shard_id}.disconnects')
+        logger.warning(f"Shard {shard_id} disconnected")
+    
+    async def on_socket_event_type(self, event_type: str):
+        """Count every gateway event this process receives"""
+        metrics.mark('gateway.events')
+    
+    async def on_interaction(self, interaction: discord.Interaction):
+        shard_id = interaction.guild.shard_id if interaction.guild else 0
+        metrics.mark(f'shard.{shard_id}.interactions')
     
     async def on_ready(self):
         """Called when the bot is fully ready"""
         logger.info(f'BRRR Bot is online! Logged in as {self.user}')
         logger.info(f'Connected to {len(self.guilds)} guild(s)')
         
+        # on_ready fires again after reconnects - only the first one is startup
+        if not self._boot_logged:
+            self._boot_logged = True
+            mark_boot('ready')
+            logger.info(f"Startup timeline: {format_boot_timeline()}")
+        
         # Set presence
         await self.change_presence(
             activity=discord.Activity(
@@ -92,36 +411,55 @@ class BrrrBot(commands.Bot):
         Handle incoming messages - RESPONDS TO BOTS TOO!
         This is the key difference from default behavior.
         """
+        metrics.mark(f'shard.{message.guild.shard_id if message.guild else 0}.messages')
+        
         # Don't respond to ourselves
         if message.author.id == self.user.id:
             return
         
-        # Process commands first (for prefix commands if any)
-        await self.process_commands(message)
+        # Cheap pre-filter - there are no prefix commands, so only mentions and
+        # replies to the bot need any further work
+        if not self._is_addressed_to_bot(message):
+            return
         
-        # Check if bot was mentioned or message is a reply to bot
-        bot_mentioned = self.user.mentioned_in(message)
-        is_reply_to_bot = (
-            message.reference and 
-            message.reference.resolved and 
-            message.reference.resolved.author.id == self.user.id
-        )
+        self.ingress.submit(message)
+    
+    def _is_addressed_to_bot(self, message: discord.Message) -> bool:
+        """Check if the bot was mentioned or the message is a reply to the bot"""
+        if self.user.mentioned_in(message):
+            return True
+        resolved = message.reference.resolved if message.reference else None
+        return isinstance(resolved, discord.Message) and resolved.author.id == self.user.id
+    
+    async def handle_addressed_message(self, batch):
+        """Ingress worker handler - engage in conversation"""
+        if self.llm is None:
+            await batch.last.reply("brrrr... LLM not configured! Set REQUESTY_API_KEY or LLM_LOCAL_BASE_URL to enable chat.", mention_author=False)
+            return
         
-        # If mentioned or replied to, engage in conversation
-        if bot_mentioned or is_reply_to_bot:
-            if self.llm is None:
-                await message.reply("brrrr... LLM not configured! Set REQUESTY_API_KEY to enable chat.", mention_author=False)
-                return
-            
-            # Get the chat cog to handle the conversation
-            chat_cog = self.get_cog('Chat')
-            if chat_cog:
-                await chat_cog.handle_mention(message)
+        # Get the chat cog to handle the conversation
+        chat_cog = self.get_cog('Chat')
+        if chat_cog:
+            await chat_cog.handle_mention(batch)
     
     async def close(self):
         """Cleanup on shutdown"""
+        self.sample_shard_latency.cancel()
+        self.move_cold_data.cancel()
+        if self.ingress:
+            await self.ingress.stop()
+        if self.memory_extractor:
+            await self.memory_extractor.stop()
+        if self.jobs:
+            await self.jobs.stop()
+        if self.usage:
+            await self.usage.stop()
+        if self.dashboard:
+            self.dashboard.stop()
         if self.llm:
             await self.llm.close()
+        if self.db:
+            await self.db.close()
         await super().close()
 
 
@@ -136,7 +474,10 @@ async def ping(interaction: discord.Interaction):
     await interaction.response.send_message(f"🏎️ BRRRRR! Pong! ({latency}ms)")
 
 
-@bot.tree.command(name="brrr", description="Get bot status and info")
+brrr_group = app_commands.Group(name="brrr", description="Bot status and LLM usage")
+
+
+@brrr_group.command(name="status", description="Get bot status and info")
 async def brrr_status(interaction: discord.Interaction):
     embed = discord.Embed(
         title="🚀 BRRR Bot Status",
@@ -146,15 +487,209 @@ async def brrr_status(interaction: discord.Interaction):
     embed.add_field(name="Latency", value=f"{round(bot.latency * 1000)}ms", inline=True)
     embed.add_field(name="Guilds", value=str(len(bot.guilds)), inline=True)
     embed.add_field(name="LLM", value="✅ Active" if bot.llm else "❌ Disabled", inline=True)
+    if bot.shard_count:
+        embed.add_field(name="Shards", value=str(bot.shard_count), inline=True)
     
     if interaction.guild:
-        projects = await bot.db.get_guild_projects(interaction.guild.id, status='active')
-        embed.add_field(name="Active Projects", value=str(len(projects)), inline=True)
+        guild_id = interaction.guild.id
+        
+        async def count_active():
+            return len(await bot.db.get_guild_projects(guild_id, status='active'))
+        
+        active = await bot.render_cache.get_or_render(
+            'brrr', guild_id, await bot.db.get_guild_version(guild_id), (), count_active
+        )
+        embed.add_field(name="Active Projects", value=str(active), inline=True)
     
     embed.set_footer(text="Use /help for commands")
     await interaction.response.send_message(embed=embed)
 
 
+@brrr_group.command(name="usage", description="Show this server's LLM token usage")
+@app_commands.describe(days="How many days back to report (default 7)")
+async def brrr_usage(interaction: discord.Interaction, days: app_commands.Range[int, 1, 90] = 7):
+    if not interaction.guild or not bot.usage:
+        await interaction.response.send_message("No LLM usage to report here.", ephemeral=True)
+        return
+    
+    from src.usage import usage_day
+    guild_id = interaction.guild.id
+    # Report what's still only in memory too
+    await bot.usage.flush()
+    rows = await bot.db.get_usage(guild_id, usage_day(datetime.utcnow() - timedelta(days=days - 1)))
+    
+    embed = discord.Embed(
+        title="🧮 LLM Usage",
+        description=f"Last {days} day(s) in {interaction.guild.name}",
+        color=discord.Color.blue()
+    )
+    
+    used = await bot.usage.tokens_today(guild_id)
+    if bot.usage.daily_budget:
+        level = await bot.usage.budget_level(guild_id)
+        state = ["normal", "shorter chat history", "cheaper model", "exhausted"][level]
+        today = f"{used:,} / {bot.usage.daily_budget:,} tokens ({state})"
+    else:
+        today = f"{used:,} tokens (no budget)"
+    embed.add_field(name="Today", value=today, inline=False)
+    
+    by_type: Dict[str, List[float]] = {}
+    by_user: Dict[int, int] = {}
+    for row in rows:
+        totals = by_type.setdefault(row['call_type'], [0, 0, 0, 0, 0.0])
+        for i, field in enumerate(('calls', 'prompt_tokens', 'completion_tokens', 'cached_tokens', 'latency_ms')):
+            totals[i] += row[field]
+        if row['user_id']:
+            by_user[row['user_id']] = by_user.get(row['user_id'], 0) + row['prompt_tokens'] + row['completion_tokens']
+    
+    lines = [
+        f"**{call_type}**: {calls:,} calls, {prompt:,} in ({cached / prompt * 100 if prompt else 0:.0f}% cached) / "
+        f"{completion:,} out, avg {latency / calls if calls else 0:.0f}ms"
+        for call_type, (calls, prompt, completion, cached, latency) in sorted(by_type.items())
+    ]
+    embed.add_field(name="By Call Type", value="\n".join(lines) or "No LLM calls yet", inline=False)
+    
+    if by_user:
+        top = sorted(by_user.items(), key=lambda item: item[1], reverse=True)[:5]
+        embed.add_field(
+            name="Top Users",
+            value="\n".join(f"<@{user_id}>: {tokens:,} tokens" for user_id, tokens in top),
+            inline=False
+        )
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+bot.tree.add_command(brrr_group)
+
+
+@bot.tree.command(name="metrics", description="Show bot performance metrics")
+async def metrics_command(interaction: discord.Interaction):
+    embed = discord.Embed(
+        title="📈 BRRR Bot Metrics",
+        description=f"Gateway events: {metrics.rate('gateway.events'):.2f}/s",
+        color=discord.Color.blurple()
+    )
+    
+    for shard_id, latency in bot.shard_latencies():
+        p95 = metrics.percentile(f'shard.{shard_id}.latency_ms', 95)
+        lines = [
+            f"Latency: {round(latency * 1000)}ms" + (f" (p95 {p95:.0f}ms)" if p95 is not None else ""),
+            f"Messages: {metrics.rate(f'shard.{shard_id}.messages'):.2f}/s",
+            f"Interactions: {metrics.rate(f'shard.{shard_id}.interactions'):.2f}/s",
+        ]
+        embed.add_field(name=f"Shard {shard_id}", value="\n".join(lines), inline=True)
+    
+    wait_p95 = metrics.percentile('ingress.wait_ms', 95)
+    embed.add_field(
+        name="Ingress",
+        value="\n".join([
+            f"Queued: {metrics.gauges.get('ingress.queue_depth', 0):.0f} "
+            f"in {metrics.gauges.get('ingress.channels', 0):.0f} channel(s)",
+            f"Queue wait p95: {wait_p95:.0f}ms" if wait_p95 is not None else "Queue wait p95: -",
+            f"Dropped: {metrics.counters.get('ingress.dropped', 0)}",
+            f"LLM calls saved: {metrics.counters.get('coalesce.calls_saved', 0)}",
+        ]),
+        inline=True
+    )
+    
+    embed.add_field(
+        name="Render Cache",
+        value=f"Hit rate: {bot.render_cache.hit_rate() * 100:.1f}%\n"
+              f"Hits: {metrics.counters.get('render_cache.hits', 0)} / "
+              f"Misses: {metrics.counters.get('render_cache.misses', 0)}",
+        inline=True
+    )
+    
+    queue_p95 = metrics.percentile('outbound.queue_ms', 95)
+    send_p95 = metrics.percentile('outbound.send_ms', 95)
+    embed.add_field(
+        name="Outbound",
+        value="\n".join([
+            f"Messages sent: {metrics.counters.get('outbound.messages', 0)}",
+            f"Send queue p95: {queue_p95:.0f}ms" if queue_p95 is not None else "Send queue p95: -",
+            f"Send p95: {send_p95:.0f}ms" if send_p95 is not None else "Send p95: -",
+        ]),
+        inline=True
+    )
+    
+    if bot.jobs:
+        counts = await bot.db.get_job_counts()
+        lines = [
+            f"Queued: {counts.get('queued', 0)} / Running: {counts.get('running', 0)} / "
+            f"Failed: {counts.get('failed', 0)}"
+        ]
+        for kind in ('project_plan', 'retro_summary'):
+            run_p95 = metrics.percentile(f'jobs.{kind}.run_ms', 95)
+            lines.append(
+                f"{kind}: {metrics.counters.get(f'jobs.{kind}.done', 0)} done, "
+                f"{metrics.counters.get(f'jobs.{kind}.retried', 0)} retried"
+                + (f", p95 {run_p95 / 1000:.1f}s" if run_p95 is not None else "")
+            )
+        embed.add_field(name="LLM Jobs", value="\n".join(lines), inline=True)
+    
+    batches = metrics.counters.get('llm.memory.batches', 0)
+    memory_p95 = metrics.percentile('llm.memory.output_tokens', 95)
+    embed.add_field(
+        name="Memory Extraction",
+        value="\n".join([
+            f"Pending: {metrics.gauges.get('memory.pending', 0):.0f} / "
+            f"Dropped: {metrics.counters.get('memory.dropped', 0)}",
+            f"Structured batches: {metrics.counters.get('llm.memory.parsed', 0) / batches * 100:.1f}%"
+            if batches else "Structured batches: -",
+            f"Saved: {metrics.counters.get('llm.memory.saved', 0)} / "
+            f"Rejected: {metrics.counters.get('llm.memory.rejected', 0)}",
+            f"Tokens/turn p95: {memory_p95:.0f}" if memory_p95 is not None else "Tokens/turn p95: -",
+        ]),
+        inline=True
+    )
+    
+    if bot.llm:
+        lines = []
+        for call_type, status in bot.llm.router.status().items():
+            p95 = f"{status['p95_ms']:.0f}ms" if status['p95_ms'] is not None else "-"
+            lines.append(
+                f"{call_type}: `{status['model']}`{' ⚠️' if status['failed_over'] else ''} "
+                f"p95 {p95}, {status['error_rate'] * 100:.0f}% err, "
+                f"{metrics.counters.get(f'llm.route.{call_type}.failovers', 0)} retried"
+            )
+        models = bot.llm.router.model_status()
+        if len(models) > 1:
+            lines.append("Models: " + ", ".join(
+                f"`{model}` p50 {status['p50_ms']:.0f}ms / p95 {status['p95_ms']:.0f}ms "
+                f"({status['calls']} calls, {status['error_rate'] * 100:.0f}% err)"
+                for model, status in sorted(models.items())
+            ))
+        prompt_tokens = metrics.counters.get('llm.tokens.chat.prompt', 0)
+        if prompt_tokens:
+            lines.append(
+                f"Chat prompt cache: {metrics.counters.get('llm.tokens.chat.cached', 0) / prompt_tokens * 100:.0f}% "
+                f"of {prompt_tokens} prompt tokens"
+            )
+        if bot.llm.hedge:
+            eligible = metrics.counters.get('llm.hedge.eligible', 0)
+            fired = metrics.counters.get('llm.hedge.fired', 0)
+
+            def p50_p99(name: str) -> str:
+                p50, p99 = metrics.percentile(name, 50), metrics.percentile(name, 99)
+                return f"{p50:.0f}/{p99:.0f}ms" if p50 is not None else "-"
+
+            lines.append(
+                f"Hedging: {fired / eligible * 100 if eligible else 0:.1f}% of calls "
+                f"({metrics.counters.get('llm.hedge.won', 0)} won, "
+                f"{metrics.counters.get('llm.hedge.over_budget', 0)} over budget), p50/p99 "
+                f"{p50_p99('llm.hedge.latency_ms')} hedged vs {p50_p99('llm.hedge.unhedged_ms')} unhedged"
+            )
+        embed.add_field(name="LLM Routes", value="\n".join(lines), inline=False)
+    
+    # Metrics are kept per process - say which one answered when shards are split up
+    footer = f"Rates averaged over the last {metrics.rate_window:.0f}s"
+    if SHARD_IDS:
+        footer += f" · this process only (pid {os.getpid()}, shards {', '.join(map(str, SHARD_IDS))} of {SHARD_COUNT})"
+    embed.set_footer(text=footer)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
 @bot.tree.command(name="help", description="Show all available commands")
 async def help_command(interaction: discord.Interaction):
     embed = discord.Embed(
@@ -179,7 +714,9 @@ async def help_command(interaction: discord.Interaction):
         name="📅 Weekly Commands",
         value="""
 `/week start` - Start a new week
+`/week summary` - Progress and trends over recent weeks
 `/week retro` - Run project retrospective
+`/week dashboard` - Post a live-updating dashboard
         """,
         inline=False
     )
@@ -204,6 +741,26 @@ async def help_command(interaction: discord.Interaction):
         inline=False
     )
     
+    embed.add_field(
+        name="🗄️ Admin Commands",
+        value="""
+`/admin export` - Export this server's data
+`/admin import` - Import data from an export
+`/admin backup` - Back up the database (bot owner)
+        """,
+        inline=False
+    )
+    
+    embed.add_field(
+        name="🤖 Bot Commands",
+        value="""
+`/brrr status` - Bot status and info
+`/brrr usage` - This server's LLM token usage and daily budget
+`/metrics` - Performance metrics for this bot process
+        """,
+        inline=False
+    )
+    
     embed.add_field(
         name="💬 Chat",
         value="Just @mention me to chat! I can help with project planning, coding questions, and more.",
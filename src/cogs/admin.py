@@ -0,0 +1,246 @@
+"""
+BRRR Bot - Admin Cog
+Online backups and per-guild NDJSON export/import, run as background jobs
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import AsyncIterator, Dict, Tuple
+
+import aiohttp
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from src.storage import EXPORT_FORMAT_VERSION
+
+logger = logging.getLogger('brrr.admin')
+
+# Seconds between progress message edits
+PROGRESS_INTERVAL = 2.0
+
+RECORD_LABELS = {'project': 'projects', 'task': 'tasks', 'idea': 'ideas', 'memory': 'memories'}
+
+
+async def iter_lines(response: aiohttp.ClientResponse) -> AsyncIterator[bytes]:
+    """Split a streamed response body into lines without holding the whole body"""
+    buffer = b''
+    async for chunk in response.content.iter_chunked(64 * 1024):
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+class Progress:
+    """Throttled progress updates on a deferred interaction's original response"""
+
+    def __init__(self, interaction: discord.Interaction, label: str):
+        self.interaction = interaction
+        self.label = label
+        self._last = 0.0
+        # Interaction tokens expire after 15 minutes - stop editing once they do
+        self._dead = False
+
+    async def update(self, detail: str, force: bool = False):
+        now = time.monotonic()
+        if self._dead or (not force and now - self._last < PROGRESS_INTERVAL):
+            return
+        self._last = now
+        try:
+            await self.interaction.edit_original_response(content=f"{self.label} {detail}")
+        except discord.HTTPException:
+            self._dead = True
+
+
+class Admin(commands.Cog):
+    """Backup and data portability commands"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        # guild_id (0 for backups) -> running job
+        self._jobs: Dict[int, asyncio.Task] = {}
+
+    @property
+    def db(self):
+        return self.bot.db
+
+    async def cog_unload(self):
+        for task in self._jobs.values():
+            task.cancel()
+
+    def _start_job(self, key: int, coro) -> bool:
+        """Run a job in the background unless one with the same key is already running"""
+        if key in self._jobs:
+            coro.close()
+            return False
+        task = asyncio.create_task(coro)
+        self._jobs[key] = task
+        task.add_done_callback(lambda _: self._jobs.pop(key, None))
+        return True
+
+    admin_group = app_commands.Group(name="admin", description="Backup and data export commands")
+
+    @admin_group.command(name="backup", description="Take an online backup of the bot database (bot owner only)")
+    async def admin_backup(self, interaction: discord.Interaction):
+        """Back up the database to BACKUP_DIR without pausing the bot"""
+
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("Only the bot owner can take backups!", ephemeral=True)
+            return
+
+        if not self.db.data_files():
+            await interaction.response.send_message(
+                "The bot's data lives on a database server - back it up there (e.g. with `pg_dump`).", ephemeral=True
+            )
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        if not self._start_job(0, self._run_backup(interaction)):
+            await interaction.followup.send("A backup is already running.", ephemeral=True)
+
+    async def _run_backup(self, interaction: discord.Interaction):
+        progress = Progress(interaction, "💾 Backing up...")
+        stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+        # Written from aiosqlite's thread, read here
+        state = {'remaining': 0, 'total': 0}
+
+        def on_step(status: int, remaining: int, total: int):
+            state['remaining'], state['total'] = remaining, total
+
+        # Main, per-guild and cold-tier files side by side in one directory
+        directory = os.path.join(self.bot.backup_dir, f"brrr-{stamp}")
+        sources = self.db.data_files()
+
+        try:
+            for i, source in enumerate(sources, 1):
+                name = os.path.basename(source)
+                path = os.path.join(directory, name)
+                state['total'] = 0
+                backup = asyncio.create_task(self.db.backup(path, source_path=source, progress=on_step))
+                while not backup.done():
+                    if state['total']:
+                        done = state['total'] - state['remaining']
+                        await progress.update(f"`{name}` ({i}/{len(sources)}) {done}/{state['total']} pages")
+                    await asyncio.wait({backup}, timeout=PROGRESS_INTERVAL)
+                await backup
+                logger.info(f"Backup written to {path}")
+        except Exception as e:
+            logger.error(f"Backup failed: {e}", exc_info=True)
+            await progress.update(f"failed: {e}", force=True)
+            return
+
+        await progress.update(f"done - wrote {len(sources)} file(s) to `{directory}`", force=True)
+
+    @admin_group.command(name="export", description="Export this server's projects, tasks, ideas and memories")
+    async def admin_export(self, interaction: discord.Interaction):
+        """Stream the guild's data to an NDJSON file and upload it"""
+
+        if not interaction.user.guild_permissions.manage_guild:
+            await interaction.response.send_message("You need Manage Server to export data!", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        if not self._start_job(interaction.guild.id, self._run_export(interaction)):
+            await interaction.followup.send("An export or import is already running for this server.", ephemeral=True)
+
+    async def _run_export(self, interaction: discord.Interaction):
+        guild = interaction.guild
+        progress = Progress(interaction, "📤 Exporting...")
+        stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.bot.backup_dir, f"guild-{guild.id}-{stamp}.ndjson")
+        os.makedirs(self.bot.backup_dir, exist_ok=True)
+        counts: Dict[str, int] = {}
+
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({
+                    'type': 'header',
+                    'version': EXPORT_FORMAT_VERSION,
+                    'guild_id': guild.id,
+                    'exported_at': datetime.utcnow().isoformat()
+                }) + '\n')
+                async for record_type, data in self.db.iter_guild_export(guild.id):
+                    f.write(json.dumps({'type': record_type, 'data': data}) + '\n')
+                    counts[record_type] = counts.get(record_type, 0) + 1
+                    await progress.update(self._format_counts(counts))
+        except Exception as e:
+            logger.error(f"Export failed for guild {guild.id}: {e}", exc_info=True)
+            await progress.update(f"failed: {e}", force=True)
+            return
+
+        summary = self._format_counts(counts) or "nothing to export"
+        await progress.update(f"done - {summary}", force=True)
+
+        if os.path.getsize(path) > guild.filesize_limit:
+            await interaction.followup.send(
+                f"📤 Export is too large to upload - saved on the bot host as `{path}`.", ephemeral=True
+            )
+            return
+        try:
+            await interaction.followup.send(file=discord.File(path), ephemeral=True)
+        except discord.HTTPException as e:
+            logger.warning(f"Could not upload export {path}: {e}")
+
+    @admin_group.command(name="import", description="Import projects, tasks, ideas and memories from an export")
+    @app_commands.describe(file="An NDJSON file from /admin export")
+    async def admin_import(self, interaction: discord.Interaction, file: discord.Attachment):
+        """Stream an export file into this guild"""
+
+        if not interaction.user.guild_permissions.manage_guild:
+            await interaction.response.send_message("You need Manage Server to import data!", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        if not self._start_job(interaction.guild.id, self._run_import(interaction, file)):
+            await interaction.followup.send("An export or import is already running for this server.", ephemeral=True)
+
+    async def _run_import(self, interaction: discord.Interaction, file: discord.Attachment):
+        guild = interaction.guild
+        progress = Progress(interaction, "📥 Importing...")
+        seen: Dict[str, int] = {}
+
+        async def records(response: aiohttp.ClientResponse) -> AsyncIterator[Tuple[str, dict]]:
+            header = True
+            async for line in iter_lines(response):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if header:
+                    if record.get('type') != 'header' or record.get('version') != EXPORT_FORMAT_VERSION:
+                        raise ValueError("not a BRRR export (or an unsupported version)")
+                    header = False
+                    continue
+                seen[record['type']] = seen.get(record['type'], 0) + 1
+                await progress.update(self._format_counts(seen))
+                yield record['type'], record['data']
+
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(file.url) as response:
+                    response.raise_for_status()
+                    counts = await self.db.import_guild_records(guild.id, records(response))
+        except Exception as e:
+            logger.error(f"Import failed for guild {guild.id}: {e}", exc_info=True)
+            await progress.update(f"failed: {e} - rows imported before the error were kept", force=True)
+            return
+
+        skipped = counts.pop('skipped')
+        summary = self._format_counts(counts) or "nothing imported"
+        if skipped:
+            summary += f" ({skipped} skipped)"
+        await progress.update(f"done - {summary}", force=True)
+
+    @staticmethod
+    def _format_counts(counts: Dict[str, int]) -> str:
+        return ', '.join(f"{n} {RECORD_LABELS.get(record_type, record_type)}" for record_type, n in counts.items() if n)
+
+
+async def setup(bot):
+    await bot.add_cog(Admin(bot))
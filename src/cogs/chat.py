@@ -9,8 +9,18 @@ from discord.ext import commands
 from typing import Optional
 import logging
 
+from src.ingress import MentionBatch
+from src.llm import ChatTurn
+from src.usage import BUDGET_EXHAUSTED, BUDGET_SHORT_CONTEXT
+
 logger = logging.getLogger('brrr.chat')
 
+# Past messages sent with each chat call - fewer once a guild is over half its daily budget
+HISTORY_LIMIT = 10
+SHORT_HISTORY_LIMIT = 4
+
+BUDGET_EXHAUSTED_REPLY = "brrr... this server has used up today's AI budget. I'll be back tomorrow! 🧊"
+
 
 class Chat(commands.Cog):
     """Conversational AI with persistent memory"""
@@ -26,12 +36,31 @@ class Chat(commands.Cog):
     def llm(self):
         return self.bot.llm
     
-    async def handle_mention(self, message: discord.Message):
-        """Handle when the bot is mentioned in a message"""
+    async def _save_turn(self, user_id: int, guild_id: int, channel_id: int, user_name: str,
+                         message: str, reply: str, memories: dict):
+        """Record an answered exchange in history and queue it for memory extraction"""
+        async with self.db.transaction(guild_id):
+            await self.db.add_message(user_id, guild_id, channel_id, "user", message)
+            await self.db.add_message(user_id, guild_id, channel_id, "assistant", reply)
+        
+        if self.bot.memory_extractor:
+            self.bot.memory_extractor.submit(ChatTurn(
+                user_id=user_id,
+                guild_id=guild_id,
+                user_name=user_name,
+                message=message,
+                reply=reply,
+                known={key: data['value'] for key, data in memories.items()}
+            ))
+    
+    async def handle_mention(self, batch: MentionBatch):
+        """Handle one or more consecutive mentions from the same user with a single reply"""
         
         if not self.llm:
             return
         
+        message = batch.last
+        
         # Show typing indicator
         async with message.channel.typing():
             try:
@@ -46,17 +75,31 @@ class Chat(commands.Cog):
                 # Check if it's a bot
                 is_bot = message.author.bot
                 
+                # Over budget: less history, then a cheaper model, then no reply at all
+                level = await self.bot.budget_level(guild_id)
+                if level >= BUDGET_EXHAUSTED:
+                    await message.reply(BUDGET_EXHAUSTED_REPLY, mention_author=False)
+                    return
+                
                 # Get user memories
                 memories = await self.db.get_all_memories(user_id, guild_id)
                 
                 # Get conversation history for context
-                history = await self.db.get_recent_messages(user_id, guild_id, channel_id, limit=10)
+                history = await self.db.get_recent_messages(
+                    user_id, guild_id, channel_id,
+                    limit=SHORT_HISTORY_LIMIT if level >= BUDGET_SHORT_CONTEXT else HISTORY_LIMIT
+                )
                 
-                # Clean the message content (remove bot mention)
-                content = message.content
-                for mention in message.mentions:
-                    content = content.replace(f'<@{mention.id}>', '').replace(f'<@!{mention.id}>', '')
-                content = content.strip()
+                # Clean the message content (remove bot mention) - rapid-fire messages
+                # are answered together, one line each
+                parts = []
+                for msg in batch.messages:
+                    text = msg.content
+                    for mention in msg.mentions:
+                        text = text.replace(f'<@{mention.id}>', '').replace(f'<@!{mention.id}>', '')
+                    if text.strip():
+                        parts.append(text.strip())
+                content = "\n".join(parts)
                 
                 if not content:
                     content = "Hello!"
@@ -68,39 +111,24 @@ class Chat(commands.Cog):
                 # Build messages for LLM
                 messages = history + [{"role": "user", "content": content}]
                 
-                # Get response from LLM
-                response = await self.llm.chat(
+                # Get response from LLM - a follow-up message from the same user cancels
+                # this call and gets answered together with this one instead
+                response = await batch.run_supersedable(self.llm.chat(
                     messages=messages,
                     user_memories=memories,
-                    user_name=user_name
-                )
-                
-                # Save the conversation to history
-                await self.db.add_message(user_id, guild_id, channel_id, "user", content)
-                await self.db.add_message(user_id, guild_id, channel_id, "assistant", response.content)
+                    user_name=user_name,
+                    guild_id=guild_id,
+                    user_id=user_id,
+                    model=self.bot.budget_model(level)
+                ))
+                if response is None:
+                    return
                 
-                # Save any new memories
-                for mem in response.memories_to_save:
-                    await self.db.set_memory(
-                        user_id=user_id,
-                        guild_id=guild_id,
-                        key=mem.get('key', 'misc'),
-                        value=mem.get('value', ''),
-                        context=mem.get('context')
-                    )
-                    logger.info(f"Saved memory for {user_name}: {mem['key']} = {mem['value']}")
+                # Send response - long replies are split on paragraph/line boundaries
+                await self.bot.outbound.send_text(message.channel, response.content, reply_to=message)
                 
-                # Send response
-                # Split if too long
-                if len(response.content) > 2000:
-                    chunks = [response.content[i:i+2000] for i in range(0, len(response.content), 2000)]
-                    for i, chunk in enumerate(chunks):
-                        if i == 0:
-                            await message.reply(chunk, mention_author=False)
-                        else:
-                            await message.channel.send(chunk)
-                else:
-                    await message.reply(response.content, mention_author=False)
+                # Save the exchange and leave memories to the background extractor
+                await self._save_turn(user_id, guild_id, channel_id, user_name, content, response.content, memories)
                     
             except Exception as e:
                 logger.error(f"Error in chat handler: {e}", exc_info=True)
@@ -269,31 +297,28 @@ class Chat(commands.Cog):
             channel_id = interaction.channel.id
             user_name = interaction.user.display_name
             
+            level = await self.bot.budget_level(guild_id)
+            if level >= BUDGET_EXHAUSTED:
+                await interaction.followup.send(BUDGET_EXHAUSTED_REPLY, ephemeral=True)
+                return
+            
             memories = await self.db.get_all_memories(user_id, guild_id)
-            history = await self.db.get_recent_messages(user_id, guild_id, channel_id, limit=10)
+            history = await self.db.get_recent_messages(
+                user_id, guild_id, channel_id,
+                limit=SHORT_HISTORY_LIMIT if level >= BUDGET_SHORT_CONTEXT else HISTORY_LIMIT
+            )
             
             messages = history + [{"role": "user", "content": message}]
             
             response = await self.llm.chat(
                 messages=messages,
                 user_memories=memories,
-                user_name=user_name
+                user_name=user_name,
+                guild_id=guild_id,
+                user_id=user_id,
+                model=self.bot.budget_model(level)
             )
             
-            # Save conversation
-            await self.db.add_message(user_id, guild_id, channel_id, "user", message)
-            await self.db.add_message(user_id, guild_id, channel_id, "assistant", response.content)
-            
-            # Save memories
-            for mem in response.memories_to_save:
-                await self.db.set_memory(
-                    user_id=user_id,
-                    guild_id=guild_id,
-                    key=mem.get('key', 'misc'),
-                    value=mem.get('value', ''),
-                    context=mem.get('context')
-                )
-            
             # Build response embed
             embed = discord.Embed(
                 description=response.content,
@@ -306,6 +331,8 @@ class Chat(commands.Cog):
             
             await interaction.followup.send(embed=embed)
             
+            await self._save_turn(user_id, guild_id, channel_id, user_name, message, response.content, memories)
+            
         except Exception as e:
             logger.error(f"Error in chat command: {e}", exc_info=True)
             await interaction.followup.send(
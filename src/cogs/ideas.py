@@ -101,18 +101,17 @@ class IdeaSelectView(discord.ui.View):
         if not hasattr(modal, 'result'):
             return
         
-        # Create the project
+        # Create the project and mark the idea as used - both or neither
         data = modal.result
-        project_id = await self.bot.db.create_project(
-            guild_id=interaction.guild.id,
-            title=data['title'],
-            description=data['description'],
-            owners=[interaction.user.id],
-            tags=data['tags']
-        )
-        
-        # Mark idea as used
-        await self.bot.db.mark_idea_used(idea_id, project_id)
+        async with self.bot.db.transaction(interaction.guild.id):
+            project_id = await self.bot.db.create_project(
+                guild_id=interaction.guild.id,
+                title=data['title'],
+                description=data['description'],
+                owners=[interaction.user.id],
+                tags=data['tags']
+            )
+            await self.bot.db.mark_idea_used(idea_id, project_id)
         
         # Send confirmation
         embed = discord.Embed(
@@ -311,11 +310,7 @@ class Ideas(commands.Cog):
             return
         
         # Delete from database
-        async with self.db.__class__(self.db.db_path) as db:
-            import aiosqlite
-            async with aiosqlite.connect(self.db.db_path) as conn:
-                await conn.execute("DELETE FROM ideas WHERE id = ?", (idea_id,))
-                await conn.commit()
+        await self.db.delete_idea(idea_id)
         
         await interaction.response.send_message(
             f"🗑️ Deleted idea: **{idea['title']}**",
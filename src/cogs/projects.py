@@ -6,11 +6,49 @@ Handles /project start, status, info, archive, checklist
 import discord
 from discord import app_commands
 from discord.ext import commands
-from typing import Optional, Literal
+from typing import Optional, Literal, Iterable, Iterator, Tuple, Dict
+import asyncio
+import io
 import logging
+import re
+import time
+
+from src.usage import BUDGET_EXHAUSTED
 
 logger = logging.getLogger('brrr.projects')
 
+# Seconds without clicks before checklist button toggles are committed (0 = commit every click)
+TOGGLE_BATCH_DELAY = 2.0
+
+# Largest checklist file /project checklist import will read, and the files it takes
+MAX_IMPORT_BYTES = 1024 * 1024
+IMPORT_EXTENSIONS = ('.txt', '.md')
+
+# Leading "- ", "* ", "1. ", "2) " and optional "[ ]" / "[x]" on a checklist line
+CHECKLIST_PREFIX = re.compile(r'^(?:[-*+]|\d+[.)])?\s*(?:\[([ xX])\])?\s*')
+
+
+def parse_checklist(lines: Iterable[str]) -> Iterator[Tuple[str, bool]]:
+    """Turn plain or markdown checklist lines into (label, is_done) pairs"""
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        match = CHECKLIST_PREFIX.match(line)
+        label = line[match.end():].strip()
+        if label:
+            yield label[:200], (match.group(1) or ' ').lower() == 'x'
+
+
+def checklist_file_problem(file: discord.Attachment) -> Optional[str]:
+    """Why an attachment can't be imported as a checklist (None if it can), from its metadata alone"""
+    content_type = (file.content_type or '').split(';')[0].strip().lower()
+    if not file.filename.lower().endswith(IMPORT_EXTENSIONS) and not content_type.startswith('text/'):
+        return "Only .txt or .md files can be imported!"
+    if file.size > MAX_IMPORT_BYTES:
+        return f"That file is too big! Max {MAX_IMPORT_BYTES // 1024} KB."
+    return None
+
 
 class ProjectModal(discord.ui.Modal, title="Start New Project"):
     """Modal for creating a new project"""
@@ -95,14 +133,47 @@ class ProjectSelectMenu(discord.ui.Select):
         await self.callback_func(interaction, int(self.values[0]))
 
 
+def build_checklist_embed(project_title: str, tasks: list) -> discord.Embed:
+    """Build the checklist embed shown by /project checklist list"""
+    done = sum(1 for t in tasks if t['is_done'])
+    
+    embed = discord.Embed(
+        title=f"📋 {project_title} - Tasks",
+        description=f"Progress: {done}/{len(tasks)} complete",
+        color=discord.Color.green() if done == len(tasks) else discord.Color.blue()
+    )
+    
+    task_list = []
+    for t in tasks:
+        emoji = "✅" if t['is_done'] else "⬜"
+        task_list.append(f"{emoji} {t['label']}")
+    
+    embed.add_field(name="Tasks", value="\n".join(task_list[:20]) or "No tasks", inline=False)
+    return embed
+
+
 class TaskToggleView(discord.ui.View):
-    """View with task toggle buttons"""
+    """
+    View with task toggle buttons.
+    
+    With a batch_delay, clicks only update the buttons straight away; the toggles are
+    committed together once nobody has clicked for batch_delay seconds, and the
+    message is then re-rendered from the database.
+    """
     
-    def __init__(self, tasks: list, project_id: int, db):
+    def __init__(self, tasks: list, project_id: int, db, project_title: str,
+                 batch_delay: float = TOGGLE_BATCH_DELAY):
         super().__init__(timeout=300)
         self.tasks = tasks
         self.project_id = project_id
+        self.project_title = project_title
         self.db = db
+        self.batch_delay = batch_delay
+        # task_id -> True if it has been clicked an odd number of times since the last commit
+        self._pending: Dict[int, bool] = {}
+        self._last_click = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._message: Optional[discord.Message] = None
         self._build_buttons()
     
     def _build_buttons(self):
@@ -116,16 +187,81 @@ class TaskToggleView(discord.ui.View):
                 custom_id=f"task_{task['id']}",
                 row=i // 5
             )
-            button.callback = self._make_callback(task['id'], i)
+            button.callback = self._make_callback(task['id'])
             self.add_item(button)
     
-    def _make_callback(self, task_id: int, index: int):
+    def _make_callback(self, task_id: int):
         async def callback(interaction: discord.Interaction):
-            await self.db.toggle_task(task_id)
-            self.tasks[index]['is_done'] = not self.tasks[index]['is_done']
+            if self.batch_delay <= 0:
+                updated = await self.db.toggle_task(task_id)
+                if updated:
+                    self._replace_task(updated)
+                self._build_buttons()
+                await interaction.response.edit_message(
+                    embed=build_checklist_embed(self.project_title, self.tasks),
+                    view=self
+                )
+                return
+            
+            # Optimistic update - committed once the clicking stops
+            self._pending[task_id] = not self._pending.get(task_id, False)
+            self._last_click = time.monotonic()
+            self._message = interaction.message
+            for task in self.tasks:
+                if task['id'] == task_id:
+                    task['is_done'] = not task['is_done']
             self._build_buttons()
             await interaction.response.edit_message(view=self)
+            
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush_when_quiet())
         return callback
+    
+    def _replace_task(self, updated: dict):
+        self.tasks = [updated if t['id'] == updated['id'] else t for t in self.tasks]
+    
+    async def _flush_when_quiet(self):
+        """Wait for a quiet period, then commit all pending toggles"""
+        try:
+            while self._pending:
+                while (delay := self._last_click + self.batch_delay - time.monotonic()) > 0:
+                    await asyncio.sleep(delay)
+                await self.flush()
+        finally:
+            self._flush_task = None
+    
+    async def flush(self):
+        """Commit pending toggles in one statement and re-render from the database"""
+        toggled = [task_id for task_id, flipped in self._pending.items() if flipped]
+        self._pending.clear()
+        
+        try:
+            if toggled:
+                await self.db.toggle_tasks(toggled)
+            self.tasks = await self.db.get_project_tasks(self.project_id)
+        except Exception as e:
+            logger.error(f"Failed to commit task toggles for project {self.project_id}: {e}", exc_info=True)
+            return
+        
+        # Clicks that landed while we were committing are still pending
+        for task in self.tasks:
+            if self._pending.get(task['id']):
+                task['is_done'] = not task['is_done']
+        
+        self._build_buttons()
+        if self._message:
+            try:
+                await self._message.edit(
+                    embed=build_checklist_embed(self.project_title, self.tasks),
+                    view=self
+                )
+            except discord.HTTPException as e:
+                logger.warning(f"Failed to re-render checklist for project {self.project_id}: {e}")
+    
+    async def on_timeout(self):
+        # Don't lose clicks made right before the view expired
+        if self._pending and self._flush_task is None:
+            await self.flush()
 
 
 class Projects(commands.Cog):
@@ -133,6 +269,8 @@ class Projects(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
+        if bot.jobs:
+            bot.jobs.register('project_plan', self.run_plan_job)
     
     @property
     def db(self):
@@ -157,24 +295,25 @@ class Projects(commands.Cog):
         
         data = modal.result
         
+        # Create the thread first, so the project is written once with its thread_id
+        # and a failed thread creation leaves no project behind
+        thread = None
+        if interaction.channel.type == discord.ChannelType.text:
+            thread = await interaction.channel.create_thread(
+                name=f"🚀 {data['title']}",
+                type=discord.ChannelType.public_thread
+            )
+        
         # Create the project
         project_id = await self.db.create_project(
             guild_id=interaction.guild.id,
             title=data['title'],
             description=data['description'],
             owners=[interaction.user.id],
+            thread_id=thread.id if thread else None,
             tags=data['tags']
         )
         
-        # Create thread for the project
-        thread = None
-        if interaction.channel.type == discord.ChannelType.text:
-            thread = await interaction.channel.create_thread(
-                name=f"🚀 {data['title']}",
-                type=discord.ChannelType.public_thread
-            )
-            await self.db.update_project(project_id, thread_id=thread.id)
-        
         # Build the project embed
         embed = discord.Embed(
             title=f"🚀 Project Started: {data['title']}",
@@ -215,28 +354,53 @@ class Projects(commands.Cog):
             )
             await thread.send(embed=thread_embed)
         
-        # Auto-generate tasks if LLM is available
-        if self.bot.llm and data['description']:
-            try:
-                tasks_text = await self.bot.llm.generate_project_plan(
-                    data['title'],
-                    data['description']
-                )
-                tasks = [t.strip() for t in tasks_text.strip().split('\n') if t.strip()]
-                
-                for task in tasks[:10]:  # Limit to 10 auto-tasks
-                    await self.db.create_task(project_id, task, interaction.user.id)
-                
-                if thread and tasks:
-                    tasks_embed = discord.Embed(
-                        title="📋 Auto-generated Checklist",
-                        description="\n".join(f"⬜ {t}" for t in tasks[:10]),
-                        color=discord.Color.blue()
-                    )
-                    tasks_embed.set_footer(text="Use /project checklist to manage these tasks")
-                    await thread.send(embed=tasks_embed)
-            except Exception as e:
-                logger.error(f"Failed to auto-generate tasks: {e}")
+        # Auto-generate tasks in the background if LLM is available - the job posts
+        # them to the thread when they're ready
+        if self.bot.jobs and data['description']:
+            await self.bot.jobs.enqueue('project_plan', interaction.guild.id, {
+                'project_id': project_id,
+                'guild_id': interaction.guild.id,
+                'user_id': interaction.user.id,
+                'title': data['title'],
+                'description': data['description'],
+                'thread_id': thread.id if thread else None
+            }, idempotency_key=f"project_plan:{project_id}")
+    
+    async def run_plan_job(self, job: Dict):
+        """
+        Generate a new project's checklist and post it to the project thread.
+        Projects that already have tasks are left alone, so a retry after the tasks
+        were saved can't add them twice.
+        """
+        if await self.db.get_project_tasks(job['project_id']):
+            return
+        budget = await self.bot.budget_level(job['guild_id'])
+        if budget >= BUDGET_EXHAUSTED:
+            logger.info(f"Skipping plan for project {job['project_id']} - daily budget used up")
+            return
+        
+        tasks_text = await self.bot.llm.generate_project_plan(
+            job['title'],
+            job['description'],
+            guild_id=job['guild_id'],
+            user_id=job['user_id'],
+            model=self.bot.budget_model(budget)
+        )
+        tasks = [t.strip() for t in tasks_text.strip().split('\n') if t.strip()][:10]  # Limit to 10 auto-tasks
+        if not tasks:
+            return
+        
+        await self.db.create_tasks(job['project_id'], tasks, job['user_id'])
+        
+        if job['thread_id']:
+            thread = self.bot.get_channel(job['thread_id']) or await self.bot.fetch_channel(job['thread_id'])
+            tasks_embed = discord.Embed(
+                title="📋 Auto-generated Checklist",
+                description="\n".join(f"⬜ {t}" for t in tasks),
+                color=discord.Color.blue()
+            )
+            tasks_embed.set_footer(text="Use /project checklist to manage these tasks")
+            await self.bot.outbound.send_embeds(thread, [tasks_embed])
     
     @project_group.command(name="status", description="List all projects")
     @app_commands.describe(filter="Filter by project status")
@@ -246,18 +410,33 @@ class Projects(commands.Cog):
         filter: Optional[Literal["active", "archived", "all"]] = "active"
     ):
         """Show all projects in the guild"""
-        if filter == "all":
-            projects = await self.db.get_guild_projects(interaction.guild.id)
-        else:
-            projects = await self.db.get_guild_projects(interaction.guild.id, status=filter)
+        guild_id = interaction.guild.id
+        version = await self.db.get_guild_version(guild_id)
         
-        if not projects:
+        embed_data = await self.bot.render_cache.get_or_render(
+            'project_status', guild_id, version, (filter,),
+            lambda: self._render_status(guild_id, filter)
+        )
+        
+        if embed_data is None:
             await interaction.response.send_message(
                 f"No {filter} projects found! Use `/project start` to create one. 🚀",
                 ephemeral=True
             )
             return
         
+        await interaction.response.send_message(embed=discord.Embed.from_dict(embed_data))
+    
+    async def _render_status(self, guild_id: int, filter: str) -> Optional[dict]:
+        """Build the /project status embed as a dict, or None if there are no projects"""
+        if filter == "all":
+            projects = await self.db.get_guild_projects(guild_id)
+        else:
+            projects = await self.db.get_guild_projects(guild_id, status=filter)
+        
+        if not projects:
+            return None
+        
         embed = discord.Embed(
             title=f"📊 Projects ({filter.capitalize()})",
             color=discord.Color.blue()
@@ -283,7 +462,7 @@ class Projects(commands.Cog):
         if len(projects) > 10:
             embed.set_footer(text=f"Showing 10 of {len(projects)} projects")
         
-        await interaction.response.send_message(embed=embed)
+        return embed.to_dict()
     
     @project_group.command(name="info", description="Get detailed project info")
     @app_commands.describe(project_id="Project ID to view")
@@ -393,6 +572,52 @@ class Projects(commands.Cog):
             ephemeral=True
         )
     
+    @checklist_group.command(name="import", description="Import many tasks from a list or a text/markdown file")
+    @app_commands.describe(
+        project_id="Project to import tasks into",
+        tasks="Tasks separated by ';'",
+        file="A .txt or .md checklist, one task per line"
+    )
+    async def checklist_import(
+        self,
+        interaction: discord.Interaction,
+        project_id: int,
+        tasks: Optional[str] = None,
+        file: Optional[discord.Attachment] = None
+    ):
+        """Bulk-import tasks into a project's checklist"""
+        project = await self.db.get_project(project_id)
+        
+        if not project or project['guild_id'] != interaction.guild.id:
+            await interaction.response.send_message("Project not found!", ephemeral=True)
+            return
+        
+        if not tasks and not file:
+            await interaction.response.send_message(
+                "Give me some tasks (separated by `;`) or attach a .txt/.md file!",
+                ephemeral=True
+            )
+            return
+        
+        problem = checklist_file_problem(file) if file else None
+        if problem:
+            await interaction.response.send_message(problem, ephemeral=True)
+            return
+        
+        await interaction.response.defer(ephemeral=True)
+        
+        lines: Iterable[str] = tasks.split(';') if tasks else []
+        if file:
+            data = await file.read()
+            lines = io.StringIO(data.decode('utf-8', errors='replace'))
+        
+        task_ids = await self.db.create_tasks(project_id, parse_checklist(lines), interaction.user.id)
+        
+        await interaction.followup.send(
+            f"✅ Imported {len(task_ids)} task(s) into **{project['title']}**",
+            ephemeral=True
+        )
+    
     @checklist_group.command(name="list", description="View and toggle project tasks")
     @app_commands.describe(project_id="Project to view tasks for")
     async def checklist_list(self, interaction: discord.Interaction, project_id: int):
@@ -412,30 +637,22 @@ class Projects(commands.Cog):
             )
             return
         
-        done = sum(1 for t in tasks if t['is_done'])
-        
-        embed = discord.Embed(
-            title=f"📋 {project['title']} - Tasks",
-            description=f"Progress: {done}/{len(tasks)} complete",
-            color=discord.Color.green() if done == len(tasks) else discord.Color.blue()
-        )
-        
-        task_list = []
-        for t in tasks:
-            emoji = "✅" if t['is_done'] else "⬜"
-            task_list.append(f"{emoji} {t['label']}")
-        
-        embed.add_field(name="Tasks", value="\n".join(task_list[:20]), inline=False)
-        
-        view = TaskToggleView(tasks, project_id, self.db)
+        embed = build_checklist_embed(project['title'], tasks)
+        view = TaskToggleView(tasks, project_id, self.db, project['title'])
         await interaction.response.send_message(embed=embed, view=view)
     
     @checklist_group.command(name="toggle", description="Toggle a task's completion status")
     @app_commands.describe(task_id="Task ID to toggle")
     async def checklist_toggle(self, interaction: discord.Interaction, task_id: int):
         """Toggle a specific task"""
-        await self.db.toggle_task(task_id)
-        await interaction.response.send_message(f"✅ Toggled task {task_id}!", ephemeral=True)
+        task = await self.db.toggle_task(task_id)
+        
+        if not task:
+            await interaction.response.send_message("Task not found!", ephemeral=True)
+            return
+        
+        state = "done ✅" if task['is_done'] else "not done ⬜"
+        await interaction.response.send_message(f"Task {task_id} is now {state}", ephemeral=True)
 
 
 async def setup(bot):
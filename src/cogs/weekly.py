@@ -5,10 +5,14 @@ Handles /week start and /week retro
 
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 from datetime import datetime
+from typing import Dict, Optional, Tuple
 import logging
 
+from src.storage import DEFAULT_TREND_WEEKS, iso_week
+from src.usage import BUDGET_EXHAUSTED
+
 logger = logging.getLogger('brrr.weekly')
 
 
@@ -42,30 +46,71 @@ class Weekly(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
+        # guild_id -> (data version, week key) of the latest snapshot we wrote
+        self._snapshotted: Dict[int, Tuple[int, str]] = {}
+        if bot.jobs:
+            bot.jobs.register('retro_summary', self.run_retro_job)
     
     @property
     def db(self):
         return self.bot.db
     
+    async def cog_load(self):
+        self.snapshot_job.start()
+    
+    async def cog_unload(self):
+        self.snapshot_job.cancel()
+    
+    async def refresh_snapshot(self, guild_id: int):
+        """Rewrite this week's snapshot if the guild's data changed since the last one"""
+        state = (await self.db.get_guild_version(guild_id), iso_week()[0])
+        if self._snapshotted.get(guild_id) != state:
+            await self.db.snapshot_week(guild_id)
+            self._snapshotted[guild_id] = state
+    
+    @tasks.loop(hours=1)
+    async def snapshot_job(self):
+        """Keep weekly snapshots current so the history exists even if nobody asks for it"""
+        for guild in self.bot.guilds:
+            try:
+                await self.refresh_snapshot(guild.id)
+            except Exception as e:
+                logger.error(f"Failed to snapshot guild {guild.id}: {e}")
+    
+    @snapshot_job.before_loop
+    async def before_snapshot_job(self):
+        await self.bot.wait_until_ready()
+    
     week_group = app_commands.Group(name="week", description="Weekly rhythm commands")
     
     @week_group.command(name="start", description="Start a new week with an overview")
     async def week_start(self, interaction: discord.Interaction):
         """Post weekly overview and start button"""
         
-        # Get active projects
-        active_projects = await self.db.get_guild_projects(
-            interaction.guild.id,
-            status='active'
+        guild_id = interaction.guild.id
+        week_num = datetime.utcnow().isocalendar()[1]
+        version = await self.db.get_guild_version(guild_id)
+        
+        # Keyed on the year too, so week 1 doesn't reuse last January's overview
+        embed = await self.bot.render_cache.get_embed(
+            'week_start', guild_id, version, (iso_week()[0],),
+            lambda: self.build_week_embed(guild_id, week_num)
         )
         
+        # Send with the start project button
+        view = WeekView()
+        await interaction.response.send_message(embed=embed, view=view)
+    
+    async def build_week_embed(self, guild_id: int, week_num: int) -> discord.Embed:
+        """Build the weekly overview embed"""
+        
+        # Get active projects
+        active_projects = await self.db.get_guild_projects(guild_id, status='active')
+        
         # Get unused ideas
-        ideas = await self.db.get_guild_ideas(interaction.guild.id, unused_only=True)
+        ideas = await self.db.get_guild_ideas(guild_id, unused_only=True)
         
         # Build the week overview embed
-        today = datetime.utcnow()
-        week_num = today.isocalendar()[1]
-        
         embed = discord.Embed(
             title=f"🗓️ Week {week_num} - Let's Go BRRRRRR!",
             description="New week, new opportunities to ship! Here's your overview.",
@@ -128,10 +173,7 @@ class Weekly(commands.Cog):
         )
         
         embed.set_footer(text="Click the button below to start a new project!")
-        
-        # Send with the start project button
-        view = WeekView()
-        await interaction.response.send_message(embed=embed, view=view)
+        return embed
     
     @week_group.command(name="retro", description="Run retrospective for active projects")
     async def week_retro(self, interaction: discord.Interaction):
@@ -170,16 +212,16 @@ class Weekly(commands.Cog):
             
             progress_pct = (done / total * 100) if total > 0 else 0
             
-            # Generate AI summary if available
-            ai_summary = None
-            if self.bot.llm and tasks:
-                try:
-                    ai_summary = await self.bot.llm.generate_retro_summary(
-                        project['title'],
-                        tasks
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to generate retro summary: {e}")
+            # AI summary in the background, posted to the project thread when ready -
+            # once per project per week, however often the retro is run
+            if self.bot.jobs and tasks:
+                await self.bot.jobs.enqueue('retro_summary', interaction.guild.id, {
+                    'project_id': project['id'],
+                    'guild_id': interaction.guild.id,
+                    'user_id': interaction.user.id,
+                    'title': project['title'],
+                    'channel_id': project.get('thread_id') or interaction.channel.id
+                }, idempotency_key=f"retro_summary:{project['id']}:{iso_week(today)[0]}")
             
             # Build project retro embed
             project_embed = discord.Embed(
@@ -218,14 +260,6 @@ class Weekly(commands.Cog):
                     inline=False
                 )
             
-            # AI Summary
-            if ai_summary:
-                project_embed.add_field(
-                    name="🤖 BRRR Bot Says",
-                    value=ai_summary,
-                    inline=False
-                )
-            
             # Retro prompts
             project_embed.add_field(
                 name="🤔 Reflect",
@@ -247,64 +281,142 @@ class Weekly(commands.Cog):
                 inline=True
             )
         
-        main_embed.set_footer(text="Individual project retros posted below!")
+        main_embed.set_footer(
+            text="Individual project retros posted below!"
+            + (" AI summaries follow in each project's thread." if self.bot.jobs else "")
+        )
         
         # Send main embed
         await interaction.followup.send(embed=main_embed)
         
-        # Send individual project retros
-        for embed in retro_results:
-            await interaction.channel.send(embed=embed)
+        # Send individual project retros, packed up to 10 per message
+        await self.bot.outbound.send_embeds(interaction.channel, retro_results)
     
-    @week_group.command(name="summary", description="Quick summary of the week's progress")
-    async def week_summary(self, interaction: discord.Interaction):
-        """Show a quick summary of all project progress"""
+    async def run_retro_job(self, job: Dict):
+        """Generate a project's retro summary and post it to its thread (or the retro channel)"""
+        tasks = await self.db.get_project_tasks(job['project_id'])
+        budget = await self.bot.budget_level(job['guild_id'])
+        if not tasks or budget >= BUDGET_EXHAUSTED:
+            return
         
-        active_projects = await self.db.get_guild_projects(
-            interaction.guild.id,
-            status='active'
+        summary = await self.bot.llm.generate_retro_summary(
+            job['title'],
+            tasks,
+            guild_id=job['guild_id'],
+            user_id=job['user_id'],
+            model=self.bot.budget_model(budget)
         )
         
-        archived_this_week = await self.db.get_guild_projects(
-            interaction.guild.id,
-            status='archived'
+        channel = self.bot.get_channel(job['channel_id']) or await self.bot.fetch_channel(job['channel_id'])
+        embed = discord.Embed(
+            title=f"🤖 BRRR Bot Says - {job['title']}",
+            description=summary,
+            color=discord.Color.purple()
         )
-        # Filter to this week (simplified - just last 7 days)
+        await self.bot.outbound.send_embeds(channel, [embed])
+    
+    @week_group.command(name="dashboard", description="Post a live dashboard that updates itself")
+    @app_commands.describe(remove="Stop updating the current dashboard instead")
+    async def week_dashboard(self, interaction: discord.Interaction, remove: Optional[bool] = False):
+        """Post (or move) the guild's live weekly dashboard to this channel"""
         
-        total_tasks = 0
-        completed_tasks = 0
+        if not interaction.user.guild_permissions.manage_guild:
+            await interaction.response.send_message(
+                "You need Manage Server to set up the dashboard!",
+                ephemeral=True
+            )
+            return
         
-        for project in active_projects:
-            tasks = await self.db.get_project_tasks(project['id'])
-            total_tasks += len(tasks)
-            completed_tasks += sum(1 for t in tasks if t['is_done'])
+        if remove:
+            await self.bot.dashboard.remove(interaction.guild.id)
+            await interaction.response.send_message("📌 Dashboard stopped.", ephemeral=True)
+            return
+        
+        await interaction.response.defer(ephemeral=True)
+        message = await self.bot.dashboard.post(interaction.guild.id, interaction.channel)
+        await interaction.followup.send(
+            f"📌 Live dashboard posted: {message.jump_url}\n"
+            "It updates whenever projects, tasks or ideas change - no need to run `/week start` again!",
+            ephemeral=True
+        )
+    
+    @week_group.command(name="summary", description="Quick summary of the week's progress")
+    @app_commands.describe(weeks="Weeks of history to show (default 4)")
+    async def week_summary(
+        self,
+        interaction: discord.Interaction,
+        weeks: Optional[app_commands.Range[int, 1, 12]] = DEFAULT_TREND_WEEKS
+    ):
+        """Show this week's progress and the trend over recent weeks"""
+        
+        guild_id = interaction.guild.id
+        version = await self.db.get_guild_version(guild_id)
+        
+        # Keyed on the week too - a rollover changes the summary without any write
+        embed = await self.bot.render_cache.get_embed(
+            'week_summary', guild_id, version, (weeks, iso_week()[0]),
+            lambda: self.build_summary_embed(guild_id, weeks)
+        )
+        await interaction.response.send_message(embed=embed)
+    
+    async def build_summary_embed(self, guild_id: int, weeks: int = DEFAULT_TREND_WEEKS) -> discord.Embed:
+        """Build the weekly progress summary embed from the snapshot table"""
+        
+        await self.refresh_snapshot(guild_id)
+        snapshots = await self.db.get_weekly_snapshots(guild_id, weeks=weeks + 1)
+        current = snapshots[0]
         
         embed = discord.Embed(
-            title="📈 Weekly Progress Summary",
+            title=f"📈 Weekly Progress Summary ({current['week']})",
             color=discord.Color.blue()
         )
         
         embed.add_field(
             name="Active Projects",
-            value=str(len(active_projects)),
+            value=str(current['active_projects']),
             inline=True
         )
         
         embed.add_field(
             name="Tasks Done",
-            value=f"{completed_tasks}/{total_tasks}",
+            value=f"{current['tasks_done']}/{current['tasks_total']}",
             inline=True
         )
         
-        if total_tasks > 0:
-            progress = completed_tasks / total_tasks * 100
+        if current['tasks_total'] > 0:
+            progress = current['tasks_done'] / current['tasks_total'] * 100
             embed.add_field(
                 name="Completion Rate",
                 value=f"{progress:.1f}%",
                 inline=True
             )
         
-        await interaction.response.send_message(embed=embed)
+        embed.add_field(
+            name="This Week",
+            value=f"🆕 {current['projects_created']} started • "
+                  f"📦 {current['projects_archived']} archived • "
+                  f"💡 {current['ideas_added']} ideas",
+            inline=False
+        )
+        
+        history = snapshots[1:]
+        if history:
+            lines = []
+            for snap in reversed(history):
+                total = snap['tasks_total']
+                pct = snap['tasks_done'] / total * 100 if total else 0
+                bar = "🟩" * int(pct / 20) + "⬜" * (5 - int(pct / 20))
+                lines.append(
+                    f"`{snap['week']}` {bar} {snap['tasks_done']}/{total} "
+                    f"• 🆕 {snap['projects_created']} • 📦 {snap['projects_archived']}"
+                )
+            embed.add_field(
+                name=f"📊 Last {len(history)} Week(s)",
+                value="\n".join(lines),
+                inline=False
+            )
+        
+        return embed
 
 
 async def setup(bot):
@@ -0,0 +1,142 @@
+"""
+BRRR Bot - Live Weekly Dashboard
+One message per guild that is edited in place whenever the guild's data changes
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import discord
+from discord.ext import tasks
+
+from src.metrics import metrics
+from src.storage import DEFAULT_TREND_WEEKS, iso_week
+
+logger = logging.getLogger('brrr.dashboard')
+
+
+class DashboardManager:
+    """
+    Keeps each guild's dashboard message in sync with its data.
+
+    Writes only schedule an update; all writes within min_interval of the last edit
+    are folded into a single edit, and edits go through the outbound scheduler.
+    """
+
+    def __init__(self, bot, min_interval: float = 15.0):
+        self.bot = bot
+        self.min_interval = min_interval
+        # guild_id -> (channel_id, message_id)
+        self._dashboards: Dict[int, Tuple[int, int]] = {}
+        # guild_id -> (data version, ISO week key) the message currently shows
+        self._rendered: Dict[int, Tuple[int, str]] = {}
+        self._last_edit: Dict[int, float] = {}
+        self._pending: Dict[int, asyncio.Task] = {}
+
+    async def load(self):
+        """Load dashboard locations and start the hourly refresh (catches week rollovers)"""
+        self._dashboards = await self.bot.db.get_dashboards()
+        self.bot.db.add_write_listener(self.notify)
+        self.refresh_all.start()
+        logger.info(f"Loaded {len(self._dashboards)} dashboard(s)")
+
+    def stop(self):
+        self.refresh_all.cancel()
+        for task in self._pending.values():
+            task.cancel()
+
+    async def build_embeds(self, guild_id: int) -> List[discord.Embed]:
+        """Week overview + progress summary, served from the render cache when unchanged"""
+        weekly = self.bot.get_cog('Weekly')
+        week_num = datetime.utcnow().isocalendar()[1]
+        version = await self.bot.db.get_guild_version(guild_id)
+
+        overview = await self.bot.render_cache.get_embed(
+            'week_start', guild_id, version, (iso_week()[0],),
+            lambda: weekly.build_week_embed(guild_id, week_num)
+        )
+        summary = await self.bot.render_cache.get_embed(
+            'week_summary', guild_id, version, (DEFAULT_TREND_WEEKS, iso_week()[0]),
+            lambda: weekly.build_summary_embed(guild_id, DEFAULT_TREND_WEEKS)
+        )
+        overview.set_footer(text="📌 Live dashboard - updates automatically")
+        summary.timestamp = datetime.utcnow()
+        return [overview, summary]
+
+    async def post(self, guild_id: int, channel: discord.abc.Messageable) -> discord.Message:
+        """Post a new dashboard message, replacing the guild's previous one"""
+        embeds = await self.build_embeds(guild_id)
+        message = (await self.bot.outbound.send_embeds(channel, embeds))[0]
+
+        await self.bot.db.get_guild_config(guild_id)  # Make sure the row exists
+        await self.bot.db.update_guild_config(
+            guild_id,
+            dashboard_channel_id=channel.id,
+            dashboard_message_id=message.id
+        )
+        self._dashboards[guild_id] = (channel.id, message.id)
+        # The config write bumped the version, but the message is already current
+        self._rendered[guild_id] = (await self.bot.db.get_guild_version(guild_id), iso_week()[0])
+        self._last_edit[guild_id] = time.monotonic()
+        return message
+
+    async def remove(self, guild_id: int):
+        """Stop updating the guild's dashboard"""
+        self._dashboards.pop(guild_id, None)
+        self._rendered.pop(guild_id, None)
+        await self.bot.db.update_guild_config(guild_id, dashboard_channel_id=None, dashboard_message_id=None)
+
+    def notify(self, guild_id: int):
+        """Database write listener - schedule an update if the guild has a dashboard"""
+        if guild_id in self._dashboards and guild_id not in self._pending:
+            self._pending[guild_id] = asyncio.create_task(self._update_later(guild_id))
+
+    async def _update_later(self, guild_id: int):
+        try:
+            # Debounce - everything written until then lands in the same edit
+            delay = self._last_edit.get(guild_id, 0) + self.min_interval - time.monotonic()
+            await asyncio.sleep(max(delay, 1.0))
+        finally:
+            self._pending.pop(guild_id, None)
+        await self.refresh(guild_id)
+
+    async def refresh(self, guild_id: int):
+        """Edit the dashboard if the data or the week changed since it was rendered"""
+        location = self._dashboards.get(guild_id)
+        if not location:
+            return
+
+        state = (await self.bot.db.get_guild_version(guild_id), iso_week()[0])
+        if self._rendered.get(guild_id) == state:
+            return
+
+        channel = self.bot.get_channel(location[0])
+        if channel is None:
+            return
+
+        try:
+            embeds = await self.build_embeds(guild_id)
+            await self.bot.outbound.edit(channel.get_partial_message(location[1]), embeds=embeds)
+        except discord.NotFound:
+            logger.info(f"Dashboard message for guild {guild_id} was deleted - disabling")
+            await self.remove(guild_id)
+            return
+        except discord.HTTPException as e:
+            logger.warning(f"Failed to update dashboard for guild {guild_id}: {e}")
+            return
+
+        self._rendered[guild_id] = state
+        self._last_edit[guild_id] = time.monotonic()
+        metrics.incr('dashboard.edits')
+
+    @tasks.loop(hours=1)
+    async def refresh_all(self):
+        for guild_id in list(self._dashboards):
+            await self.refresh(guild_id)
+
+    @refresh_all.before_loop
+    async def before_refresh_all(self):
+        await self.bot.wait_until_ready()
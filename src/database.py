@@ -4,103 +4,634 @@ SQLite database with aiosqlite for async operations
 """
 
 import aiosqlite
+import asyncio
 import json
-from datetime import datetime
+import logging
+import os
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Tuple, Union, Callable, AsyncIterator, AsyncIterable
 
+from src.guild_db_pool import GuildConnectionPool
+from src.storage import Storage, DEFAULT_TREND_WEEKS, to_epoch, utc_now, iso_week
 
-class Database:
-    def __init__(self, db_path: str = "data/brrr.db"):
+logger = logging.getLogger('brrr.database')
+
+# Schema changes to existing tables, applied in order by init(). PRAGMA user_version
+# records how many have run. New tables just go in init() as CREATE TABLE IF NOT EXISTS.
+MIGRATIONS: List[List[str]] = [
+    # 1: live weekly dashboard message per guild
+    [
+        "ALTER TABLE guild_config ADD COLUMN dashboard_channel_id INTEGER",
+        "ALTER TABLE guild_config ADD COLUMN dashboard_message_id INTEGER",
+    ],
+    # 2: integer epoch timestamps next to the ISO text ones, for indexed range queries.
+    # Existing rows are filled in by _backfill_timestamps().
+    [
+        "ALTER TABLE projects ADD COLUMN created_ts INTEGER",
+        "ALTER TABLE projects ADD COLUMN archived_ts INTEGER",
+        "ALTER TABLE tasks ADD COLUMN created_ts INTEGER",
+        "ALTER TABLE ideas ADD COLUMN created_ts INTEGER",
+        "ALTER TABLE user_memories ADD COLUMN created_ts INTEGER",
+        "ALTER TABLE user_memories ADD COLUMN updated_ts INTEGER",
+        "ALTER TABLE conversation_history ADD COLUMN created_ts INTEGER",
+        "CREATE INDEX IF NOT EXISTS idx_projects_guild_created ON projects (guild_id, created_ts)",
+        "CREATE INDEX IF NOT EXISTS idx_projects_guild_archived ON projects (guild_id, archived_ts)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_project ON tasks (project_id, created_ts)",
+        "CREATE INDEX IF NOT EXISTS idx_ideas_guild_created ON ideas (guild_id, created_ts)",
+        "CREATE INDEX IF NOT EXISTS idx_history_created ON conversation_history (created_ts)",
+        "CREATE INDEX IF NOT EXISTS idx_history_context ON conversation_history (user_id, guild_id, channel_id, created_ts)",
+    ],
+]
+
+# (table, text column, epoch column) pairs kept in sync
+TIMESTAMP_COLUMNS = [
+    ('projects', 'created_at', 'created_ts'),
+    ('projects', 'archived_at', 'archived_ts'),
+    ('tasks', 'created_at', 'created_ts'),
+    ('ideas', 'created_at', 'created_ts'),
+    ('user_memories', 'created_at', 'created_ts'),
+    ('user_memories', 'updated_at', 'updated_ts'),
+    ('conversation_history', 'created_at', 'created_ts'),
+]
+
+
+# With per-guild database files, ids come from these tables in the main file - which
+# keeps them unique across guilds and records which guild's file holds each row
+ROUTE_TABLES = {
+    'project': 'project_routes',
+    'task': 'task_routes',
+    'idea': 'idea_routes',
+}
+# Routes held in memory (they never change once written)
+ROUTE_CACHE_SIZE = 10000
+
+# Tables whose aged rows the cold tier takes, in copy order
+COLD_TABLES = ['projects', 'tasks', 'conversation_history']
+
+# Columns that identify an already-copied row in cold tables that renumber their ids
+MOVE_KEY_COLUMNS = {
+    'conversation_history': ['created_ts', 'guild_id', 'channel_id', 'user_id', 'role', 'content'],
+}
+
+COLD_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS cold.idx_cold_tasks_project ON tasks (project_id)",
+    "CREATE INDEX IF NOT EXISTS cold.idx_cold_history_created ON conversation_history (created_ts)",
+]
+
+
+# Guild export records: (record type, table, filter selecting the guild's rows)
+EXPORT_TABLES = [
+    ('project', 'projects', "guild_id = ?"),
+    ('task', 'tasks', "project_id IN (SELECT id FROM {schema}.projects WHERE guild_id = ?)"),
+    ('idea', 'ideas', "guild_id = ?"),
+    ('memory', 'user_memories', "guild_id = ?"),
+]
+
+# (table, column) pairs that may hold zlib-compressed text, see pack_text()
+COMPRESSED_COLUMNS = [
+    ('conversation_history', 'content'),
+    ('projects', 'description'),
+]
+
+
+def pack_text(text: Optional[str], threshold: Optional[int]) -> Union[str, bytes, None]:
+    """
+    Compress text of at least `threshold` UTF-8 bytes. The result is stored as a BLOB in
+    the TEXT column; shorter text, or text that doesn't shrink, is stored as-is.
+    """
+    if text is None or not threshold:
+        return text
+    raw = text.encode('utf-8')
+    if len(raw) < threshold:
+        return text
+    packed = zlib.compress(raw, 6)
+    return packed if len(packed) < len(raw) else text
+
+
+def unpack_text(value: Union[str, bytes, None]) -> Optional[str]:
+    """Reverse pack_text() - BLOBs are compressed, anything else is plain text"""
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode('utf-8')
+    return value
+
+
+class _JoinedConnection:
+    """
+    A unit of work's connection as handed to the methods running inside it. Their
+    commits are deferred to the end of the unit, and leaving it doesn't close anything.
+    """
+    
+    def __init__(self, conn: aiosqlite.Connection):
+        object.__setattr__(self, '_conn', conn)
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+    
+    async def commit(self):
+        pass
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        self._conn.row_factory = None
+
+
+class Database(Storage):
+    """SQLite storage - one file, optionally split per guild and tiered into a cold file"""
+    
+    def __init__(self, db_path: str = "data/brrr.db", busy_timeout: float = 10.0,
+                 cold_path: Optional[str] = None, compress_threshold: Optional[int] = 512,
+                 guild_db_dir: Optional[str] = None, guild_db_max_open: int = 64):
+        super().__init__()
         self.db_path = db_path
+        # Chat history and project descriptions of at least this many bytes are stored
+        # compressed; None or 0 stores everything as plain text
+        self.compress_threshold = compress_threshold
+        # Separate file for archived projects and aged history; None disables tiering
+        self.cold_path = cold_path
+        self._cold_ready = False
+        # Seconds a writer waits for another process's lock before giving up
+        self.busy_timeout = busy_timeout
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        # Per-guild data files; None keeps every guild in db_path. Bot state, guild config
+        # and the id routes always stay in db_path.
+        self.guild_pool: Optional[GuildConnectionPool] = None
+        if guild_db_dir:
+            self.guild_pool = GuildConnectionPool(
+                guild_db_dir, self._init_guild_schema, max_open=guild_db_max_open, busy_timeout=busy_timeout
+            )
+        # (kind, id) -> guild_id
+        self._routes: "OrderedDict[Tuple[str, int], int]" = OrderedDict()
+    
+    def _connect(self, guild_id: Optional[int] = None):
+        """
+        Open a connection that waits on locks held by other shard processes.
+        With per-guild files, a guild_id borrows that guild's pooled connection instead.
+        Inside a transaction() on the same file, joins the transaction's connection.
+        """
+        unit = self._current_unit(self._file_key(guild_id))
+        if unit is not None:
+            return _JoinedConnection(unit.conn)
+        if self.guild_pool is not None and guild_id is not None:
+            return self.guild_pool.connection(guild_id)
+        return self._connect_file(self.db_path)
+    
+    def _file_key(self, guild_id: Optional[int]) -> str:
+        """Path of the hot file _connect(guild_id) opens"""
+        if self.guild_pool is not None and guild_id is not None:
+            return self.guild_pool.path(guild_id)
+        return self.db_path
+    
+    def _connect_file(self, path: str):
+        """Open a fresh connection to a specific data file"""
+        return aiosqlite.connect(path, timeout=self.busy_timeout)
+    
+    @asynccontextmanager
+    async def transaction(self, guild_id: Optional[int] = None):
+        """
+        Run the current task's calls on the guild's file (the main file without per-guild
+        files) as one transaction, committed once at the end and rolled back on error
+        """
+        key = self._file_key(guild_id)
+        if self._current_unit(key) is not None:
+            yield
+            return
+        async with self._connect(guild_id) as db:
+            # Take the write lock up front rather than failing to upgrade a read lock later
+            await db.execute("BEGIN IMMEDIATE")
+            unit, token = self._begin_unit(key, db)
+            committed = False
+            try:
+                yield
+                await db.commit()
+                committed = True
+            finally:
+                if not committed:
+                    await db.rollback()
+                self._end_unit(unit, token, committed)
+    
+    def _hot_paths(self) -> List[str]:
+        """The main file plus every per-guild file"""
+        return [self.db_path] + (self.guild_pool.paths() if self.guild_pool else [])
+    
+    def data_files(self) -> List[str]:
+        """Every file holding bot data - main, per-guild and cold tier"""
+        return self._hot_paths() + ([self.cold_path] if self.has_cold_tier() else [])
+    
+    async def close(self):
+        """Close pooled per-guild connections"""
+        if self.guild_pool:
+            await self.guild_pool.close()
+    
+    @asynccontextmanager
+    async def _connect_cold(self, path: str = None):
+        """Open a connection to a hot file (main by default) with the cold tier ATTACHed as `cold`"""
+        async with self._connect_file(path or self.db_path) as db:
+            await db.execute("ATTACH DATABASE ? AS cold", (self.cold_path,))
+            if not self._cold_ready:
+                await self._init_cold_schema(db)
+                self._cold_ready = True
+            yield db
+    
+    def has_cold_tier(self) -> bool:
+        """Whether there is a cold tier to read from"""
+        return bool(self.cold_path) and os.path.exists(self.cold_path)
         
     async def init(self):
         """Initialize database tables"""
-        async with aiosqlite.connect(self.db_path) as db:
-            # Projects table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS projects (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER NOT NULL,
-                    title TEXT NOT NULL,
-                    description TEXT,
-                    owners TEXT DEFAULT '[]',
-                    status TEXT DEFAULT 'active',
-                    thread_id INTEGER,
-                    created_at TEXT NOT NULL,
-                    archived_at TEXT,
-                    tags TEXT DEFAULT '[]',
-                    template TEXT
-                )
-            """)
+        async with self._connect() as db:
+            # WAL lets readers run alongside the single writer, across processes too.
+            # It's persistent, so setting it once here covers every later connection.
+            await db.execute("PRAGMA journal_mode=WAL")
+            await self._create_tables(db)
             
-            # Tasks table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    project_id INTEGER NOT NULL,
-                    label TEXT NOT NULL,
-                    is_done INTEGER DEFAULT 0,
-                    created_by INTEGER,
-                    created_at TEXT NOT NULL,
-                    FOREIGN KEY (project_id) REFERENCES projects(id)
-                )
-            """)
+            # Id routes for per-guild files - only ever written in the main file
+            for table in ROUTE_TABLES.values():
+                await db.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        guild_id INTEGER NOT NULL
+                    )
+                """)
             
-            # Ideas table
+            # Durable LLM job queue - main file only, so every shard process polls one table
             await db.execute("""
-                CREATE TABLE IF NOT EXISTS ideas (
+                CREATE TABLE IF NOT EXISTS llm_jobs (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER NOT NULL,
-                    author_id INTEGER NOT NULL,
-                    title TEXT NOT NULL,
-                    description TEXT,
-                    tags TEXT DEFAULT '[]',
-                    used_project_id INTEGER,
-                    created_at TEXT NOT NULL
+                    kind TEXT NOT NULL,
+                    guild_id INTEGER,
+                    idempotency_key TEXT UNIQUE,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 3,
+                    run_after REAL NOT NULL,
+                    lease_owner TEXT,
+                    lease_until REAL,
+                    last_error TEXT,
+                    created_ts INTEGER NOT NULL,
+                    updated_ts INTEGER NOT NULL
                 )
             """)
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_llm_jobs_ready ON llm_jobs (status, run_after)")
             
-            # Guild config table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS guild_config (
-                    guild_id INTEGER PRIMARY KEY,
-                    projects_channel_id INTEGER,
-                    admin_roles TEXT DEFAULT '[]',
-                    thread_mode TEXT DEFAULT 'auto'
-                )
-            """)
+            await db.commit()
             
-            # User memories table - stores info about each user for the bot to remember
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS user_memories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    guild_id INTEGER NOT NULL,
-                    memory_key TEXT NOT NULL,
-                    memory_value TEXT NOT NULL,
-                    context TEXT,
-                    created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL,
-                    UNIQUE(user_id, guild_id, memory_key)
+            await self._migrate(db)
+    
+    async def _init_guild_schema(self, db):
+        """Bring a per-guild file's schema up to date - run once per file per process"""
+        await db.execute("PRAGMA journal_mode=WAL")
+        await self._create_tables(db)
+        await db.commit()
+        # Guild files only ever hold rows written with both timestamps and compression
+        await self._migrate(db, backfill=False)
+    
+    async def _create_tables(self, db):
+        """Create the data tables that don't exist yet"""
+        # Projects table
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS projects (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                description TEXT,
+                owners TEXT DEFAULT '[]',
+                status TEXT DEFAULT 'active',
+                thread_id INTEGER,
+                created_at TEXT NOT NULL,
+                archived_at TEXT,
+                tags TEXT DEFAULT '[]',
+                template TEXT
+            )
+        """)
+        
+        # Tasks table
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id INTEGER NOT NULL,
+                label TEXT NOT NULL,
+                is_done INTEGER DEFAULT 0,
+                created_by INTEGER,
+                created_at TEXT NOT NULL,
+                FOREIGN KEY (project_id) REFERENCES projects(id)
+            )
+        """)
+        
+        # Ideas table
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS ideas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                author_id INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                description TEXT,
+                tags TEXT DEFAULT '[]',
+                used_project_id INTEGER,
+                created_at TEXT NOT NULL
+            )
+        """)
+        
+        # Guild config table
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS guild_config (
+                guild_id INTEGER PRIMARY KEY,
+                projects_channel_id INTEGER,
+                admin_roles TEXT DEFAULT '[]',
+                thread_mode TEXT DEFAULT 'auto'
+            )
+        """)
+        
+        # User memories table - stores info about each user for the bot to remember
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS user_memories (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                guild_id INTEGER NOT NULL,
+                memory_key TEXT NOT NULL,
+                memory_value TEXT NOT NULL,
+                context TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                UNIQUE(user_id, guild_id, memory_key)
+            )
+        """)
+        
+        # Conversation history for context
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS conversation_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                guild_id INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+        
+        # Bot state - small key/value store for things like the command tree hash
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS bot_state (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        
+        # Per-guild data version - bumped by every write to guild data
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS guild_versions (
+                guild_id INTEGER PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        
+        # Weekly snapshots - one guild-wide row (project_id = 0) plus one row per
+        # project per ISO week, so trends never have to scan the raw tables
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS weekly_snapshots (
+                guild_id INTEGER NOT NULL,
+                week TEXT NOT NULL,
+                project_id INTEGER NOT NULL DEFAULT 0,
+                tasks_done INTEGER NOT NULL DEFAULT 0,
+                tasks_total INTEGER NOT NULL DEFAULT 0,
+                active_projects INTEGER NOT NULL DEFAULT 0,
+                projects_created INTEGER NOT NULL DEFAULT 0,
+                projects_archived INTEGER NOT NULL DEFAULT 0,
+                ideas_added INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (guild_id, project_id, week)
+            )
+        """)
+    
+        # LLM usage - token and latency totals per day, user and call type
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS llm_usage (
+                guild_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                user_id INTEGER NOT NULL DEFAULT 0,
+                call_type TEXT NOT NULL,
+                calls INTEGER NOT NULL DEFAULT 0,
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                cached_tokens INTEGER NOT NULL DEFAULT 0,
+                latency_ms REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, day, user_id, call_type)
+            )
+        """)
+    
+    async def _migrate(self, db, backfill: bool = True):
+        """Apply pending schema migrations"""
+        # IMMEDIATE so two shard processes starting together don't both migrate
+        await db.execute("BEGIN IMMEDIATE")
+        cursor = await db.execute("PRAGMA user_version")
+        version = (await cursor.fetchone())[0]
+        for statements in MIGRATIONS[version:]:
+            for statement in statements:
+                await db.execute(statement)
+        await db.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+        await db.commit()
+        
+        if backfill:
+            await self._backfill_timestamps(db)
+            await self._compress_existing(db)
+    
+    async def _backfill_timestamps(self, db, batch_size: int = 1000):
+        """Fill epoch columns from the ISO text ones, in short transactions"""
+        for table, text_column, epoch_column in TIMESTAMP_COLUMNS:
+            filled = 0
+            while True:
+                # Unparseable text becomes 0 so the row isn't picked up again
+                cursor = await db.execute(f"""
+                    UPDATE {table} SET {epoch_column} = COALESCE(CAST(strftime('%s', {text_column}) AS INTEGER), 0)
+                    WHERE rowid IN (
+                        SELECT rowid FROM {table}
+                        WHERE {epoch_column} IS NULL AND {text_column} IS NOT NULL
+                        LIMIT ?
+                    )
+                """, (batch_size,))
+                await db.commit()
+                if cursor.rowcount <= 0:
+                    break
+                filled += cursor.rowcount
+            if filled:
+                logger.info(f"Backfilled {filled} {table}.{epoch_column} value(s)")
+    
+    async def _compress_existing(self, db, batch_size: int = 500):
+        """Compress rows written before compression was enabled, resuming where the last run stopped"""
+        if not self.compress_threshold:
+            return
+        for table, column in COMPRESSED_COLUMNS:
+            state_key = f"compressed_through:{table}.{column}"
+            cursor = await db.execute("SELECT value FROM bot_state WHERE key = ?", (state_key,))
+            row = await cursor.fetchone()
+            last_id = int(row[0]) if row else 0
+            compressed = 0
+            while True:
+                cursor = await db.execute(
+                    f"SELECT id, {column} FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
                 )
-            """)
-            
-            # Conversation history for context
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS conversation_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    guild_id INTEGER NOT NULL,
-                    channel_id INTEGER NOT NULL,
-                    role TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    created_at TEXT NOT NULL
+                rows = await cursor.fetchall()
+                if not rows:
+                    break
+                updates = []
+                for row_id, value in rows:
+                    if isinstance(value, str):
+                        packed = pack_text(value, self.compress_threshold)
+                        if isinstance(packed, bytes):
+                            updates.append((packed, row_id))
+                await db.executemany(f"UPDATE {table} SET {column} = ? WHERE id = ?", updates)
+                last_id = rows[-1][0]
+                await db.execute("""
+                    INSERT INTO bot_state (key, value, updated_at) VALUES (?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+                """, (state_key, str(last_id), datetime.utcnow().isoformat()))
+                await db.commit()
+                compressed += len(updates)
+            if compressed:
+                logger.info(f"Compressed {compressed} existing {table}.{column} value(s)")
+    
+    # ============ GUILD ROUTING METHODS ============
+    
+    def _remember_route(self, kind: str, item_id: int, guild_id: int):
+        self._routes[(kind, item_id)] = guild_id
+        self._routes.move_to_end((kind, item_id))
+        while len(self._routes) > ROUTE_CACHE_SIZE:
+            self._routes.popitem(last=False)
+    
+    async def _allocate_ids(self, kind: str, guild_id: Optional[int], count: int = 1) -> List[Optional[int]]:
+        """
+        Reserve ids for new rows owned by a guild and record the route. Without per-guild
+        files the tables number their own rows, so this returns Nones for them to fill in.
+        """
+        if self.guild_pool is None or guild_id is None:
+            return [None] * count
+        if count <= 0:
+            return []
+        async with self._connect() as db:
+            if not db.in_transaction:
+                await db.execute("BEGIN IMMEDIATE")
+            await db.executemany(
+                f"INSERT INTO {ROUTE_TABLES[kind]} (guild_id) VALUES (?)",
+                [(guild_id,)] * count
+            )
+            cursor = await db.execute("SELECT last_insert_rowid()")
+            last_id = (await cursor.fetchone())[0]
+            await db.commit()
+        ids = list(range(last_id - count + 1, last_id + 1))
+        for item_id in ids:
+            self._remember_route(kind, item_id, guild_id)
+        return ids
+    
+    async def _route(self, kind: str, item_id: int) -> Optional[int]:
+        """
+        Guild whose file holds a project, task or idea. None without per-guild files
+        (or for unknown ids), which makes _connect() use the main file.
+        """
+        if self.guild_pool is None:
+            return None
+        key = (kind, item_id)
+        if key in self._routes:
+            self._routes.move_to_end(key)
+            return self._routes[key]
+        async with self._connect() as db:
+            cursor = await db.execute(f"SELECT guild_id FROM {ROUTE_TABLES[kind]} WHERE id = ?", (item_id,))
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        self._remember_route(kind, item_id, row[0])
+        return row[0]
+    
+    async def _group_by_route(self, kind: str, item_ids: Iterable[int]) -> Dict[Optional[int], List[int]]:
+        groups: Dict[Optional[int], List[int]] = {}
+        for item_id in item_ids:
+            groups.setdefault(await self._route(kind, item_id), []).append(item_id)
+        return groups
+    
+    # ============ DATA VERSION METHODS ============
+    
+    async def get_guild_version(self, guild_id: int) -> int:
+        """Get the guild's data version - served from memory after the first call"""
+        if guild_id not in self._versions:
+            async with self._connect(guild_id) as db:
+                cursor = await db.execute(
+                    "SELECT version FROM guild_versions WHERE guild_id = ?",
+                    (guild_id,)
                 )
-            """)
-            
+                row = await cursor.fetchone()
+                # Our own writes may have landed while we were reading
+                self._versions.setdefault(guild_id, row[0] if row else 0)
+        return self._versions[guild_id]
+    
+    async def _bump_version(self, db, guild_id: int):
+        """Bump a guild's data version inside the caller's transaction"""
+        cursor = await db.execute("""
+            INSERT INTO guild_versions (guild_id, version) VALUES (?, 1)
+            ON CONFLICT(guild_id) DO UPDATE SET version = version + 1
+            RETURNING version
+        """, (guild_id,))
+        row = await cursor.fetchone()
+        self._set_version(guild_id, row[0])
+    
+    async def _bump_version_for_project(self, db, project_id: int):
+        """Bump the data version of the guild owning a project"""
+        await self._bump_version_for_projects(db, [project_id])
+    
+    async def _bump_version_for_projects(self, db, project_ids: List[int]):
+        """Bump the data versions of the guilds owning some projects"""
+        placeholders = ", ".join("?" for _ in project_ids)
+        cursor = await db.execute(f"""
+            INSERT INTO guild_versions (guild_id, version)
+            SELECT DISTINCT guild_id, 1 FROM main.projects WHERE id IN ({placeholders})
+            ON CONFLICT(guild_id) DO UPDATE SET version = version + 1
+            RETURNING guild_id, version
+        """, list(project_ids))
+        for guild_id, version in await cursor.fetchall():
+            self._set_version(guild_id, version)
+    
+    async def _bump_version_for_tasks(self, db, task_ids: List[int]):
+        """Bump the data versions of the guilds owning some tasks"""
+        placeholders = ", ".join("?" for _ in task_ids)
+        cursor = await db.execute(f"""
+            INSERT INTO guild_versions (guild_id, version)
+            SELECT DISTINCT guild_id, 1 FROM projects
+            WHERE id IN (SELECT project_id FROM tasks WHERE id IN ({placeholders}))
+            ON CONFLICT(guild_id) DO UPDATE SET version = version + 1
+            RETURNING guild_id, version
+        """, list(task_ids))
+        for guild_id, version in await cursor.fetchall():
+            self._set_version(guild_id, version)
+    
+    # ============ BOT STATE METHODS ============
+    
+    async def get_state(self, key: str) -> Optional[str]:
+        """Get a bot state value"""
+        async with self._connect() as db:
+            cursor = await db.execute("SELECT value FROM bot_state WHERE key = ?", (key,))
+            row = await cursor.fetchone()
+            return row[0] if row else None
+    
+    async def set_state(self, key: str, value: str) -> bool:
+        """Set a bot state value"""
+        async with self._connect() as db:
+            await db.execute("""
+                INSERT INTO bot_state (key, value, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+            """, (key, value, datetime.utcnow().isoformat()))
             await db.commit()
+            return True
     
     # ============ PROJECT METHODS ============
     
@@ -108,43 +639,48 @@ class Database:
                             owners: List[int] = None, thread_id: int = None,
                             tags: List[str] = None, template: str = None) -> int:
         """Create a new project and return its ID"""
-        async with aiosqlite.connect(self.db_path) as db:
+        now, now_ts = utc_now()
+        (project_id,) = await self._allocate_ids('project', guild_id)
+        async with self._connect(guild_id) as db:
             cursor = await db.execute("""
-                INSERT INTO projects (guild_id, title, description, owners, thread_id, tags, template, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO projects (id, guild_id, title, description, owners, thread_id, tags, template,
+                                      created_at, created_ts)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
-                guild_id, title, description,
+                project_id, guild_id, title, pack_text(description, self.compress_threshold),
                 json.dumps(owners or []),
                 thread_id,
                 json.dumps(tags or []),
                 template,
-                datetime.utcnow().isoformat()
+                now, now_ts
             ))
+            await self._bump_version(db, guild_id)
             await db.commit()
             return cursor.lastrowid
     
     async def get_project(self, project_id: int) -> Optional[Dict[str, Any]]:
         """Get a project by ID"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect(await self._route('project', project_id)) as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute("SELECT * FROM projects WHERE id = ?", (project_id,))
             row = await cursor.fetchone()
             if row:
                 return self._row_to_project(row)
-            return None
+        # Archived a while ago - may have been moved to the cold tier
+        return await self._get_cold_project(project_id)
     
     async def get_guild_projects(self, guild_id: int, status: str = None) -> List[Dict[str, Any]]:
         """Get all projects for a guild, optionally filtered by status"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect(guild_id) as db:
             db.row_factory = aiosqlite.Row
             if status:
                 cursor = await db.execute(
-                    "SELECT * FROM projects WHERE guild_id = ? AND status = ? ORDER BY created_at DESC",
+                    "SELECT * FROM projects WHERE guild_id = ? AND status = ? ORDER BY created_ts DESC",
                     (guild_id, status)
                 )
             else:
                 cursor = await db.execute(
-                    "SELECT * FROM projects WHERE guild_id = ? ORDER BY created_at DESC",
+                    "SELECT * FROM projects WHERE guild_id = ? ORDER BY created_ts DESC",
                     (guild_id,)
                 )
             rows = await cursor.fetchall()
@@ -159,22 +695,28 @@ class Database:
         for key in ['owners', 'tags']:
             if key in kwargs and isinstance(kwargs[key], list):
                 kwargs[key] = json.dumps(kwargs[key])
+        if 'description' in kwargs:
+            kwargs['description'] = pack_text(kwargs['description'], self.compress_threshold)
         
         set_clause = ", ".join(f"{k} = ?" for k in kwargs.keys())
         values = list(kwargs.values()) + [project_id]
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect(await self._route('project', project_id)) as db:
             await db.execute(f"UPDATE projects SET {set_clause} WHERE id = ?", values)
+            await self._bump_version_for_project(db, project_id)
             await db.commit()
             return True
     
-    async def archive_project(self, project_id: int) -> bool:
-        """Archive a project"""
-        return await self.update_project(
-            project_id,
-            status='archived',
-            archived_at=datetime.utcnow().isoformat()
-        )
+    async def get_projects_archived_since(self, guild_id: int, since: datetime) -> List[Dict[str, Any]]:
+        """Get a guild's projects archived at or after a moment, newest first"""
+        async with self._connect(guild_id) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                "SELECT * FROM projects WHERE guild_id = ? AND archived_ts >= ? ORDER BY archived_ts DESC",
+                (guild_id, to_epoch(since))
+            )
+            rows = await cursor.fetchall()
+            return [self._row_to_project(row) for row in rows]
     
     def _row_to_project(self, row) -> Dict[str, Any]:
         """Convert a database row to a project dict"""
@@ -182,7 +724,7 @@ class Database:
             'id': row['id'],
             'guild_id': row['guild_id'],
             'title': row['title'],
-            'description': row['description'],
+            'description': unpack_text(row['description']),
             'owners': json.loads(row['owners']),
             'status': row['status'],
             'thread_id': row['thread_id'],
@@ -196,38 +738,114 @@ class Database:
     
     async def create_task(self, project_id: int, label: str, created_by: int = None) -> int:
         """Create a new task"""
-        async with aiosqlite.connect(self.db_path) as db:
+        now, now_ts = utc_now()
+        guild_id = await self._route('project', project_id)
+        (task_id,) = await self._allocate_ids('task', guild_id)
+        async with self._connect(guild_id) as db:
             cursor = await db.execute("""
-                INSERT INTO tasks (project_id, label, created_by, created_at)
-                VALUES (?, ?, ?, ?)
-            """, (project_id, label, created_by, datetime.utcnow().isoformat()))
+                INSERT INTO tasks (id, project_id, label, created_by, created_at, created_ts)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (task_id, project_id, label, created_by, now, now_ts))
+            await self._bump_version_for_project(db, project_id)
             await db.commit()
             return cursor.lastrowid
     
+    async def create_tasks(self, project_id: int, tasks: Iterable[Union[str, Tuple[str, bool]]],
+                           created_by: int = None) -> List[int]:
+        """
+        Create many tasks in one transaction and return their IDs.
+        Tasks are labels or (label, is_done) pairs; the iterable is consumed lazily.
+        """
+        now, now_ts = utc_now()
+        guild_id = await self._route('project', project_id)
+        
+        def rows():
+            for task in tasks:
+                label, is_done = (task, False) if isinstance(task, str) else task
+                yield (project_id, label, int(is_done), created_by, now, now_ts)
+        
+        if guild_id is None:
+            task_rows = ((None,) + row for row in rows())
+        else:
+            # Per-guild files: ids come from the route table, so count the tasks first
+            task_rows = list(rows())
+            ids = await self._allocate_ids('task', guild_id, len(task_rows))
+            task_rows = [(task_id,) + row for task_id, row in zip(ids, task_rows)]
+        
+        async with self._connect(guild_id) as db:
+            # IMMEDIATE takes the write lock up front, so the AUTOINCREMENT ids
+            # handed out by this insert are contiguous (a transaction() already holds it)
+            if not db.in_transaction:
+                await db.execute("BEGIN IMMEDIATE")
+            cursor = await db.executemany("""
+                INSERT INTO tasks (id, project_id, label, is_done, created_by, created_at, created_ts)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, task_rows)
+            count = cursor.rowcount
+            cursor = await db.execute("SELECT last_insert_rowid()")
+            last_id = (await cursor.fetchone())[0]
+            await self._bump_version_for_project(db, project_id)
+            await db.commit()
+            
+        if count <= 0:
+            return []
+        return list(range(last_id - count + 1, last_id + 1))
+    
     async def get_project_tasks(self, project_id: int) -> List[Dict[str, Any]]:
         """Get all tasks for a project"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect(await self._route('project', project_id)) as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute(
-                "SELECT * FROM tasks WHERE project_id = ? ORDER BY created_at",
+                "SELECT * FROM tasks WHERE project_id = ? ORDER BY created_ts, id",
                 (project_id,)
             )
             rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            if rows:
+                return [dict(row) for row in rows]
+            cursor = await db.execute("SELECT 1 FROM projects WHERE id = ?", (project_id,))
+            if await cursor.fetchone():
+                return []
+        # Project has been moved to the cold tier
+        return await self._get_cold_tasks(project_id)
     
-    async def toggle_task(self, task_id: int) -> bool:
-        """Toggle task completion status"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "UPDATE tasks SET is_done = NOT is_done WHERE id = ?",
+    async def toggle_task(self, task_id: int) -> Optional[Dict[str, Any]]:
+        """Toggle task completion status and return the updated task"""
+        async with self._connect(await self._route('task', task_id)) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                "UPDATE tasks SET is_done = NOT is_done WHERE id = ? RETURNING *",
                 (task_id,)
             )
+            row = await cursor.fetchone()
+            if row:
+                await self._bump_version_for_project(db, row['project_id'])
             await db.commit()
-            return True
+            return dict(row) if row else None
+    
+    async def toggle_tasks(self, task_ids: List[int]) -> List[Dict[str, Any]]:
+        """Toggle several tasks in one statement and return the updated tasks"""
+        if not task_ids:
+            return []
+        updated = []
+        # One group unless the ids span guilds with per-guild files
+        for guild_id, ids in (await self._group_by_route('task', task_ids)).items():
+            placeholders = ", ".join("?" for _ in ids)
+            async with self._connect(guild_id) as db:
+                db.row_factory = aiosqlite.Row
+                cursor = await db.execute(
+                    f"UPDATE tasks SET is_done = NOT is_done WHERE id IN ({placeholders}) RETURNING *",
+                    list(ids)
+                )
+                rows = await cursor.fetchall()
+                await self._bump_version_for_tasks(db, ids)
+                await db.commit()
+                updated.extend(dict(row) for row in rows)
+        return updated
     
     async def delete_task(self, task_id: int) -> bool:
         """Delete a task"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect(await self._route('task', task_id)) as db:
+            await self._bump_version_for_tasks(db, [task_id])
             await db.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
             await db.commit()
             return True
@@ -237,30 +855,33 @@ class Database:
     async def create_idea(self, guild_id: int, author_id: int, title: str,
                          description: str = None, tags: List[str] = None) -> int:
         """Create a new idea"""
-        async with aiosqlite.connect(self.db_path) as db:
+        now, now_ts = utc_now()
+        (idea_id,) = await self._allocate_ids('idea', guild_id)
+        async with self._connect(guild_id) as db:
             cursor = await db.execute("""
-                INSERT INTO ideas (guild_id, author_id, title, description, tags, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
+                INSERT INTO ideas (id, guild_id, author_id, title, description, tags, created_at, created_ts)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """, (
-                guild_id, author_id, title, description,
+                idea_id, guild_id, author_id, title, description,
                 json.dumps(tags or []),
-                datetime.utcnow().isoformat()
+                now, now_ts
             ))
+            await self._bump_version(db, guild_id)
             await db.commit()
             return cursor.lastrowid
     
     async def get_guild_ideas(self, guild_id: int, unused_only: bool = False) -> List[Dict[str, Any]]:
         """Get ideas for a guild"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect(guild_id) as db:
             db.row_factory = aiosqlite.Row
             if unused_only:
                 cursor = await db.execute(
-                    "SELECT * FROM ideas WHERE guild_id = ? AND used_project_id IS NULL ORDER BY created_at DESC",
+                    "SELECT * FROM ideas WHERE guild_id = ? AND used_project_id IS NULL ORDER BY created_ts DESC",
                     (guild_id,)
                 )
             else:
                 cursor = await db.execute(
-                    "SELECT * FROM ideas WHERE guild_id = ? ORDER BY created_at DESC",
+                    "SELECT * FROM ideas WHERE guild_id = ? ORDER BY created_ts DESC",
                     (guild_id,)
                 )
             rows = await cursor.fetchall()
@@ -268,19 +889,30 @@ class Database:
     
     async def mark_idea_used(self, idea_id: int, project_id: int) -> bool:
         """Mark an idea as used by a project"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect(await self._route('idea', idea_id)) as db:
             await db.execute(
                 "UPDATE ideas SET used_project_id = ? WHERE id = ?",
                 (project_id, idea_id)
             )
+            await self._bump_version_for_project(db, project_id)
             await db.commit()
             return True
     
+    async def delete_idea(self, idea_id: int) -> bool:
+        """Delete an idea"""
+        async with self._connect(await self._route('idea', idea_id)) as db:
+            cursor = await db.execute("DELETE FROM ideas WHERE id = ? RETURNING guild_id", (idea_id,))
+            row = await cursor.fetchone()
+            if row:
+                await self._bump_version(db, row[0])
+            await db.commit()
+            return row is not None
+    
     # ============ GUILD CONFIG METHODS ============
     
     async def get_guild_config(self, guild_id: int) -> Dict[str, Any]:
         """Get guild configuration, creating default if not exists"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute(
                 "SELECT * FROM guild_config WHERE guild_id = ?",
@@ -292,11 +924,14 @@ class Database:
                     'guild_id': row['guild_id'],
                     'projects_channel_id': row['projects_channel_id'],
                     'admin_roles': json.loads(row['admin_roles']),
-                    'thread_mode': row['thread_mode']
+                    'thread_mode': row['thread_mode'],
+                    'dashboard_channel_id': row['dashboard_channel_id'],
+                    'dashboard_message_id': row['dashboard_message_id']
                 }
             # Create default config
+            # OR IGNORE: another process may have created it in the meantime
             await db.execute(
-                "INSERT INTO guild_config (guild_id) VALUES (?)",
+                "INSERT OR IGNORE INTO guild_config (guild_id) VALUES (?)",
                 (guild_id,)
             )
             await db.commit()
@@ -304,7 +939,9 @@ class Database:
                 'guild_id': guild_id,
                 'projects_channel_id': None,
                 'admin_roles': [],
-                'thread_mode': 'auto'
+                'thread_mode': 'auto',
+                'dashboard_channel_id': None,
+                'dashboard_message_id': None
             }
     
     async def update_guild_config(self, guild_id: int, **kwargs) -> bool:
@@ -315,32 +952,60 @@ class Database:
         set_clause = ", ".join(f"{k} = ?" for k in kwargs.keys())
         values = list(kwargs.values()) + [guild_id]
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             await db.execute(f"UPDATE guild_config SET {set_clause} WHERE guild_id = ?", values)
+            if self.guild_pool is None:
+                await self._bump_version(db, guild_id)
             await db.commit()
-            return True
+        
+        if self.guild_pool is not None:
+            # The version lives in the guild's own file, next to the data it covers
+            async with self._connect(guild_id) as db:
+                await self._bump_version(db, guild_id)
+                await db.commit()
+        return True
+    
+    async def get_dashboards(self) -> Dict[int, Tuple[int, int]]:
+        """Get guild_id -> (channel_id, message_id) for every guild with a live dashboard"""
+        async with self._connect() as db:
+            cursor = await db.execute("""
+                SELECT guild_id, dashboard_channel_id, dashboard_message_id FROM guild_config
+                WHERE dashboard_message_id IS NOT NULL
+            """)
+            rows = await cursor.fetchall()
+            return {row[0]: (row[1], row[2]) for row in rows}
     
     # ============ USER MEMORY METHODS ============
     
     async def set_memory(self, user_id: int, guild_id: int, key: str, value: str,
                         context: str = None) -> bool:
         """Set or update a memory for a user"""
-        now = datetime.utcnow().isoformat()
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                INSERT INTO user_memories (user_id, guild_id, memory_key, memory_value, context, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+        await self.set_memories(guild_id, [(user_id, key, value, context)])
+        return True
+    
+    async def set_memories(self, guild_id: int, memories: List[Tuple[int, str, str, Optional[str]]]) -> int:
+        """Set or update many (user_id, key, value, context) memories in one guild with one commit"""
+        if not memories:
+            return 0
+        now, now_ts = utc_now()
+        async with self._connect(guild_id) as db:
+            await db.executemany("""
+                INSERT INTO user_memories (user_id, guild_id, memory_key, memory_value, context,
+                                           created_at, updated_at, created_ts, updated_ts)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ON CONFLICT(user_id, guild_id, memory_key) DO UPDATE SET
                     memory_value = excluded.memory_value,
                     context = excluded.context,
-                    updated_at = excluded.updated_at
-            """, (user_id, guild_id, key, value, context, now, now))
+                    updated_at = excluded.updated_at,
+                    updated_ts = excluded.updated_ts
+            """, [(user_id, guild_id, key, value, context, now, now, now_ts, now_ts)
+                  for user_id, key, value, context in memories])
             await db.commit()
-            return True
+            return len(memories)
     
     async def get_memory(self, user_id: int, guild_id: int, key: str) -> Optional[str]:
         """Get a specific memory for a user"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect(guild_id) as db:
             cursor = await db.execute(
                 "SELECT memory_value FROM user_memories WHERE user_id = ? AND guild_id = ? AND memory_key = ?",
                 (user_id, guild_id, key)
@@ -350,7 +1015,7 @@ class Database:
     
     async def get_all_memories(self, user_id: int, guild_id: int) -> Dict[str, str]:
         """Get all memories for a user in a guild"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect(guild_id) as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute(
                 "SELECT memory_key, memory_value, context, updated_at FROM user_memories WHERE user_id = ? AND guild_id = ?",
@@ -365,7 +1030,7 @@ class Database:
     
     async def delete_memory(self, user_id: int, guild_id: int, key: str) -> bool:
         """Delete a specific memory"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect(guild_id) as db:
             await db.execute(
                 "DELETE FROM user_memories WHERE user_id = ? AND guild_id = ? AND memory_key = ?",
                 (user_id, guild_id, key)
@@ -375,7 +1040,7 @@ class Database:
     
     async def clear_user_memories(self, user_id: int, guild_id: int) -> bool:
         """Clear all memories for a user in a guild"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect(guild_id) as db:
             await db.execute(
                 "DELETE FROM user_memories WHERE user_id = ? AND guild_id = ?",
                 (user_id, guild_id)
@@ -383,41 +1048,496 @@ class Database:
             await db.commit()
             return True
     
+    # ============ LLM USAGE METHODS ============
+    
+    async def add_usage(self, guild_id: int, rows: List[Tuple[str, int, str, int, int, int, int, float]]) -> int:
+        """Add daily usage totals to a guild's ledger, summing into existing rows"""
+        if not rows:
+            return 0
+        async with self._connect(guild_id) as db:
+            await db.executemany("""
+                INSERT INTO llm_usage (guild_id, day, user_id, call_type, calls, prompt_tokens,
+                                       completion_tokens, cached_tokens, latency_ms)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(guild_id, day, user_id, call_type) DO UPDATE SET
+                    calls = calls + excluded.calls,
+                    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                    completion_tokens = completion_tokens + excluded.completion_tokens,
+                    cached_tokens = cached_tokens + excluded.cached_tokens,
+                    latency_ms = latency_ms + excluded.latency_ms
+            """, [(guild_id, *row) for row in rows])
+            await db.commit()
+            return len(rows)
+    
+    async def get_usage(self, guild_id: int, since_day: str) -> List[Dict[str, Any]]:
+        """Get a guild's usage rows from since_day onwards"""
+        async with self._connect(guild_id) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("""
+                SELECT * FROM llm_usage WHERE guild_id = ? AND day >= ? ORDER BY day
+            """, (guild_id, since_day))
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+    
+    # ============ JOB QUEUE METHODS ============
+    
+    async def enqueue_job(self, kind: str, guild_id: Optional[int], payload: Dict[str, Any],
+                          idempotency_key: Optional[str] = None, max_attempts: int = 3) -> Tuple[int, bool]:
+        """Queue a job unless its idempotency key is taken - returns (job id, newly queued)"""
+        _, now_ts = utc_now()
+        async with self._connect() as db:
+            cursor = await db.execute("""
+                INSERT INTO llm_jobs (kind, guild_id, idempotency_key, payload, max_attempts, run_after,
+                                      created_ts, updated_ts)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(idempotency_key) DO NOTHING
+                RETURNING id
+            """, (kind, guild_id, idempotency_key, json.dumps(payload), max_attempts, time.time(), now_ts, now_ts))
+            row = await cursor.fetchone()
+            await db.commit()
+            if row is not None:
+                return row[0], True
+            cursor = await db.execute("SELECT id FROM llm_jobs WHERE idempotency_key = ?", (idempotency_key,))
+            return (await cursor.fetchone())[0], False
+    
+    async def claim_jobs(self, owner: str, kinds: List[str], limit: int = 1, lease_seconds: float = 120,
+                         shards: Optional[Tuple[int, List[int]]] = None) -> List[Dict[str, Any]]:
+        """Lease up to limit due (or abandoned) jobs of the given kinds (and shards) to owner"""
+        if not kinds:
+            return []
+        now = time.time()
+        _, now_ts = utc_now()
+        placeholders = ", ".join("?" * len(kinds))
+        # A guild's shard is (guild_id >> 22) % shard_count
+        shard_filter, shard_params = "", ()
+        if shards is not None:
+            shard_count, shard_ids = shards
+            shard_filter = (f"AND (guild_id IS NULL OR (guild_id >> 22) % ? IN "
+                            f"({', '.join('?' * len(shard_ids))}))")
+            shard_params = (shard_count, *shard_ids)
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            if not db.in_transaction:
+                await db.execute("BEGIN IMMEDIATE")
+            # Abandoned by a dead worker with no attempts left
+            await db.execute(f"""
+                UPDATE llm_jobs SET status = 'failed', lease_owner = NULL,
+                    last_error = COALESCE(last_error, 'lease expired'), updated_ts = ?
+                WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts
+                  AND kind IN ({placeholders}) {shard_filter}
+            """, (now_ts, now, *kinds, *shard_params))
+            cursor = await db.execute(f"""
+                UPDATE llm_jobs SET status = 'running', lease_owner = ?, lease_until = ?,
+                    attempts = attempts + 1, updated_ts = ?
+                WHERE id IN (
+                    SELECT id FROM llm_jobs
+                    WHERE kind IN ({placeholders}) {shard_filter}
+                      AND ((status = 'queued' AND run_after <= ?) OR (status = 'running' AND lease_until < ?))
+                    ORDER BY run_after LIMIT ?
+                )
+                RETURNING *
+            """, (owner, now + lease_seconds, now_ts, *kinds, *shard_params, now, now, limit))
+            rows = await cursor.fetchall()
+            await db.commit()
+            return [{**dict(row), 'payload': json.loads(row['payload'])} for row in rows]
+    
+    async def finish_job(self, job_id: int, owner: str, error: Optional[str] = None,
+                         retry_at: Optional[float] = None) -> bool:
+        """Mark a leased job done, requeue it for retry_at, or fail it - False if the lease was lost"""
+        _, now_ts = utc_now()
+        status = 'done' if error is None else 'queued' if retry_at is not None else 'failed'
+        async with self._connect() as db:
+            cursor = await db.execute("""
+                UPDATE llm_jobs SET status = ?, last_error = ?, run_after = COALESCE(?, run_after),
+                    lease_owner = NULL, lease_until = NULL, updated_ts = ?
+                WHERE id = ? AND lease_owner = ? AND status = 'running'
+            """, (status, error, retry_at, now_ts, job_id, owner))
+            await db.commit()
+            return cursor.rowcount > 0
+    
+    async def get_job_counts(self) -> Dict[str, int]:
+        """Number of jobs in each status"""
+        async with self._connect() as db:
+            cursor = await db.execute("SELECT status, COUNT(*) FROM llm_jobs GROUP BY status")
+            return {status: count for status, count in await cursor.fetchall()}
+    
+    # ============ WEEKLY SNAPSHOT METHODS ============
+    
+    async def snapshot_week(self, guild_id: int, when: datetime = None) -> Dict[str, Any]:
+        """Write this week's snapshot rows for a guild and return the guild-wide row"""
+        week, start, end = iso_week(when)
+        now = datetime.utcnow().isoformat()
+        
+        async with self._connect(guild_id) as db:
+            # Active projects, plus anything archived during the week
+            cursor = await db.execute("""
+                SELECT p.id, p.status, COALESCE(SUM(t.is_done), 0), COUNT(t.id),
+                       p.created_ts >= ? AND p.created_ts < ?,
+                       COALESCE(p.archived_ts >= ? AND p.archived_ts < ?, 0)
+                FROM projects p LEFT JOIN tasks t ON t.project_id = p.id
+                WHERE p.guild_id = ? AND (p.status = 'active' OR (p.archived_ts >= ? AND p.archived_ts < ?))
+                GROUP BY p.id
+            """, (start, end, start, end, guild_id, start, end))
+            projects = await cursor.fetchall()
+            
+            cursor = await db.execute("""
+                SELECT COUNT(*) FROM ideas WHERE guild_id = ? AND created_ts >= ? AND created_ts < ?
+            """, (guild_id, start, end))
+            ideas_added = (await cursor.fetchone())[0]
+            
+            active = [p for p in projects if p[1] == 'active']
+            guild_row = {
+                'guild_id': guild_id,
+                'week': week,
+                'project_id': 0,
+                'tasks_done': sum(p[2] for p in active),
+                'tasks_total': sum(p[3] for p in active),
+                'active_projects': len(active),
+                'projects_created': sum(p[4] for p in projects),
+                'projects_archived': sum(p[5] for p in projects),
+                'ideas_added': ideas_added,
+                'updated_at': now
+            }
+            
+            rows = [tuple(guild_row.values())] + [
+                (guild_id, week, p[0], p[2], p[3], int(p[1] == 'active'), p[4], p[5], 0, now)
+                for p in projects
+            ]
+            await db.executemany("""
+                INSERT OR REPLACE INTO weekly_snapshots
+                    (guild_id, week, project_id, tasks_done, tasks_total, active_projects,
+                     projects_created, projects_archived, ideas_added, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            await db.commit()
+            return guild_row
+    
+    async def get_weekly_snapshots(self, guild_id: int, weeks: int = DEFAULT_TREND_WEEKS,
+                                   project_id: int = 0) -> List[Dict[str, Any]]:
+        """Get the most recent weekly snapshots for a guild (or one project), newest first"""
+        async with self._connect(guild_id) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("""
+                SELECT * FROM weekly_snapshots
+                WHERE guild_id = ? AND project_id = ?
+                ORDER BY week DESC LIMIT ?
+            """, (guild_id, project_id, weeks))
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+    
+    # ============ BACKUP / EXPORT METHODS ============
+    
+    async def backup(self, target_path: str, source_path: str = None, pages: int = 256,
+                     progress: Callable[[int, int, int], None] = None):
+        """
+        Copy a live data file (the main database by default, see data_files()) to target_path
+        with SQLite's online backup API, `pages` pages per step. The copy runs on aiosqlite's
+        thread and releases the lock between steps, so the bot keeps reading and writing
+        meanwhile. progress is called from that thread with (status, remaining, total).
+        """
+        Path(target_path).parent.mkdir(parents=True, exist_ok=True)
+        async with self._connect_file(source_path or self.db_path) as db, \
+                aiosqlite.connect(target_path) as target:
+            await db.backup(target, pages=pages, progress=progress, sleep=0.05)
+    
+    async def iter_guild_export(self, guild_id: int, batch_size: int = 500) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yield (record type, row) for a guild's projects, tasks, ideas and memories, hot and
+        cold tier alike, reading `batch_size` rows at a time. Projects come before their tasks.
+        """
+        cold = self.has_cold_tier()
+        path = await self.guild_pool.prepare(guild_id) if self.guild_pool else self.db_path
+        # A connection of its own, so a long export doesn't hold the guild's pooled one
+        async with (self._connect_cold(path) if cold else self._connect_file(path)) as db:
+            db.row_factory = aiosqlite.Row
+            for record_type, table, where in EXPORT_TABLES:
+                compressed = [column for t, column in COMPRESSED_COLUMNS if t == table]
+                for schema in (['main', 'cold'] if cold and table in COLD_TABLES else ['main']):
+                    last_id = 0
+                    while True:
+                        cursor = await db.execute(
+                            f"SELECT * FROM {schema}.{table} WHERE {where.format(schema=schema)} AND id > ? "
+                            f"ORDER BY id LIMIT ?",
+                            (guild_id, last_id, batch_size)
+                        )
+                        rows = await cursor.fetchall()
+                        if not rows:
+                            break
+                        for row in rows:
+                            data = dict(row)
+                            for column in compressed:
+                                data[column] = unpack_text(data[column])
+                            yield record_type, data
+                        last_id = rows[-1]['id']
+    
+    async def import_guild_records(self, guild_id: int, records: AsyncIterable[Tuple[str, Dict[str, Any]]],
+                                   batch_size: int = 500) -> Dict[str, int]:
+        """
+        Insert exported records into a guild, committing every `batch_size` records.
+        Rows get new ids; tasks and ideas are re-pointed at their imported projects.
+        Memories replace existing ones with the same key. Returns counts per record type.
+        """
+        counts: Dict[str, int] = {record_type: 0 for record_type, _, _ in EXPORT_TABLES}
+        counts['skipped'] = 0
+        # exported project id -> new project id
+        project_ids: Dict[int, int] = {}
+        
+        batch: List[Tuple[str, Dict[str, Any]]] = []
+        async for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                await self._import_batch(guild_id, batch, project_ids, counts)
+                batch = []
+        await self._import_batch(guild_id, batch, project_ids, counts)
+        return counts
+    
+    async def _import_batch(self, guild_id: int, batch: List[Tuple[str, Dict[str, Any]]],
+                            project_ids: Dict[int, int], counts: Dict[str, int]):
+        """Insert one batch of import records in a single transaction"""
+        tables = {record_type: table for record_type, table, _ in EXPORT_TABLES}
+        new_ids = {
+            kind: iter(await self._allocate_ids(kind, guild_id, sum(1 for t, _ in batch if t == kind)))
+            for kind in ROUTE_TABLES
+        }
+        
+        async with self._connect(guild_id) as db:
+            columns = {table: set(await self._columns(db, 'main', table)) - {'id'} for table in tables.values()}
+            
+            for record_type, data in batch:
+                table = tables.get(record_type)
+                if table is None or (record_type == 'task' and data.get('project_id') not in project_ids):
+                    counts['skipped'] += 1
+                    continue
+                
+                row = {k: v for k, v in data.items() if k in columns[table]}
+                if record_type in new_ids:
+                    row['id'] = next(new_ids[record_type])
+                if 'guild_id' in columns[table]:
+                    row['guild_id'] = guild_id
+                if record_type == 'task':
+                    row['project_id'] = project_ids[data['project_id']]
+                if record_type == 'idea' and row.get('used_project_id') is not None:
+                    row['used_project_id'] = project_ids.get(row['used_project_id'])
+                for t, column in COMPRESSED_COLUMNS:
+                    if t == table and column in row:
+                        row[column] = pack_text(row[column], self.compress_threshold)
+                
+                verb = "INSERT OR REPLACE" if record_type == 'memory' else "INSERT"
+                cursor = await db.execute(
+                    f"{verb} INTO {table} ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                    tuple(row.values())
+                )
+                if record_type == 'project':
+                    project_ids[data['id']] = cursor.lastrowid
+                counts[record_type] += 1
+            
+            await self._bump_version(db, guild_id)
+            await db.commit()
+    
+    # ============ COLD TIER METHODS ============
+    
+    @staticmethod
+    async def _columns(db, schema: str, table: str) -> List[str]:
+        cursor = await db.execute(f"PRAGMA {schema}.table_info({table})")
+        return [row[1] for row in await cursor.fetchall()]
+    
+    async def _init_cold_schema(self, db):
+        """Create the cold tables from the hot ones and add any columns added since"""
+        await db.execute("PRAGMA cold.journal_mode=WAL")
+        for table in COLD_TABLES:
+            cursor = await db.execute(
+                "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            )
+            (sql,) = await cursor.fetchone()
+            await db.execute(sql.replace(f"CREATE TABLE {table}", f"CREATE TABLE IF NOT EXISTS cold.{table}", 1))
+            
+            cold_columns = set(await self._columns(db, 'cold', table))
+            cursor = await db.execute(f"PRAGMA main.table_info({table})")
+            for _, name, column_type, *_ in await cursor.fetchall():
+                if name not in cold_columns:
+                    await db.execute(f"ALTER TABLE cold.{table} ADD COLUMN {name} {column_type}")
+        for statement in COLD_INDEXES:
+            await db.execute(statement)
+        await db.commit()
+    
+    async def _move_rows(self, db, table: str, where: str, params: Iterable, keep_ids: bool = True) -> int:
+        """
+        Copy matching rows into the cold tier and delete them from the hot one. Rows an
+        interrupted run already copied are skipped. With keep_ids a copied row is replaced
+        by the hot one, which may have changed since. Without keep_ids the cold tier
+        numbers the copies itself, for tables whose ids are only unique within one hot
+        file, and a copy is recognised by its key columns.
+        """
+        columns = [column for column in await self._columns(db, 'main', table) if keep_ids or column != 'id']
+        names = ', '.join(columns)
+        params = tuple(params)
+        if keep_ids:
+            await db.execute(
+                f"INSERT OR REPLACE INTO cold.{table} ({names}) SELECT {names} FROM main.{table} WHERE {where}",
+                params
+            )
+        else:
+            # Not EXCEPT - that would also fold identical rows within the batch into one
+            matches = ' AND '.join(f"c.{column} IS h.{column}" for column in MOVE_KEY_COLUMNS[table])
+            await db.execute(
+                f"INSERT INTO cold.{table} ({names}) SELECT {names} FROM main.{table} AS h WHERE {where} "
+                f"AND NOT EXISTS (SELECT 1 FROM cold.{table} AS c WHERE {matches})",
+                params
+            )
+        cursor = await db.execute(f"DELETE FROM main.{table} WHERE {where}", params)
+        return cursor.rowcount
+    
+    async def move_to_cold(self, archived_before: datetime, history_before: datetime, batch_size: int = 500,
+                           shards: Optional[Tuple[int, List[int]]] = None) -> Tuple[int, int]:
+        """
+        Move projects archived before a moment (with their tasks) and conversation history
+        older than a moment into the cold tier, one short transaction per batch - only for
+        guilds on shards=(shard_count, shard_ids), if given. Moving projects bumps their
+        guilds' data versions in the same transaction, so no cached embed still lists them.
+        Returns (projects moved, history rows moved).
+        
+        A batch interrupted between the two files' commits is copied again on the next run,
+        skipping the rows that already made it. History ids are per hot file, so cold
+        history rows get new ones.
+        """
+        # A guild's shard is (guild_id >> 22) % shard_count
+        shard_filter, shard_params = "", ()
+        paths = self._hot_paths()
+        if shards is not None:
+            shard_count, shard_ids = shards
+            shard_filter = f"AND (guild_id >> 22) % ? IN ({', '.join('?' * len(shard_ids))})"
+            shard_params = (shard_count, *shard_ids)
+            if self.guild_pool is not None:
+                paths = [self.db_path] + [
+                    self.guild_pool.path(guild_id) for guild_id in self.guild_pool.guild_ids()
+                    if (guild_id >> 22) % shard_count in shard_ids
+                ]
+        
+        projects_moved = history_moved = 0
+        for path in paths:
+            moved = await self._move_file_to_cold(
+                path, archived_before, history_before, batch_size, shard_filter, shard_params
+            )
+            projects_moved += moved[0]
+            history_moved += moved[1]
+        return projects_moved, history_moved
+    
+    async def _move_file_to_cold(self, path: str, archived_before: datetime, history_before: datetime,
+                                 batch_size: int, shard_filter: str, shard_params: Tuple) -> Tuple[int, int]:
+        projects_moved = history_moved = 0
+        async with self._connect_cold(path) as db:
+            while True:
+                await db.execute("BEGIN IMMEDIATE")
+                cursor = await db.execute(
+                    f"SELECT id FROM main.projects WHERE archived_ts < ? {shard_filter} ORDER BY archived_ts LIMIT ?",
+                    (to_epoch(archived_before), *shard_params, batch_size)
+                )
+                ids = [row[0] for row in await cursor.fetchall()]
+                if not ids:
+                    await db.rollback()
+                    break
+                marks = ', '.join('?' * len(ids))
+                await self._bump_version_for_projects(db, ids)
+                await self._move_rows(db, 'tasks', f"project_id IN ({marks})", ids)
+                projects_moved += await self._move_rows(db, 'projects', f"id IN ({marks})", ids)
+                await db.commit()
+                # Let other connections in between batches
+                await asyncio.sleep(0)
+            
+            while True:
+                await db.execute("BEGIN IMMEDIATE")
+                cursor = await db.execute(
+                    f"SELECT MAX(id) FROM (SELECT id FROM main.conversation_history WHERE created_ts < ? "
+                    f"{shard_filter} ORDER BY created_ts LIMIT ?)",
+                    (to_epoch(history_before), *shard_params, batch_size)
+                )
+                (last_id,) = await cursor.fetchone()
+                if last_id is None:
+                    await db.rollback()
+                    break
+                history_moved += await self._move_rows(
+                    db, 'conversation_history', f"created_ts < ? AND id <= ? {shard_filter}",
+                    (to_epoch(history_before), last_id, *shard_params), keep_ids=False
+                )
+                await db.commit()
+                await asyncio.sleep(0)
+        
+        return projects_moved, history_moved
+    
+    async def _get_cold_project(self, project_id: int) -> Optional[Dict[str, Any]]:
+        if not self.has_cold_tier():
+            return None
+        async with self._connect_cold() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("SELECT * FROM cold.projects WHERE id = ?", (project_id,))
+            row = await cursor.fetchone()
+            return self._row_to_project(row) if row else None
+    
+    async def _get_cold_tasks(self, project_id: int) -> List[Dict[str, Any]]:
+        if not self.has_cold_tier():
+            return []
+        async with self._connect_cold() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                "SELECT * FROM cold.tasks WHERE project_id = ? ORDER BY created_ts, id",
+                (project_id,)
+            )
+            return [dict(row) for row in await cursor.fetchall()]
+    
     # ============ CONVERSATION HISTORY METHODS ============
     
     async def add_message(self, user_id: int, guild_id: int, channel_id: int,
                          role: str, content: str) -> int:
         """Add a message to conversation history"""
-        async with aiosqlite.connect(self.db_path) as db:
+        now, now_ts = utc_now()
+        async with self._connect(guild_id) as db:
             cursor = await db.execute("""
-                INSERT INTO conversation_history (user_id, guild_id, channel_id, role, content, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (user_id, guild_id, channel_id, role, content, datetime.utcnow().isoformat()))
+                INSERT INTO conversation_history (user_id, guild_id, channel_id, role, content, created_at, created_ts)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (user_id, guild_id, channel_id, role, pack_text(content, self.compress_threshold), now, now_ts))
             await db.commit()
             return cursor.lastrowid
     
     async def get_recent_messages(self, user_id: int, guild_id: int, channel_id: int,
                                   limit: int = 20) -> List[Dict[str, str]]:
         """Get recent conversation history for context"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect(guild_id) as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute("""
                 SELECT role, content FROM conversation_history
                 WHERE user_id = ? AND guild_id = ? AND channel_id = ?
-                ORDER BY created_at DESC LIMIT ?
+                ORDER BY created_ts DESC, id DESC LIMIT ?
             """, (user_id, guild_id, channel_id, limit))
             rows = await cursor.fetchall()
             # Reverse to get chronological order
-            return [{'role': row['role'], 'content': row['content']} for row in reversed(rows)]
+            return [{'role': row['role'], 'content': unpack_text(row['content'])} for row in reversed(rows)]
+    
+    async def get_messages_older_than(self, cutoff: datetime, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Get up to `limit` conversation history rows created before a moment, oldest first"""
+        messages = []
+        for path in self._hot_paths():
+            async with self._connect_file(path) as db:
+                db.row_factory = aiosqlite.Row
+                cursor = await db.execute("""
+                    SELECT * FROM conversation_history
+                    WHERE created_ts < ?
+                    ORDER BY created_ts LIMIT ?
+                """, (to_epoch(cutoff), limit))
+                rows = await cursor.fetchall()
+                messages.extend({**dict(row), 'content': unpack_text(row['content'])} for row in rows)
+        messages.sort(key=lambda m: (m['created_ts'], m['id']))
+        return messages[:limit]
     
     async def prune_old_messages(self, days: int = 7) -> int:
         """Delete conversation history older than specified days"""
-        from datetime import timedelta
-        cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
-                "DELETE FROM conversation_history WHERE created_at < ?",
-                (cutoff,)
-            )
-            await db.commit()
-            return cursor.rowcount
+        cutoff = to_epoch(datetime.utcnow() - timedelta(days=days))
+        deleted = 0
+        for path in self._hot_paths():
+            async with self._connect_file(path) as db:
+                cursor = await db.execute(
+                    "DELETE FROM conversation_history WHERE created_ts < ?",
+                    (cutoff,)
+                )
+                await db.commit()
+                deleted += cursor.rowcount
+        return deleted
@@ -0,0 +1,119 @@
+"""
+BRRR Bot - Per-Guild Database Files
+One SQLite file per guild, served from an LRU-bounded set of open connections
+"""
+
+import asyncio
+import glob
+import logging
+import os
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Set
+
+import aiosqlite
+
+from src.metrics import metrics
+
+logger = logging.getLogger('brrr.guild_db')
+
+
+class _Handle:
+    """An open connection plus the lock that gives one caller at a time use of it"""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.conn: Optional[aiosqlite.Connection] = None
+
+
+class GuildConnectionPool:
+    """
+    Keeps at most max_open per-guild connections open, closing the least recently
+    used one when another guild needs a slot. Each guild's file gets its schema
+    created the first time this process opens it.
+
+    A connection is handed to one caller at a time, so a caller's transaction never
+    interleaves with another's. Writes to different guilds take different file locks
+    and no longer queue behind each other.
+    """
+
+    def __init__(self, directory: str, init_schema: Callable[[aiosqlite.Connection], Awaitable[None]],
+                 max_open: int = 64, busy_timeout: float = 10.0):
+        self.directory = directory
+        self.init_schema = init_schema
+        self.max_open = max_open
+        self.busy_timeout = busy_timeout
+        self._handles: "OrderedDict[int, _Handle]" = OrderedDict()
+        # Files whose schema this process has already brought up to date
+        self._initialised: Set[str] = set()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, guild_id: int) -> str:
+        return os.path.join(self.directory, f"guild-{guild_id}.db")
+
+    def paths(self) -> List[str]:
+        """Every guild file on disk, opened or not"""
+        return sorted(glob.glob(os.path.join(self.directory, "guild-*.db")))
+
+    def guild_ids(self) -> List[int]:
+        """Guilds with a file on disk"""
+        return [int(os.path.basename(path)[len("guild-"):-len(".db")]) for path in self.paths()]
+
+    async def _open(self, guild_id: int) -> aiosqlite.Connection:
+        path = self.path(guild_id)
+        conn = await aiosqlite.connect(path, timeout=self.busy_timeout)
+        if path not in self._initialised:
+            await self.init_schema(conn)
+            self._initialised.add(path)
+        metrics.incr('guild_db.opens')
+        return conn
+
+    @asynccontextmanager
+    async def connection(self, guild_id: int) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow the guild's connection, opening it (and evicting another) if needed"""
+        handle = self._handles.get(guild_id)
+        if handle is None:
+            handle = self._handles[guild_id] = _Handle()
+            self._evict()
+        else:
+            self._handles.move_to_end(guild_id)
+            metrics.incr('guild_db.hits')
+
+        async with handle.lock:
+            if handle.conn is None:
+                handle.conn = await self._open(guild_id)
+            try:
+                yield handle.conn
+            finally:
+                if handle.conn.in_transaction:
+                    await handle.conn.rollback()
+                handle.conn.row_factory = None
+                # Evicted while we were using it - nobody else will close it
+                if self._handles.get(guild_id) is not handle:
+                    await handle.conn.close()
+                    handle.conn = None
+
+    def _evict(self):
+        while len(self._handles) > self.max_open:
+            _, handle = self._handles.popitem(last=False)
+            asyncio.create_task(self._close(handle))
+        metrics.set_gauge('guild_db.open', len(self._handles))
+
+    @staticmethod
+    async def _close(handle: _Handle):
+        async with handle.lock:
+            if handle.conn is not None:
+                await handle.conn.close()
+                handle.conn = None
+
+    async def prepare(self, guild_id: int) -> str:
+        """Make sure the guild's file exists with a current schema and return its path"""
+        async with self.connection(guild_id):
+            pass
+        return self.path(guild_id)
+
+    async def close(self):
+        """Close every open connection"""
+        handles = list(self._handles.values())
+        self._handles.clear()
+        await asyncio.gather(*(self._close(handle) for handle in handles))
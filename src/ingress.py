@@ -0,0 +1,185 @@
+"""
+BRRR Bot - Message Ingress
+Per-channel FIFO queues drained by a bounded worker pool, with rapid-fire
+messages from the same author coalesced into one batch
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Coroutine, Deque, Dict, List, Optional, Set, Tuple
+
+import discord
+
+from src.metrics import metrics
+
+logger = logging.getLogger('brrr.ingress')
+
+
+class MentionBatch:
+    """Consecutive messages from one author in one channel, answered with a single reply"""
+
+    def __init__(self, messages: List[discord.Message], enqueued_at: float = None):
+        now = time.monotonic()
+        self.messages = list(messages)
+        self.enqueued_at = enqueued_at or now
+        self.last_at = now
+        self.started = False
+        self.superseded = False
+        self.in_flight: Optional[asyncio.Future] = None
+
+    @property
+    def key(self) -> Tuple[int, int]:
+        return (self.last.author.id, self.last.channel.id)
+
+    @property
+    def last(self) -> discord.Message:
+        return self.messages[-1]
+
+    def add(self, message: discord.Message):
+        self.messages.append(message)
+        self.last_at = time.monotonic()
+
+    async def run_supersedable(self, coro: Coroutine) -> Optional[Any]:
+        """
+        Run the part of handling a newer message may still replace (the LLM call).
+        Returns None if it was superseded - the handler should then stop without replying.
+        """
+        self.in_flight = asyncio.ensure_future(coro)
+        try:
+            return await self.in_flight
+        except asyncio.CancelledError:
+            if self.superseded:
+                return None
+            raise
+        finally:
+            self.in_flight = None
+
+
+class MessageIngress:
+    """
+    Routes relevant messages into per-channel queues.
+
+    Each channel is handled by at most one worker at a time, so replies in a channel
+    come out in the order the messages arrived. The worker count caps how many
+    messages are processed concurrently across all channels.
+
+    Consecutive messages from the same author within coalesce_window seconds are merged
+    into one batch. A message that arrives while the previous batch's LLM call is still
+    running cancels that call and is answered together with it.
+    """
+
+    def __init__(self, handler: Callable[[MentionBatch], Awaitable[None]],
+                 workers: int = 8, max_queue_per_channel: int = 20,
+                 coalesce_window: float = 0.0):
+        self.handler = handler
+        self.worker_count = workers
+        self.max_queue_per_channel = max_queue_per_channel
+        self.coalesce_window = coalesce_window
+        self._queues: Dict[int, Deque[MentionBatch]] = {}
+        # Batch each channel's worker is currently handling
+        self._current: Dict[int, MentionBatch] = {}
+        # Channels with pending messages, each listed at most once
+        self._ready: asyncio.Queue = asyncio.Queue()
+        # Channels that are either waiting in _ready or being processed by a worker
+        self._scheduled: Set[int] = set()
+        self._workers: List[asyncio.Task] = []
+        self._depth = 0
+
+    def start(self):
+        """Spawn the worker pool"""
+        for i in range(self.worker_count):
+            self._workers.append(asyncio.create_task(self._worker(), name=f"ingress-worker-{i}"))
+        logger.info(f"Message ingress started with {self.worker_count} workers")
+
+    async def stop(self):
+        """Cancel the workers - queued messages are dropped"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    def submit(self, message: discord.Message) -> bool:
+        """Queue a message for its channel. Returns False if the channel queue is full."""
+        channel_id = message.channel.id
+        queue = self._queues.setdefault(channel_id, deque())
+        metrics.incr('ingress.accepted')
+
+        if self.coalesce_window > 0 and self._coalesce(message, queue):
+            return True
+
+        if len(queue) >= self.max_queue_per_channel:
+            metrics.incr('ingress.dropped')
+            logger.warning(f"Ingress queue full for channel {channel_id} - dropping message {message.id}")
+            return False
+
+        queue.append(MentionBatch([message]))
+        self._depth += 1
+        self._update_gauges()
+
+        if channel_id not in self._scheduled:
+            self._scheduled.add(channel_id)
+            self._ready.put_nowait(channel_id)
+        return True
+
+    def _coalesce(self, message: discord.Message, queue: Deque[MentionBatch]) -> bool:
+        """Merge a message into the author's latest batch if it is still open"""
+        key = (message.author.id, message.channel.id)
+
+        # Still queued, or popped but waiting out the debounce window
+        tail = queue[-1] if queue else self._current.get(message.channel.id)
+        if tail is not None and tail.key == key and tail.in_flight is None and not tail.superseded:
+            if queue or not tail.started or tail.last_at + self.coalesce_window > time.monotonic():
+                tail.add(message)
+                metrics.incr('coalesce.calls_saved')
+                return True
+
+        # LLM call already running for the previous message - replace it
+        current = self._current.get(message.channel.id)
+        if not queue and current is not None and current.key == key and current.in_flight is not None:
+            current.superseded = True
+            current.in_flight.cancel()
+            queue.appendleft(MentionBatch(current.messages + [message], current.enqueued_at))
+            self._depth += 1
+            self._update_gauges()
+            # The cancelled call was already paid for, so nothing is saved here
+            metrics.incr('coalesce.superseded')
+            return True
+
+        return False
+
+    def _update_gauges(self):
+        metrics.set_gauge('ingress.queue_depth', self._depth)
+        metrics.set_gauge('ingress.channels', len(self._queues))
+
+    async def _worker(self):
+        while True:
+            channel_id = await self._ready.get()
+            queue = self._queues[channel_id]
+            batch = queue.popleft()
+            batch.started = True
+            self._current[channel_id] = batch
+            self._depth -= 1
+            self._update_gauges()
+
+            try:
+                # Debounce - give the author a moment to send follow-ups
+                while (delay := batch.last_at + self.coalesce_window - time.monotonic()) > 0:
+                    await asyncio.sleep(delay)
+                metrics.observe('ingress.wait_ms', (time.monotonic() - batch.enqueued_at) * 1000)
+                await self.handler(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error handling message {batch.last.id}: {e}", exc_info=True)
+            finally:
+                del self._current[channel_id]
+
+            if queue:
+                # Back of the line so one busy channel can't starve the others
+                self._ready.put_nowait(channel_id)
+            else:
+                self._scheduled.discard(channel_id)
+                del self._queues[channel_id]
+                self._update_gauges()
@@ -0,0 +1,127 @@
+"""
+BRRR Bot - Durable Job Queue
+Long-running LLM work (project plans, retro summaries) is queued in the database
+and run by background workers, so it survives restarts and never holds up a handler
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.metrics import metrics
+from src.storage import Storage
+
+logger = logging.getLogger('brrr.jobs')
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class JobQueue:
+    """
+    Runs queued jobs with `workers` concurrent workers. Each claimed job is leased for
+    lease_seconds; if its process dies, the lease runs out and another worker picks it
+    up. A job whose handler raises (or overruns the lease) is retried with exponential
+    backoff from retry_delay seconds, up to max_attempts in total.
+
+    Delivery is at-least-once, so handlers must tolerate running twice - enqueue with
+    an idempotency key to avoid queueing the same work twice in the first place.
+
+    Jobs belong to a guild. With shards=(shard_count, shard_ids) only jobs for guilds on
+    those shards are run here, since handlers write guild data and each guild is only
+    written by the process running its shard.
+    """
+
+    def __init__(self, db: Storage, workers: int = 2, lease_seconds: float = 120, poll_interval: float = 5.0,
+                 max_attempts: int = 3, retry_delay: float = 10.0,
+                 shards: Optional[Tuple[int, List[int]]] = None):
+        self.db = db
+        self.shards = shards
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        # Identifies this process's leases
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, kind: str, handler: JobHandler):
+        """Run jobs of this kind with handler(payload) - register before start()"""
+        self._handlers[kind] = handler
+
+    def start(self):
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Job queue started ({self.workers} workers for {', '.join(self._handlers) or 'no job kinds'})")
+
+    async def stop(self):
+        """Cancel the workers - jobs they were running are retried once their leases expire"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, kind: str, guild_id: Optional[int], payload: Dict[str, Any],
+                      idempotency_key: Optional[str] = None) -> Tuple[int, bool]:
+        """Queue a job for a guild and wake a worker. Returns (job id, whether it was newly queued)."""
+        job_id, created = await self.db.enqueue_job(kind, guild_id, payload, idempotency_key, self.max_attempts)
+        if created:
+            metrics.incr(f'jobs.{kind}.queued')
+            self._wakeup.set()
+        else:
+            metrics.incr(f'jobs.{kind}.duplicate')
+        return job_id, created
+
+    async def _run(self):
+        while True:
+            # Cleared before claiming so a job queued meanwhile still wakes us
+            self._wakeup.clear()
+            try:
+                jobs = await self.db.claim_jobs(self.owner, list(self._handlers), 1, self.lease_seconds, self.shards)
+                for job in jobs:
+                    await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker error: {e}", exc_info=True)
+                jobs = []
+
+            if not jobs:
+                # Jobs queued by this process wake us at once; others are found by polling
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _process(self, job: Dict[str, Any]):
+        kind = job['kind']
+        started = time.monotonic()
+        try:
+            # Overrunning the lease would let a second worker start the same job
+            await asyncio.wait_for(self._handlers[kind](job['payload']), self.lease_seconds)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            retry_at = None
+            if job['attempts'] < job['max_attempts']:
+                retry_at = time.time() + self.retry_delay * 2 ** (job['attempts'] - 1)
+            await self.db.finish_job(job['id'], self.owner, error, retry_at)
+            metrics.incr(f'jobs.{kind}.retried' if retry_at else f'jobs.{kind}.failed')
+            logger.warning(
+                f"Job {job['id']} ({kind}) attempt {job['attempts']}/{job['max_attempts']} failed: {error}"
+                + (f" - retrying in {retry_at - time.time():.0f}s" if retry_at else " - giving up")
+            )
+            return
+
+        if not await self.db.finish_job(job['id'], self.owner):
+            logger.warning(f"Job {job['id']} ({kind}) finished after its lease was lost")
+        metrics.incr(f'jobs.{kind}.done')
+        metrics.observe(f'jobs.{kind}.run_ms', (time.monotonic() - started) * 1000)
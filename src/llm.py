@@ -1,29 +1,165 @@
 """
-BRRR Bot - LLM Integration via Requesty.ai
-Uses OpenAI-compatible API for inference
+BRRR Bot - LLM Integration
+Uses OpenAI-compatible APIs for inference - the Requesty.ai router or a local server
 """
 
 import aiohttp
+import asyncio
 import json
-from typing import List, Dict, Any, Optional
+import logging
+import re
+import time
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from dataclasses import dataclass
 
+from src.metrics import metrics
+from src.model_router import HedgePolicy, ModelRouter, parse_routes
+from src.providers import Providers
+from src.usage import UsageLedger
+
+logger = logging.getLogger('brrr.llm')
+
+MEMORY_KEY_PATTERN = re.compile(r'^[a-z0-9_]{1,64}$')
+MAX_MEMORY_VALUE = 500
+
+MEMORY_ITEM_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "key": {"type": "string", "description": "snake_case, e.g. current_project, skill_python, timezone"},
+        "value": {"type": "string"},
+        "context": {"type": ["string", "null"], "description": "Why this is worth remembering"}
+    },
+    "required": ["key", "value", "context"],
+    "additionalProperties": False
+}
+
+# Structured output for memory extraction: the memories found in each numbered turn
+EXTRACTION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "memory_extraction",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "turns": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "turn": {"type": "integer"},
+                            "memories": {"type": "array", "items": MEMORY_ITEM_SCHEMA}
+                        },
+                        "required": ["turn", "memories"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["turns"],
+            "additionalProperties": False
+        }
+    }
+}
+
+EXTRACTION_PROMPT = """You read finished chat turns between BRRR Bot and Discord users and pick out things worth remembering about each user: their preferences, skills, current projects, interests, timezone, etc.
+
+For every turn that teaches something new, return its number and the memories. Skip turns with nothing new.
+Memory keys should be descriptive like: current_project, skill_<language>, interest_<topic>, timezone, preferred_name, etc.
+Reuse a known key when a fact changes. Only save memories that would be useful for future interactions. Don't save trivial or temporary information, or anything about the bot itself."""
+
+
+# Persona and instructions for chat. Kept free of anything per-user or per-turn so it is a
+# byte-identical prefix of every chat request and can hit provider-side prompt caches.
+CHAT_SYSTEM_PROMPT = """You are BRRR Bot, an energetic and helpful assistant for the BRRR Discord server focused on weekly coding projects.
+
+**Your personality:**
+- You go brrrrrrrrr (fast, efficient, high-energy)
+- You're enthusiastic about coding projects and helping people build cool stuff
+- You keep responses concise but helpful
+- You use occasional "brrr" sounds when excited
+- You're supportive and encourage people to ship their projects
+
+**Your capabilities:**
+- Help plan and manage weekly coding projects
+- Answer coding questions
+- Remember things about users to personalize interactions
+- Provide encouragement and motivation
+
+The next system message says who you're chatting with and what you remember about them.
+
+Remember: You're here to help make weekly projects go BRRRRR! 🚀"""
+
+
+def cached_tokens(usage: Dict[str, Any]) -> int:
+    """Prompt tokens served from the provider's prompt cache, in either usage format seen"""
+    details = usage.get("prompt_tokens_details") or {}
+    return int(details.get("cached_tokens") or usage.get("cache_read_input_tokens") or 0)
+
+
+@dataclass
+class Memory:
+    key: str
+    value: str
+    context: Optional[str] = None
+
 
 @dataclass
 class LLMResponse:
     content: str
-    memories_to_save: List[Dict[str, str]]  # [{key, value, context}]
     usage: Dict[str, int]
 
 
+@dataclass
+class ChatTurn:
+    """One finished exchange, queued for memory extraction"""
+    user_id: int
+    guild_id: int
+    user_name: str
+    message: str
+    reply: str
+    # key -> value the bot already remembers about the user
+    known: Dict[str, str]
+
+
+def validate_memories(items: Any) -> Tuple[List[Memory], int]:
+    """Check extracted memories against MEMORY_ITEM_SCHEMA and return (valid memories, rejected count)"""
+    if not isinstance(items, list):
+        return [], 1
+    valid = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        key = item.get('key')
+        value = item.get('value')
+        context = item.get('context')
+        if isinstance(key, str):
+            key = key.strip().lower().replace(' ', '_')
+        if (not isinstance(key, str) or not MEMORY_KEY_PATTERN.match(key)
+                or not isinstance(value, str) or not value.strip() or len(value) > MAX_MEMORY_VALUE
+                or not (context is None or isinstance(context, str))):
+            continue
+        valid.append(Memory(key=key, value=value.strip(), context=context or None))
+    return valid, len(items) - len(valid)
+
+
+class LLMAPIError(Exception):
+    """The provider answered a completion request with an error status"""
+
+
 class LLMClient:
-    """Requesty.ai LLM client - OpenAI compatible API"""
+    """LLM client for OpenAI-compatible providers"""
     
-    BASE_URL = "https://router.requesty.ai/v1"
-    
-    def __init__(self, api_key: str, model: str = "openai/gpt-4o-mini"):
-        self.api_key = api_key
+    def __init__(self, providers: Providers, model: str = "openai/gpt-4o-mini", router: Optional[ModelRouter] = None,
+                 hedge: Optional[HedgePolicy] = None, ledger: Optional[UsageLedger] = None):
+        # Where each model's requests go - see Providers.resolve
+        self.providers = providers
         self.model = model
+        # Which model serves each call type; by default every call uses `model`
+        self.router = router or ModelRouter(parse_routes('', model))
+        # Racing a second request against slow ones - off unless a policy is given
+        self.hedge = hedge
+        # Where every call's tokens and latency are totalled
+        self.ledger = ledger
         self.session: Optional[aiohttp.ClientSession] = None
     
     async def ensure_session(self):
@@ -34,49 +170,145 @@ class LLMClient:
         if self.session and not self.session.closed:
             await self.session.close()
     
-    def _build_system_prompt(self, user_memories: Dict[str, Any], user_name: str) -> str:
-        """Build the system prompt with user memories"""
+    async def _request(self, call_type: str, model: str, payload: Dict[str, Any],
+                       first_byte: Optional[asyncio.Event] = None) -> Dict[str, Any]:
+        """One completion attempt on one model, recorded in the router's health stats"""
+        provider, provider_model = self.providers.resolve(model)
         
-        memory_context = ""
-        if user_memories:
-            memory_lines = []
-            for key, data in user_memories.items():
-                if isinstance(data, dict):
-                    memory_lines.append(f"- {key}: {data.get('value', data)}")
-                else:
-                    memory_lines.append(f"- {key}: {data}")
-            memory_context = f"\n\n**What I remember about {user_name}:**\n" + "\n".join(memory_lines)
+        started = time.monotonic()
+        try:
+            async with self.session.post(
+                provider.url,
+                headers=provider.headers(),
+                json=provider.shape(payload, provider_model)
+            ) as response:
+                if first_byte is not None:
+                    first_byte.set()
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise LLMAPIError(f"LLM API error {response.status}: {error_text}")
+                
+                data = await response.json()
+        except (LLMAPIError, aiohttp.ClientError, asyncio.TimeoutError):
+            self.router.record(call_type, model, (time.monotonic() - started) * 1000, ok=False)
+            raise
         
-        return f"""You are BRRR Bot, an energetic and helpful assistant for the BRRR Discord server focused on weekly coding projects.
-
-**Your personality:**
-- You go brrrrrrrrr (fast, efficient, high-energy)
-- You're enthusiastic about coding projects and helping people build cool stuff
-- You keep responses concise but helpful
-- You use occasional "brrr" sounds when excited
-- You're supportive and encourage people to ship their projects
-
-**Your capabilities:**
-- Help plan and manage weekly coding projects
-- Answer coding questions
-- Remember things about users to personalize interactions
-- Provide encouragement and motivation
-
-**Memory System:**
-You can remember things about users. When you learn something worth remembering about a user (their preferences, skills, current projects, interests, timezone, etc.), you should include it in your response using this JSON format at the END of your message:
-
-```json
-{{"memories": [{{"key": "skill_python", "value": "advanced", "context": "mentioned they've been coding Python for 5 years"}}]}}
-```
-
-Memory keys should be descriptive like: current_project, skill_<language>, interest_<topic>, timezone, preferred_name, etc.
-Only save memories that would be useful for future interactions. Don't save trivial or temporary information.
-{memory_context}
-
-**Current context:**
-You're chatting with {user_name}.
-
-Remember: You're here to help make weekly projects go BRRRRR! 🚀"""
+        self.router.record(call_type, model, (time.monotonic() - started) * 1000, ok=True)
+        usage = data.get("usage") or {}
+        if usage.get("prompt_tokens"):
+            metrics.incr(f'llm.tokens.{call_type}.prompt', usage["prompt_tokens"])
+            metrics.incr(f'llm.tokens.{call_type}.cached', cached_tokens(usage))
+        return data
+    
+    async def _post_completion(self, call_type: str, payload: Dict[str, Any],
+                               owners: Sequence[Tuple[int, int]] = ((0, 0),),
+                               model: Optional[str] = None) -> Dict[str, Any]:
+        """
+        POST a chat completion on the route for call_type - or on model, if given - and
+        record its usage against the (guild_id, user_id) owners it was made for
+        """
+        await self.ensure_session()
+        
+        started = time.monotonic()
+        data = await self._complete(call_type, [model] if model else self.router.models_for(call_type), payload, owners)
+        self._record_usage(call_type, owners, data, (time.monotonic() - started) * 1000)
+        return data
+    
+    def _record_usage(self, call_type: str, owners: Sequence[Tuple[int, int]], data: Dict[str, Any],
+                      latency_ms: float):
+        if self.ledger is None:
+            return
+        usage = data.get("usage") or {}
+        self.ledger.record(
+            call_type, owners,
+            usage.get("prompt_tokens") or 0,
+            usage.get("completion_tokens") or 0,
+            cached_tokens(usage),
+            latency_ms
+        )
+    
+    async def _complete(self, call_type: str, models: List[str], payload: Dict[str, Any],
+                        owners: Sequence[Tuple[int, int]]) -> Dict[str, Any]:
+        """Run a completion on models in order - the next is only tried if one fails"""
+        if self.hedge is not None and call_type in self.hedge.call_types:
+            return await self._post_hedged(call_type, models, payload, owners)
+        
+        for attempt, model in enumerate(models):
+            try:
+                return await self._request(call_type, model, payload)
+            except (LLMAPIError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt + 1 == len(models):
+                    raise
+                metrics.incr(f'llm.route.{call_type}.failovers')
+                logger.warning(f"{call_type} call on {model} failed, retrying on {models[attempt + 1]}: {e}")
+    
+    async def _post_hedged(self, call_type: str, models: List[str], payload: Dict[str, Any],
+                           owners: Sequence[Tuple[int, int]]) -> Dict[str, Any]:
+        """
+        Like _complete, but if the first model hasn't started answering within the hedge
+        percentile of its recent latency, race a second request against it, keep whichever
+        finishes first and cancel the other
+        """
+        started = time.monotonic()
+        first_byte = asyncio.Event()
+        primary = asyncio.create_task(self._request(call_type, models[0], payload, first_byte))
+        hedge: Optional[asyncio.Task] = None
+        held_out = self.hedge.hold_out()
+        try:
+            delay = None if held_out else self.hedge.delay_ms(self.router.health(models[0]), self.router.min_calls)
+            if delay is not None:
+                waiter = asyncio.create_task(first_byte.wait())
+                await asyncio.wait({primary, waiter}, timeout=delay / 1000, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+            
+            if delay is None or first_byte.is_set() or primary.done():
+                self.hedge.skip()
+            elif self.hedge.take():
+                hedge_model = models[1] if self.hedge.alternate and len(models) > 1 else models[0]
+                hedge = asyncio.create_task(self._request(call_type, hedge_model, payload))
+                metrics.incr('llm.hedge.fired')
+            
+            pending = {task for task in (primary, hedge) if task is not None}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded:
+                    winner, *losers = succeeded
+                    for loser in losers:
+                        # Both finished at once - the loser was paid for too
+                        self._record_usage(call_type, owners, loser.result(), (time.monotonic() - started) * 1000)
+                    if winner is hedge:
+                        metrics.incr('llm.hedge.won')
+                        if not primary.done():
+                            # It took at least this long - recorded so the model's latency
+                            # percentile stays honest though the request never finishes
+                            self.router.health(models[0]).record((time.monotonic() - started) * 1000, ok=True)
+                    return winner.result()
+            
+            if hedge is None and len(models) > 1:
+                metrics.incr(f'llm.route.{call_type}.failovers')
+                logger.warning(f"{call_type} call on {models[0]} failed, retrying on {models[1]}: {primary.exception()}")
+                return await self._request(call_type, models[1], payload)
+            raise primary.exception()
+        finally:
+            # Held-out calls are the unhedged baseline the hedged latency is measured against
+            metrics.observe('llm.hedge.unhedged_ms' if held_out else 'llm.hedge.latency_ms',
+                            (time.monotonic() - started) * 1000)
+            # The loser, or both if our caller gave up
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+    
+    def _build_context_prompt(self, user_memories: Dict[str, Any], user_name: str) -> str:
+        """The per-user part of the chat system prompt, sent after CHAT_SYSTEM_PROMPT"""
+        lines = [f"You're chatting with {user_name}."]
+        if user_memories:
+            # Sorted so the same memories always render to the same bytes
+            lines.append(f"\n**What I remember about {user_name}:**")
+            for key, data in sorted(user_memories.items()):
+                value = data.get('value', data) if isinstance(data, dict) else data
+                lines.append(f"- {key}: {value}")
+        return "\n".join(lines)
 
     async def chat(
         self,
@@ -84,77 +316,104 @@ Remember: You're here to help make weekly projects go BRRRRR! 🚀"""
         user_memories: Dict[str, Any] = None,
         user_name: str = "User",
         temperature: float = 0.7,
-        max_tokens: int = 1000
+        max_tokens: int = 1000,
+        guild_id: int = 0,
+        user_id: int = 0,
+        model: Optional[str] = None
     ) -> LLMResponse:
         """Send a chat completion request"""
         
-        await self.ensure_session()
-        
-        system_prompt = self._build_system_prompt(user_memories or {}, user_name)
-        
-        full_messages = [{"role": "system", "content": system_prompt}] + messages
+        # The static prompt goes first and never changes, so providers can cache it as a
+        # prefix; everything that varies per user or turn comes after it
+        full_messages = [
+            {"role": "system", "content": CHAT_SYSTEM_PROMPT},
+            {"role": "system", "content": self._build_context_prompt(user_memories or {}, user_name)},
+            *messages
+        ]
         
         payload = {
-            "model": self.model,
             "messages": full_messages,
             "temperature": temperature,
             "max_tokens": max_tokens
         }
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+        data = await self._post_completion('chat', payload, [(guild_id, user_id)], model)
         
-        async with self.session.post(
-            f"{self.BASE_URL}/chat/completions",
-            headers=headers,
-            json=payload
-        ) as response:
-            if response.status != 200:
-                error_text = await response.text()
-                raise Exception(f"LLM API error {response.status}: {error_text}")
-            
-            data = await response.json()
+        return LLMResponse(
+            content=data["choices"][0]["message"]["content"],
+            usage=data.get("usage", {})
+        )
+    
+    async def extract_memories(self, turns: List[ChatTurn]) -> List[List[Memory]]:
+        """
+        Pick out memories from several finished turns in one structured-output call.
+        Returns one list of validated memories per turn, in order.
+        """
         
-        content = data["choices"][0]["message"]["content"]
-        usage = data.get("usage", {})
+        blocks = []
+        for i, turn in enumerate(turns, 1):
+            known = ", ".join(f"{k}={v}" for k, v in turn.known.items()) or "nothing yet"
+            blocks.append(
+                f"### Turn {i}\n"
+                f"User: {turn.user_name} (already known: {known})\n"
+                f"{turn.user_name} said: {turn.message}\n"
+                f"BRRR Bot replied: {turn.reply}"
+            )
         
-        # Extract memories from response
-        memories_to_save = []
-        clean_content = content
+        payload = {
+            "messages": [
+                {"role": "system", "content": EXTRACTION_PROMPT},
+                {"role": "user", "content": "\n\n".join(blocks)}
+            ],
+            "temperature": 0,
+            "max_tokens": 200 + 150 * len(turns),
+            "response_format": EXTRACTION_RESPONSE_FORMAT
+        }
         
-        # Look for JSON memory block at the end
-        if "```json" in content and '"memories"' in content:
-            try:
-                json_start = content.rfind("```json")
-                json_end = content.rfind("```", json_start + 7)
-                if json_start != -1 and json_end != -1:
-                    json_str = content[json_start + 7:json_end].strip()
-                    memory_data = json.loads(json_str)
-                    if "memories" in memory_data:
-                        memories_to_save = memory_data["memories"]
-                    # Remove the JSON block from the displayed content
-                    clean_content = content[:json_start].strip()
-            except (json.JSONDecodeError, KeyError):
-                pass  # No valid memory JSON found
+        data = await self._post_completion('memory', payload, [(turn.guild_id, turn.user_id) for turn in turns])
         
-        return LLMResponse(
-            content=clean_content,
-            memories_to_save=memories_to_save,
-            usage=usage
-        )
+        usage = data.get("usage", {})
+        if usage.get("completion_tokens") is not None:
+            metrics.observe('llm.memory.output_tokens', usage["completion_tokens"] / len(turns))
+        return self._parse_extraction(data["choices"][0]["message"]["content"], len(turns))
+    
+    @staticmethod
+    def _parse_extraction(content: str, turn_count: int) -> List[List[Memory]]:
+        """Validate a structured extraction response into per-turn memories"""
+        results: List[List[Memory]] = [[] for _ in range(turn_count)]
+        metrics.incr('llm.memory.batches')
+        try:
+            entries = json.loads(content)['turns']
+            if not isinstance(entries, list):
+                raise TypeError("turns is not a list")
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            metrics.incr('llm.memory.malformed')
+            logger.warning(f"Malformed memory extraction response: {e}")
+            return results
+        
+        metrics.incr('llm.memory.parsed')
+        for entry in entries:
+            turn = entry.get('turn') if isinstance(entry, dict) else None
+            if not isinstance(turn, int) or not 1 <= turn <= turn_count:
+                metrics.incr('llm.memory.rejected')
+                continue
+            memories, rejected = validate_memories(entry.get('memories', []))
+            results[turn - 1].extend(memories)
+            metrics.incr('llm.memory.saved', len(memories))
+            metrics.incr('llm.memory.rejected', rejected)
+        return results
     
     async def generate_project_plan(
         self,
         project_title: str,
         project_description: str,
-        user_context: str = ""
+        user_context: str = "",
+        guild_id: int = 0,
+        user_id: int = 0,
+        model: Optional[str] = None
     ) -> str:
         """Generate a project plan/checklist"""
         
-        await self.ensure_session()
-        
         prompt = f"""Generate a concise project checklist for:
 
 **Project:** {project_title}
@@ -170,7 +429,6 @@ Respond with ONLY the task list, one task per line, no numbering or bullets."""
         messages = [{"role": "user", "content": prompt}]
         
         payload = {
-            "model": self.model,
             "messages": [
                 {"role": "system", "content": "You are a project planning assistant. Be concise and practical."},
                 *messages
@@ -179,29 +437,14 @@ Respond with ONLY the task list, one task per line, no numbering or bullets."""
             "max_tokens": 500
         }
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        async with self.session.post(
-            f"{self.BASE_URL}/chat/completions",
-            headers=headers,
-            json=payload
-        ) as response:
-            if response.status != 200:
-                error_text = await response.text()
-                raise Exception(f"LLM API error {response.status}: {error_text}")
-            
-            data = await response.json()
+        data = await self._post_completion('plan', payload, [(guild_id, user_id)], model)
         
         return data["choices"][0]["message"]["content"]
     
-    async def generate_retro_summary(self, project_title: str, tasks: List[Dict]) -> str:
+    async def generate_retro_summary(self, project_title: str, tasks: List[Dict], guild_id: int = 0,
+                                     user_id: int = 0, model: Optional[str] = None) -> str:
         """Generate a retrospective summary"""
         
-        await self.ensure_session()
-        
         completed = [t for t in tasks if t.get('is_done')]
         incomplete = [t for t in tasks if not t.get('is_done')]
         
@@ -218,7 +461,6 @@ Be encouraging and positive!"""
         messages = [{"role": "user", "content": prompt}]
         
         payload = {
-            "model": self.model,
             "messages": [
                 {"role": "system", "content": "You are BRRR Bot, celebrating weekly project progress. Be enthusiastic!"},
                 *messages
@@ -227,20 +469,6 @@ Be encouraging and positive!"""
             "max_tokens": 200
         }
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        async with self.session.post(
-            f"{self.BASE_URL}/chat/completions",
-            headers=headers,
-            json=payload
-        ) as response:
-            if response.status != 200:
-                error_text = await response.text()
-                raise Exception(f"LLM API error {response.status}: {error_text}")
-            
-            data = await response.json()
+        data = await self._post_completion('retro', payload, [(guild_id, user_id)], model)
         
         return data["choices"][0]["message"]["content"]
@@ -0,0 +1,135 @@
+"""
+BRRR Bot - Background Memory Extraction
+Finished chat turns are queued here and mined for memories in batches,
+off the reply path
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.llm import ChatTurn, LLMClient
+from src.metrics import metrics
+from src.storage import Storage
+from src.usage import BUDGET_EXHAUSTED, UsageLedger
+
+logger = logging.getLogger('brrr.memory')
+
+
+class MemoryExtractor:
+    """
+    Collects finished turns and extracts memories from up to batch_size of them per LLM
+    call on the 'memory' route, waiting at most max_delay seconds for a batch to fill.
+    Results are written with one bulk upsert per guild.
+
+    Replies never wait on this. If extraction falls behind, turns beyond max_pending are
+    dropped rather than queued without bound - a missed memory is cheap. So are turns of
+    guilds that have used up their daily token budget, as chat replies are. On shutdown the
+    turns still queued are extracted straight away, for up to flush_timeout seconds.
+    """
+
+    def __init__(self, llm: LLMClient, db: Storage, batch_size: int = 8, max_delay: float = 5.0,
+                 max_pending: int = 500, ledger: Optional[UsageLedger] = None, flush_timeout: float = 10.0):
+        self.llm = llm
+        self.db = db
+        self.ledger = ledger
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.flush_timeout = flush_timeout
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._worker = asyncio.create_task(self._run(), name="memory-extractor")
+        logger.info(f"Memory extraction started (batches of {self.batch_size})")
+
+    async def stop(self):
+        """Extract the turns still queued, then cancel the worker"""
+        if self._worker:
+            try:
+                await asyncio.wait_for(self._flush(), self.flush_timeout)
+            except asyncio.TimeoutError:
+                dropped = 0
+                while not self._queue.empty():
+                    dropped += self._queue.get_nowait() is not None
+                metrics.incr('memory.dropped', dropped)
+                logger.warning(f"Memory extraction didn't finish within {self.flush_timeout}s of shutdown - "
+                               f"dropping {dropped} turn(s)")
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    def submit(self, turn: ChatTurn) -> bool:
+        """Queue a finished turn. Returns False if the backlog is full and it was dropped."""
+        try:
+            self._queue.put_nowait(turn)
+        except asyncio.QueueFull:
+            metrics.incr('memory.dropped')
+            return False
+        metrics.set_gauge('memory.pending', self._queue.qsize())
+        return True
+
+    async def _flush(self):
+        # None ends the batch being filled without waiting out max_delay
+        await self._queue.put(None)
+        await self._queue.join()
+
+    async def _next_batch(self) -> List[Optional[ChatTurn]]:
+        """Up to batch_size queued items - a trailing None means a flush was asked for"""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        metrics.set_gauge('memory.pending', self._queue.qsize())
+        return batch
+
+    async def _run(self):
+        while True:
+            items = await self._next_batch()
+            batch = [turn for turn in items if turn is not None]
+            started = time.monotonic()
+            try:
+                if batch:
+                    await self._process(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.incr('memory.failed_batches')
+                logger.error(f"Memory extraction failed for {len(batch)} turn(s): {e}", exc_info=True)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+            if batch:
+                metrics.observe('memory.batch_ms', (time.monotonic() - started) * 1000)
+
+    async def _process(self, batch: List[ChatTurn]):
+        if self.ledger is not None:
+            levels = {guild_id: await self.ledger.budget_level(guild_id) for guild_id in {t.guild_id for t in batch}}
+            within = [turn for turn in batch if levels[turn.guild_id] < BUDGET_EXHAUSTED]
+            metrics.incr('memory.over_budget', len(batch) - len(within))
+            batch = within
+            if not batch:
+                return
+        results = await self.llm.extract_memories(batch)
+
+        # Later turns win when the same key comes up twice in a batch
+        by_guild: Dict[int, Dict[Tuple[int, str], Tuple[int, str, str, Optional[str]]]] = {}
+        for turn, memories in zip(batch, results):
+            rows = by_guild.setdefault(turn.guild_id, {})
+            for mem in memories:
+                if turn.known.get(mem.key) == mem.value:
+                    continue
+                rows[(turn.user_id, mem.key)] = (turn.user_id, mem.key, mem.value, mem.context)
+                logger.info(f"Saving memory for {turn.user_name}: {mem.key} = {mem.value}")
+
+        for guild_id, rows in by_guild.items():
+            if rows:
+                metrics.incr('memory.written', await self.db.set_memories(guild_id, list(rows.values())))
+        metrics.incr('memory.turns', len(batch))
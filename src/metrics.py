@@ -0,0 +1,84 @@
+"""
+BRRR Bot - In-process Metrics
+Counters, gauges, latency samples and event rates for the /metrics command
+"""
+
+import time
+from collections import defaultdict, deque
+from typing import Dict, Any, List, Optional
+
+
+class Metrics:
+    """Tiny metrics registry - everything lives in memory and resets on restart"""
+
+    def __init__(self, sample_window: int = 512, rate_window: float = 60.0):
+        self.sample_window = sample_window
+        self.rate_window = rate_window
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.gauges: Dict[str, float] = {}
+        self._samples: Dict[str, deque] = defaultdict(lambda: deque(maxlen=self.sample_window))
+        self._events: Dict[str, deque] = defaultdict(deque)
+
+    def incr(self, name: str, value: int = 1):
+        """Increment a counter"""
+        self.counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        """Set a gauge to its current value"""
+        self.gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        """Record a sample (usually a latency in ms)"""
+        self._samples[name].append(value)
+
+    def mark(self, name: str):
+        """Record that an event happened now, for rate calculations"""
+        now = time.monotonic()
+        events = self._events[name]
+        events.append(now)
+        # Drop events that fell out of the rate window
+        while events and events[0] < now - self.rate_window:
+            events.popleft()
+
+    def percentile(self, name: str, pct: float) -> Optional[float]:
+        """Get a percentile (0-100) of the recorded samples"""
+        samples = self._samples.get(name)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def rate(self, name: str) -> float:
+        """Events per second over the rate window"""
+        events = self._events.get(name)
+        if not events:
+            return 0.0
+        cutoff = time.monotonic() - self.rate_window
+        return sum(1 for t in events if t >= cutoff) / self.rate_window
+
+    def names(self, prefix: str = "") -> List[str]:
+        """All metric names starting with a prefix"""
+        all_names = set(self.counters) | set(self.gauges) | set(self._samples) | set(self._events)
+        return sorted(n for n in all_names if n.startswith(prefix))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Dump everything as plain values"""
+        return {
+            'counters': dict(self.counters),
+            'gauges': dict(self.gauges),
+            'latency': {
+                name: {
+                    'p50': self.percentile(name, 50),
+                    'p95': self.percentile(name, 95),
+                    'p99': self.percentile(name, 99),
+                    'count': len(samples)
+                }
+                for name, samples in self._samples.items() if samples
+            },
+            'rates': {name: self.rate(name) for name in self._events}
+        }
+
+
+# Shared registry used across the bot
+metrics = Metrics()
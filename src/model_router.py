@@ -0,0 +1,217 @@
+"""
+BRRR Bot - Model Routing
+Per-call-type primary/fallback models, with failover driven by each model's
+recent latency and error rate
+"""
+
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+from src.metrics import metrics
+
+logger = logging.getLogger('brrr.llm.routing')
+
+# Every kind of completion the bot makes
+CALL_TYPES = ['chat', 'plan', 'retro', 'memory']
+
+
+@dataclass
+class Route:
+    primary: str
+    fallback: Optional[str] = None
+
+
+def parse_routes(spec: str, default_model: str, defaults: Optional[Dict[str, Route]] = None) -> Dict[str, Route]:
+    """
+    Build the routing table from 'type=primary|fallback,type=primary'. Call types not
+    mentioned use their entry in defaults, or default_model with no fallback.
+    """
+    routes = {call_type: Route(default_model) for call_type in CALL_TYPES}
+    routes.update(defaults or {})
+    for entry in filter(None, (part.strip() for part in spec.split(','))):
+        call_type, _, models = entry.partition('=')
+        call_type = call_type.strip()
+        if call_type not in routes or not models.strip():
+            raise ValueError(f"Bad LLM route '{entry}' - expected one of {', '.join(CALL_TYPES)}=model[|fallback]")
+        primary, _, fallback = models.partition('|')
+        routes[call_type] = Route(primary.strip(), fallback.strip() or None)
+    return routes
+
+
+class ModelHealth:
+    """Outcomes of a model's calls over the last window_seconds"""
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        # (monotonic time, latency ms, succeeded)
+        self._calls: Deque[Tuple[float, float, bool]] = deque()
+
+    def record(self, latency_ms: float, ok: bool):
+        self._calls.append((time.monotonic(), latency_ms, ok))
+        self._trim()
+
+    def _trim(self):
+        cutoff = time.monotonic() - self.window_seconds
+        while self._calls and self._calls[0][0] < cutoff:
+            self._calls.popleft()
+
+    def count(self) -> int:
+        self._trim()
+        return len(self._calls)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency percentile (0-100) over the window, failed calls included"""
+        self._trim()
+        if not self._calls:
+            return None
+        ordered = sorted(latency for _, latency, _ in self._calls)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def p95(self) -> Optional[float]:
+        return self.percentile(95)
+
+    def error_rate(self) -> float:
+        self._trim()
+        if not self._calls:
+            return 0.0
+        return sum(1 for _, _, ok in self._calls if not ok) / len(self._calls)
+
+
+class ModelRouter:
+    """
+    Picks the model for each call type. A route's primary is skipped in favour of its
+    fallback while, over the last window_seconds and with at least min_calls calls, its
+    p95 latency exceeds max_p95_ms or its error rate exceeds max_error_rate.
+
+    A skipped primary gets no new samples, so its old ones age out of the window and it
+    is tried again - recovery needs no separate probing.
+    """
+
+    def __init__(self, routes: Dict[str, Route], max_p95_ms: float = 15000, max_error_rate: float = 0.3,
+                 window_seconds: float = 300, min_calls: int = 5):
+        self.routes = routes
+        self.max_p95_ms = max_p95_ms
+        self.max_error_rate = max_error_rate
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self._health: Dict[str, ModelHealth] = {}
+        # call_type -> whether it is currently failed over, for logging transitions
+        self._failed_over: Dict[str, bool] = {}
+
+    def health(self, model: str) -> ModelHealth:
+        if model not in self._health:
+            self._health[model] = ModelHealth(self.window_seconds)
+        return self._health[model]
+
+    def is_healthy(self, model: str) -> bool:
+        health = self.health(model)
+        if health.count() < self.min_calls:
+            return True
+        p95 = health.p95()
+        return health.error_rate() <= self.max_error_rate and (p95 is None or p95 <= self.max_p95_ms)
+
+    def models_for(self, call_type: str) -> List[str]:
+        """Models to try for a call, in order - the second is only used if the first fails"""
+        route = self.routes[call_type]
+        if route.fallback is None or route.fallback == route.primary:
+            return [route.primary]
+
+        failed_over = not self.is_healthy(route.primary) and self.is_healthy(route.fallback)
+        if failed_over != self._failed_over.get(call_type, False):
+            self._failed_over[call_type] = failed_over
+            if failed_over:
+                health = self.health(route.primary)
+                logger.warning(
+                    f"Route '{call_type}' failing over from {route.primary} to {route.fallback} "
+                    f"(p95 {health.p95():.0f}ms, {health.error_rate() * 100:.0f}% errors)"
+                )
+            else:
+                logger.info(f"Route '{call_type}' back on {route.primary}")
+        metrics.set_gauge(f'llm.route.{call_type}.failed_over', int(failed_over))
+
+        if failed_over:
+            return [route.fallback, route.primary]
+        return [route.primary, route.fallback]
+
+    def record(self, call_type: str, model: str, latency_ms: float, ok: bool):
+        self.health(model).record(latency_ms, ok)
+        metrics.incr(f'llm.route.{call_type}.calls')
+        if ok:
+            metrics.observe(f'llm.route.{call_type}.latency_ms', latency_ms)
+        else:
+            metrics.incr(f'llm.route.{call_type}.errors')
+
+    def status(self) -> Dict[str, Dict[str, object]]:
+        """Per call type: the model in use and its recent latency and error rate"""
+        result = {}
+        for call_type in self.routes:
+            model = self.models_for(call_type)[0]
+            health = self.health(model)
+            result[call_type] = {
+                'model': model,
+                'failed_over': self._failed_over.get(call_type, False),
+                'p95_ms': health.p95(),
+                'error_rate': health.error_rate(),
+                'calls': health.count()
+            }
+        return result
+
+    def model_status(self) -> Dict[str, Dict[str, object]]:
+        """Recent latency and error rate of every model called in the window, for comparing them"""
+        return {
+            model: {'p50_ms': health.percentile(50), 'p95_ms': health.p95(),
+                    'error_rate': health.error_rate(), 'calls': health.count()}
+            for model, health in self._health.items() if health.count()
+        }
+
+
+class HedgePolicy:
+    """
+    When to race a second request against a slow one: after the first has gone
+    `percentile` of its model's recent latency without a response. At most `budget`
+    of the last `window` eligible calls may hedge, capping the extra spend. A `holdout`
+    share of calls never hedges, as the baseline hedged latency is compared against.
+    """
+
+    def __init__(self, percentile: float = 95, budget: float = 0.1, alternate: bool = True,
+                 call_types: Tuple[str, ...] = ('chat',), window: int = 200, holdout: float = 0.05):
+        self.percentile = percentile
+        self.budget = budget
+        self.holdout = holdout
+        # Hedge on the route's other model when it has one, rather than repeating the same
+        self.alternate = alternate
+        self.call_types = call_types
+        # Whether each recent eligible call hedged
+        self._recent: Deque[bool] = deque(maxlen=window)
+        self._calls = 0
+
+    def hold_out(self) -> bool:
+        """Whether this call is one of the unhedged baseline - every 1/holdout-th call"""
+        self._calls += 1
+        return self.holdout > 0 and self._calls % max(1, round(1 / self.holdout)) == 0
+
+    def delay_ms(self, health: ModelHealth, min_calls: int) -> Optional[float]:
+        """How long to wait before hedging - None until the model has enough history"""
+        if health.count() < min_calls:
+            return None
+        return health.percentile(self.percentile)
+
+    def take(self) -> bool:
+        """Claim a hedge if the budget allows"""
+        metrics.incr('llm.hedge.eligible')
+        # Share of the calls actually seen, counting this one - not of the full window,
+        # which would let every call hedge until the window fills
+        if sum(self._recent) + 1 > self.budget * (len(self._recent) + 1):
+            metrics.incr('llm.hedge.over_budget')
+            self._recent.append(False)
+            return False
+        self._recent.append(True)
+        return True
+
+    def skip(self):
+        """Record a call that didn't need a hedge"""
+        metrics.incr('llm.hedge.eligible')
+        self._recent.append(False)
@@ -0,0 +1,183 @@
+"""
+BRRR Bot - Outbound Send Scheduler
+Packs embeds, splits long text on safe boundaries and paces sends per channel
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, List, Optional
+
+import discord
+
+from src.metrics import metrics
+
+logger = logging.getLogger('brrr.outbound')
+
+# Discord message limits
+MAX_MESSAGE_LENGTH = 2000
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_TOTAL_CHARS = 6000
+
+# Per-channel message rate limit (messages per window)
+CHANNEL_RATE = 5
+CHANNEL_RATE_WINDOW = 5.0
+
+
+def _find_cut(text: str, budget: int) -> int:
+    """Index to cut text at - the latest paragraph, line or word break that keeps the chunk useful"""
+    for separator in ('\n\n', '\n', ' '):
+        index = text.rfind(separator, 0, budget)
+        if index > budget // 2:
+            return index + len(separator)
+    return budget
+
+
+def split_text(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """
+    Split text into chunks of at most `limit` characters.
+    Prefers paragraph, then line, then word boundaries, and closes/reopens code blocks
+    that would otherwise be cut in half.
+    """
+    chunks = []
+    remaining = text
+    reopen = ""
+
+    while remaining:
+        if len(reopen) + len(remaining) <= limit:
+            chunks.append(reopen + remaining)
+            break
+
+        # Leave room for the closing fence
+        budget = limit - len(reopen) - 4
+        cut = _find_cut(remaining, budget)
+        chunk = reopen + remaining[:cut].rstrip()
+        remaining = remaining[cut:]
+
+        if chunk.count("```") % 2 == 1:
+            language = chunk[chunk.rfind("```") + 3:].split("\n", 1)[0].strip()
+            chunk += "\n```"
+            reopen = f"```{language}\n"
+        else:
+            reopen = ""
+
+        chunks.append(chunk)
+
+    return chunks
+
+
+def pack_embeds(embeds: List[discord.Embed]) -> List[List[discord.Embed]]:
+    """Group embeds into as few messages as possible within Discord's count and size limits"""
+    groups: List[List[discord.Embed]] = []
+    current: List[discord.Embed] = []
+    current_size = 0
+
+    for embed in embeds:
+        size = len(embed)
+        if current and (len(current) >= MAX_EMBEDS_PER_MESSAGE or current_size + size > MAX_EMBED_TOTAL_CHARS):
+            groups.append(current)
+            current, current_size = [], 0
+        current.append(embed)
+        current_size += size
+
+    if current:
+        groups.append(current)
+    return groups
+
+
+class SendScheduler:
+    """
+    Serialises sends per channel and keeps each channel under its message rate limit,
+    so bursts queue locally instead of bouncing off 429s. discord.py's HTTP client still
+    honours the rate-limit headers on every request; this just avoids hitting them.
+    """
+
+    def __init__(self, rate: int = CHANNEL_RATE, window: float = CHANNEL_RATE_WINDOW):
+        self.rate = rate
+        self.window = window
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._sent: Dict[int, Deque[float]] = {}
+        # Sends holding or waiting for each channel's lock
+        self._users: Dict[int, int] = {}
+        self._next_prune = 0.0
+
+    async def _pace(self, channel_id: int):
+        """Wait until the channel has room in its rate window"""
+        sent = self._sent.setdefault(channel_id, deque())
+        while True:
+            now = time.monotonic()
+            while sent and sent[0] <= now - self.window:
+                sent.popleft()
+            if len(sent) < self.rate:
+                sent.append(now)
+                return
+            await asyncio.sleep(sent[0] + self.window - now)
+
+    @asynccontextmanager
+    async def _turn(self, channel_id: int):
+        """Hold the channel's lock with room in its rate window"""
+        lock = self._locks.setdefault(channel_id, asyncio.Lock())
+        self._users[channel_id] = self._users.get(channel_id, 0) + 1
+        try:
+            async with lock:
+                await self._pace(channel_id)
+                yield
+        finally:
+            self._users[channel_id] -= 1
+            if not self._users[channel_id]:
+                del self._users[channel_id]
+            self._prune()
+
+    def _prune(self):
+        """Forget channels nobody is sending to whose rate window has emptied - at most once per window"""
+        now = time.monotonic()
+        if now < self._next_prune:
+            return
+        self._next_prune = now + self.window
+        idle = [
+            channel_id for channel_id in self._locks
+            if channel_id not in self._users
+            and not any(ts > now - self.window for ts in self._sent.get(channel_id, ()))
+        ]
+        for channel_id in idle:
+            del self._locks[channel_id]
+            self._sent.pop(channel_id, None)
+
+    async def _send(self, channel: discord.abc.Messageable, **kwargs) -> discord.Message:
+        channel_id = getattr(channel, 'id', 0)
+        queued_at = time.monotonic()
+
+        async with self._turn(channel_id):
+            started = time.monotonic()
+            metrics.observe('outbound.queue_ms', (started - queued_at) * 1000)
+            message = await channel.send(**kwargs)
+            metrics.observe('outbound.send_ms', (time.monotonic() - started) * 1000)
+            metrics.incr('outbound.messages')
+            return message
+
+    async def edit(self, message: discord.PartialMessage, **kwargs) -> discord.Message:
+        """Edit a message, paced with the rest of its channel's traffic"""
+        async with self._turn(message.channel.id):
+            metrics.incr('outbound.edits')
+            return await message.edit(**kwargs)
+
+    async def send_text(self, channel: discord.abc.Messageable, text: str,
+                        reply_to: Optional[discord.Message] = None) -> List[discord.Message]:
+        """Send text of any length; the first chunk replies to `reply_to` if given"""
+        sent = []
+        for i, chunk in enumerate(split_text(text)):
+            if i == 0 and reply_to is not None:
+                sent.append(await self._send(channel, content=chunk, reference=reply_to, mention_author=False))
+            else:
+                sent.append(await self._send(channel, content=chunk))
+        return sent
+
+    async def send_embeds(self, channel: discord.abc.Messageable,
+                          embeds: List[discord.Embed]) -> List[discord.Message]:
+        """Send embeds packed up to 10 per message"""
+        sent = []
+        for group in pack_embeds(embeds):
+            sent.append(await self._send(channel, embeds=group))
+        return sent
@@ -0,0 +1,84 @@
+"""
+BRRR Bot - LLM Providers
+OpenAI-compatible endpoints the bot can send completions to - the hosted Requesty
+router, or a local server such as llama.cpp - and how to shape requests for each
+"""
+
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.metrics import metrics
+
+logger = logging.getLogger('brrr.llm.providers')
+
+REQUESTY_BASE_URL = "https://router.requesty.ai/v1"
+
+
+@dataclass
+class Provider:
+    """
+    One OpenAI-compatible chat completions endpoint. json_schema and json_mode say which
+    response_format types it accepts; structured-output requests are downgraded to what
+    it supports.
+    """
+    name: str
+    base_url: str
+    api_key: Optional[str] = None
+    json_schema: bool = True
+    json_mode: bool = True
+    extra_headers: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url.rstrip('/')}/chat/completions"
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json", **self.extra_headers}
+        # Local servers usually run without auth
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def shape(self, payload: Dict[str, Any], model: str) -> Dict[str, Any]:
+        """The request body for this provider"""
+        body = {**payload, "model": model}
+        response_format = body.get("response_format")
+        if response_format and response_format.get("type") == "json_schema" and not self.json_schema:
+            # Without schema enforcement, spell the schema out in the prompt instead
+            schema = response_format["json_schema"]["schema"]
+            body["messages"] = [
+                *body["messages"],
+                {"role": "system", "content": f"Reply with only a JSON object matching this JSON schema:\n{json.dumps(schema)}"}
+            ]
+            if self.json_mode:
+                body["response_format"] = {"type": "json_object"}
+            else:
+                del body["response_format"]
+            metrics.incr(f'llm.provider.{self.name}.downgraded')
+        return body
+
+
+class Providers:
+    """
+    The configured providers. Models are addressed as 'provider:model' - e.g.
+    'local:qwen2.5-7b-instruct' - and anything without a known provider prefix
+    goes to the default provider.
+    """
+
+    def __init__(self, providers: List[Provider], default: str):
+        self._by_name = {provider.name: provider for provider in providers}
+        if default not in self._by_name:
+            raise ValueError(f"Unknown default LLM provider '{default}' - configured: {', '.join(self._by_name)}")
+        self.default = default
+
+    def names(self) -> List[str]:
+        return list(self._by_name)
+
+    def resolve(self, model: str) -> Tuple[Provider, str]:
+        """The provider for a model string, and the model name to send it"""
+        name, sep, rest = model.partition(':')
+        if sep and rest and name in self._by_name:
+            return self._by_name[name], rest
+        return self._by_name[self.default], model
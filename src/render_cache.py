@@ -0,0 +1,54 @@
+"""
+BRRR Bot - Render Cache
+Reuses built embeds until the guild's data version changes
+"""
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Tuple
+
+import discord
+
+from src.metrics import metrics
+
+
+class RenderCache:
+    """
+    LRU of rendered values keyed on (command, guild, args), tagged with the guild data
+    version they were built from. A lookup only hits if the version still matches,
+    so a hit needs no database reads at all.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[int, Any]]" = OrderedDict()
+
+    async def get_or_render(self, command: str, guild_id: int, version: int,
+                            args: Tuple[Hashable, ...], render: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for this version, or render and cache it"""
+        key = (command, guild_id, args)
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] == version:
+            self._entries.move_to_end(key)
+            metrics.incr('render_cache.hits')
+            return cached[1]
+
+        metrics.incr('render_cache.misses')
+        value = await render()
+        self._entries[key] = (version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    async def get_embed(self, command: str, guild_id: int, version: int,
+                        args: Tuple[Hashable, ...], render: Callable[[], Awaitable[discord.Embed]]) -> discord.Embed:
+        """Like get_or_render, but stores the embed as a dict and hands back a fresh copy"""
+        async def render_dict():
+            return (await render()).to_dict()
+
+        return discord.Embed.from_dict(await self.get_or_render(command, guild_id, version, args, render_dict))
+
+    def hit_rate(self) -> float:
+        hits = metrics.counters.get('render_cache.hits', 0)
+        total = hits + metrics.counters.get('render_cache.misses', 0)
+        return hits / total if total else 0.0
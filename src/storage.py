@@ -0,0 +1,375 @@
+"""
+BRRR Bot - Storage Interface
+What the bot needs from its data store, independent of the database behind it
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any, Iterable, Tuple, Union, Callable, AsyncIterator, AsyncIterable, Hashable
+
+# Bumped whenever the NDJSON export layout changes
+EXPORT_FORMAT_VERSION = 1
+
+# Weeks of history the weekly summary shows by default
+DEFAULT_TREND_WEEKS = 4
+
+
+def to_epoch(when: datetime) -> int:
+    """Epoch seconds for a naive UTC datetime"""
+    return int(when.replace(tzinfo=timezone.utc).timestamp())
+
+
+def utc_now() -> Tuple[str, int]:
+    """The current time as (ISO text, epoch seconds)"""
+    now = datetime.utcnow()
+    return now.isoformat(), to_epoch(now)
+
+
+def iso_week(when: datetime = None) -> Tuple[str, int, int]:
+    """(week key like '2026-W42', week start, next week start) as epoch seconds for a moment"""
+    when = when or datetime.utcnow()
+    iso = when.isocalendar()
+    start = (when - timedelta(days=when.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    end = start + timedelta(days=7)
+    return f"{iso[0]}-W{iso[1]:02d}", to_epoch(start), to_epoch(end)
+
+
+class UnitOfWork:
+    """An open transaction that every storage call made by its task joins"""
+
+    def __init__(self, storage: 'Storage', key: Hashable, conn):
+        self.storage = storage
+        # Which database the transaction is on - a file, or a server
+        self.key = key
+        self.conn = conn
+        # Tasks spawned inside inherit the context var but must not share the connection
+        self.task = asyncio.current_task()
+        # guild_id -> data version, published only once the transaction commits
+        self.versions: Dict[int, int] = {}
+
+
+_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar('brrr_unit_of_work', default=None)
+
+
+class Storage(ABC):
+    """
+    Base class for storage backends. Cogs, the dashboard and the bot only use these
+    methods; src.database.Database (SQLite) and src.storage_postgres.PostgresStorage
+    implement them and return the same plain dicts.
+
+    Data versions live here: backends call _set_version() with the new version from
+    inside every transaction that changes guild data.
+    """
+
+    def __init__(self):
+        # guild_id -> data version, loaded lazily and kept current by our own writes.
+        # Safe to cache because each guild is only ever written by the process running its shard.
+        self._versions: Dict[int, int] = {}
+        # Called with a guild_id whenever that guild's data changes
+        self._write_listeners: List[Callable[[int], None]] = []
+
+    @abstractmethod
+    async def init(self):
+        """Create or migrate the schema"""
+
+    async def close(self):
+        """Release connections"""
+
+    # ============ DATA VERSION METHODS ============
+
+    def add_write_listener(self, listener: Callable[[int], None]):
+        """Register a callback run with the guild_id after every write to guild data"""
+        self._write_listeners.append(listener)
+
+    def _set_version(self, guild_id: int, version: int):
+        unit = self._current_unit()
+        if unit is not None:
+            # Readers outside the transaction can't see the new data yet
+            unit.versions[guild_id] = version
+            return
+        self._versions[guild_id] = version
+        for listener in self._write_listeners:
+            listener(guild_id)
+
+    @abstractmethod
+    async def get_guild_version(self, guild_id: int) -> int:
+        """Get the guild's data version - served from memory after the first call"""
+
+    # ============ UNIT OF WORK METHODS ============
+
+    @abstractmethod
+    def transaction(self, guild_id: Optional[int] = None):
+        """
+        Async context manager running every call the current task makes inside it as one
+        atomic transaction with a single commit - or none of them, if the block raises:
+
+            async with db.transaction(guild_id):
+                project_id = await db.create_project(guild_id, ...)
+                await db.mark_idea_used(idea_id, project_id)
+
+        Nested blocks join the outer one. With per-guild files it covers that guild's data.
+        """
+
+    def _current_unit(self, key: Hashable = None) -> Optional[UnitOfWork]:
+        """The current task's unit of work - on the database `key`, if given"""
+        unit = _unit_of_work.get()
+        if unit is None or unit.storage is not self or unit.task is not asyncio.current_task():
+            return None
+        if key is not None and unit.key != key:
+            return None
+        return unit
+
+    def _begin_unit(self, key: Hashable, conn) -> Tuple[UnitOfWork, Any]:
+        unit = UnitOfWork(self, key, conn)
+        return unit, _unit_of_work.set(unit)
+
+    def _end_unit(self, unit: UnitOfWork, token, committed: bool):
+        _unit_of_work.reset(token)
+        if committed:
+            for guild_id, version in unit.versions.items():
+                self._set_version(guild_id, version)
+
+    # ============ BOT STATE METHODS ============
+
+    @abstractmethod
+    async def get_state(self, key: str) -> Optional[str]:
+        """Get a bot state value"""
+
+    @abstractmethod
+    async def set_state(self, key: str, value: str) -> bool:
+        """Set a bot state value"""
+
+    # ============ PROJECT METHODS ============
+
+    @abstractmethod
+    async def create_project(self, guild_id: int, title: str, description: str = None,
+                             owners: List[int] = None, thread_id: int = None,
+                             tags: List[str] = None, template: str = None) -> int:
+        """Create a new project and return its ID"""
+
+    @abstractmethod
+    async def get_project(self, project_id: int) -> Optional[Dict[str, Any]]:
+        """Get a project by ID"""
+
+    @abstractmethod
+    async def get_guild_projects(self, guild_id: int, status: str = None) -> List[Dict[str, Any]]:
+        """Get all projects for a guild, optionally filtered by status"""
+
+    @abstractmethod
+    async def update_project(self, project_id: int, **kwargs) -> bool:
+        """Update project fields"""
+
+    async def archive_project(self, project_id: int) -> bool:
+        """Archive a project"""
+        now, now_ts = utc_now()
+        return await self.update_project(
+            project_id,
+            status='archived',
+            archived_at=now,
+            archived_ts=now_ts
+        )
+
+    @abstractmethod
+    async def get_projects_archived_since(self, guild_id: int, since: datetime) -> List[Dict[str, Any]]:
+        """Get a guild's projects archived at or after a moment, newest first"""
+
+    # ============ TASK METHODS ============
+
+    @abstractmethod
+    async def create_task(self, project_id: int, label: str, created_by: int = None) -> int:
+        """Create a new task"""
+
+    @abstractmethod
+    async def create_tasks(self, project_id: int, tasks: Iterable[Union[str, Tuple[str, bool]]],
+                           created_by: int = None) -> List[int]:
+        """Create many tasks in one transaction and return their IDs in order"""
+
+    @abstractmethod
+    async def get_project_tasks(self, project_id: int) -> List[Dict[str, Any]]:
+        """Get all tasks for a project"""
+
+    @abstractmethod
+    async def toggle_task(self, task_id: int) -> Optional[Dict[str, Any]]:
+        """Toggle task completion status and return the updated task"""
+
+    @abstractmethod
+    async def toggle_tasks(self, task_ids: List[int]) -> List[Dict[str, Any]]:
+        """Toggle several tasks at once and return the updated tasks"""
+
+    @abstractmethod
+    async def delete_task(self, task_id: int) -> bool:
+        """Delete a task"""
+
+    # ============ IDEA METHODS ============
+
+    @abstractmethod
+    async def create_idea(self, guild_id: int, author_id: int, title: str,
+                          description: str = None, tags: List[str] = None) -> int:
+        """Create a new idea"""
+
+    @abstractmethod
+    async def get_guild_ideas(self, guild_id: int, unused_only: bool = False) -> List[Dict[str, Any]]:
+        """Get ideas for a guild"""
+
+    @abstractmethod
+    async def mark_idea_used(self, idea_id: int, project_id: int) -> bool:
+        """Mark an idea as used by a project"""
+
+    @abstractmethod
+    async def delete_idea(self, idea_id: int) -> bool:
+        """Delete an idea"""
+
+    # ============ GUILD CONFIG METHODS ============
+
+    @abstractmethod
+    async def get_guild_config(self, guild_id: int) -> Dict[str, Any]:
+        """Get guild configuration, creating default if not exists"""
+
+    @abstractmethod
+    async def update_guild_config(self, guild_id: int, **kwargs) -> bool:
+        """Update guild configuration"""
+
+    @abstractmethod
+    async def get_dashboards(self) -> Dict[int, Tuple[int, int]]:
+        """Get guild_id -> (channel_id, message_id) for every guild with a live dashboard"""
+
+    # ============ USER MEMORY METHODS ============
+
+    @abstractmethod
+    async def set_memory(self, user_id: int, guild_id: int, key: str, value: str,
+                         context: str = None) -> bool:
+        """Set or update a memory for a user"""
+
+    @abstractmethod
+    async def set_memories(self, guild_id: int, memories: List[Tuple[int, str, str, Optional[str]]]) -> int:
+        """Set or update many (user_id, key, value, context) memories in one guild with one commit"""
+
+    @abstractmethod
+    async def get_memory(self, user_id: int, guild_id: int, key: str) -> Optional[str]:
+        """Get a specific memory for a user"""
+
+    @abstractmethod
+    async def get_all_memories(self, user_id: int, guild_id: int) -> Dict[str, Dict[str, Any]]:
+        """Get all memories for a user in a guild"""
+
+    @abstractmethod
+    async def delete_memory(self, user_id: int, guild_id: int, key: str) -> bool:
+        """Delete a specific memory"""
+
+    @abstractmethod
+    async def clear_user_memories(self, user_id: int, guild_id: int) -> bool:
+        """Clear all memories for a user in a guild"""
+
+    # ============ LLM USAGE METHODS ============
+
+    @abstractmethod
+    async def add_usage(self, guild_id: int, rows: List[Tuple[str, int, str, int, int, int, int, float]]) -> int:
+        """
+        Add (day, user_id, call_type, calls, prompt_tokens, completion_tokens, cached_tokens,
+        latency_ms) totals to a guild's usage ledger, summing into existing rows
+        """
+
+    @abstractmethod
+    async def get_usage(self, guild_id: int, since_day: str) -> List[Dict[str, Any]]:
+        """Get a guild's usage rows from since_day (YYYY-MM-DD) onwards"""
+
+    # ============ JOB QUEUE METHODS ============
+
+    @abstractmethod
+    async def enqueue_job(self, kind: str, guild_id: Optional[int], payload: Dict[str, Any],
+                          idempotency_key: Optional[str] = None, max_attempts: int = 3) -> Tuple[int, bool]:
+        """
+        Queue a job for a guild, unless one with the same idempotency key already exists.
+        Returns (job id, whether it was newly queued).
+        """
+
+    @abstractmethod
+    async def claim_jobs(self, owner: str, kinds: List[str], limit: int = 1, lease_seconds: float = 120,
+                         shards: Optional[Tuple[int, List[int]]] = None) -> List[Dict[str, Any]]:
+        """
+        Lease up to limit ready jobs of the given kinds to owner: queued jobs that are due,
+        and running jobs whose lease expired (their worker died). Expired jobs that are out
+        of attempts are marked failed instead.
+
+        With shards=(shard_count, shard_ids), only jobs for guilds on those shards (or for
+        no guild) are claimed, so guild data stays written by the process owning its shard.
+        """
+
+    @abstractmethod
+    async def finish_job(self, job_id: int, owner: str, error: Optional[str] = None,
+                         retry_at: Optional[float] = None) -> bool:
+        """
+        Mark a leased job done - or, with an error, queue it again at retry_at (epoch
+        seconds) or fail it for good. False if owner no longer holds the lease.
+        """
+
+    @abstractmethod
+    async def get_job_counts(self) -> Dict[str, int]:
+        """Number of jobs in each status"""
+
+    # ============ WEEKLY SNAPSHOT METHODS ============
+
+    @abstractmethod
+    async def snapshot_week(self, guild_id: int, when: datetime = None) -> Dict[str, Any]:
+        """Write this week's snapshot rows for a guild and return the guild-wide row"""
+
+    @abstractmethod
+    async def get_weekly_snapshots(self, guild_id: int, weeks: int = DEFAULT_TREND_WEEKS,
+                                   project_id: int = 0) -> List[Dict[str, Any]]:
+        """Get the most recent weekly snapshots for a guild (or one project), newest first"""
+
+    # ============ BACKUP / EXPORT METHODS ============
+
+    def data_files(self) -> List[str]:
+        """Local files holding bot data, for /admin backup - empty for database servers"""
+        return []
+
+    @abstractmethod
+    async def backup(self, target_path: str, source_path: str = None, pages: int = 256,
+                     progress: Callable[[int, int, int], None] = None):
+        """Copy one of data_files() to target_path while the bot keeps running"""
+
+    @abstractmethod
+    def iter_guild_export(self, guild_id: int, batch_size: int = 500) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (record type, row) for a guild's projects, tasks, ideas and memories, projects first"""
+
+    @abstractmethod
+    async def import_guild_records(self, guild_id: int, records: AsyncIterable[Tuple[str, Dict[str, Any]]],
+                                   batch_size: int = 500) -> Dict[str, int]:
+        """Insert exported records into a guild with new ids and return counts per record type"""
+
+    # ============ COLD TIER METHODS ============
+
+    def has_cold_tier(self) -> bool:
+        """Whether old rows live in a separate cold tier"""
+        return False
+
+    async def move_to_cold(self, archived_before: datetime, history_before: datetime, batch_size: int = 500,
+                           shards: Optional[Tuple[int, List[int]]] = None) -> Tuple[int, int]:
+        """
+        Move aged rows to the cold tier and return (projects moved, history rows moved).
+        With shards=(shard_count, shard_ids), only rows of guilds on those shards move.
+        """
+        return 0, 0
+
+    # ============ CONVERSATION HISTORY METHODS ============
+
+    @abstractmethod
+    async def add_message(self, user_id: int, guild_id: int, channel_id: int,
+                          role: str, content: str) -> int:
+        """Add a message to conversation history"""
+
+    @abstractmethod
+    async def get_recent_messages(self, user_id: int, guild_id: int, channel_id: int,
+                                  limit: int = 20) -> List[Dict[str, str]]:
+        """Get recent conversation history for context, oldest first"""
+
+    @abstractmethod
+    async def get_messages_older_than(self, cutoff: datetime, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Get up to `limit` conversation history rows created before a moment, oldest first"""
+
+    @abstractmethod
+    async def prune_old_messages(self, days: int = 7) -> int:
+        """Delete conversation history older than specified days"""
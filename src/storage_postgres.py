@@ -0,0 +1,856 @@
+"""
+BRRR Bot - PostgreSQL Storage
+asyncpg-backed implementation of the storage interface, for deployments that
+outgrow a single SQLite writer
+"""
+
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Iterable, Tuple, Union, AsyncIterator, AsyncIterable, Callable
+
+import asyncpg
+
+from src.storage import Storage, DEFAULT_TREND_WEEKS, to_epoch, utc_now, iso_week
+
+logger = logging.getLogger('brrr.storage.postgres')
+
+# Same tables and columns as the SQLite schema, so exports move freely between the two.
+# Large text needs no app-side compression here - PostgreSQL TOAST-compresses it.
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS projects (
+        id BIGSERIAL PRIMARY KEY,
+        guild_id BIGINT NOT NULL,
+        title TEXT NOT NULL,
+        description TEXT,
+        owners TEXT DEFAULT '[]',
+        status TEXT DEFAULT 'active',
+        thread_id BIGINT,
+        created_at TEXT NOT NULL,
+        archived_at TEXT,
+        tags TEXT DEFAULT '[]',
+        template TEXT,
+        created_ts BIGINT,
+        archived_ts BIGINT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tasks (
+        id BIGSERIAL PRIMARY KEY,
+        project_id BIGINT NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+        label TEXT NOT NULL,
+        is_done INTEGER DEFAULT 0,
+        created_by BIGINT,
+        created_at TEXT NOT NULL,
+        created_ts BIGINT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ideas (
+        id BIGSERIAL PRIMARY KEY,
+        guild_id BIGINT NOT NULL,
+        author_id BIGINT NOT NULL,
+        title TEXT NOT NULL,
+        description TEXT,
+        tags TEXT DEFAULT '[]',
+        used_project_id BIGINT,
+        created_at TEXT NOT NULL,
+        created_ts BIGINT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS guild_config (
+        guild_id BIGINT PRIMARY KEY,
+        projects_channel_id BIGINT,
+        admin_roles TEXT DEFAULT '[]',
+        thread_mode TEXT DEFAULT 'auto',
+        dashboard_channel_id BIGINT,
+        dashboard_message_id BIGINT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_memories (
+        id BIGSERIAL PRIMARY KEY,
+        user_id BIGINT NOT NULL,
+        guild_id BIGINT NOT NULL,
+        memory_key TEXT NOT NULL,
+        memory_value TEXT NOT NULL,
+        context TEXT,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        created_ts BIGINT,
+        updated_ts BIGINT,
+        UNIQUE (user_id, guild_id, memory_key)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS conversation_history (
+        id BIGSERIAL PRIMARY KEY,
+        user_id BIGINT NOT NULL,
+        guild_id BIGINT NOT NULL,
+        channel_id BIGINT NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        created_ts BIGINT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS bot_state (
+        key TEXT PRIMARY KEY,
+        value TEXT,
+        updated_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS guild_versions (
+        guild_id BIGINT PRIMARY KEY,
+        version BIGINT NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS weekly_snapshots (
+        guild_id BIGINT NOT NULL,
+        week TEXT NOT NULL,
+        project_id BIGINT NOT NULL DEFAULT 0,
+        tasks_done INTEGER NOT NULL DEFAULT 0,
+        tasks_total INTEGER NOT NULL DEFAULT 0,
+        active_projects INTEGER NOT NULL DEFAULT 0,
+        projects_created INTEGER NOT NULL DEFAULT 0,
+        projects_archived INTEGER NOT NULL DEFAULT 0,
+        ideas_added INTEGER NOT NULL DEFAULT 0,
+        updated_at TEXT NOT NULL,
+        PRIMARY KEY (guild_id, project_id, week)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS llm_usage (
+        guild_id BIGINT NOT NULL,
+        day TEXT NOT NULL,
+        user_id BIGINT NOT NULL DEFAULT 0,
+        call_type TEXT NOT NULL,
+        calls BIGINT NOT NULL DEFAULT 0,
+        prompt_tokens BIGINT NOT NULL DEFAULT 0,
+        completion_tokens BIGINT NOT NULL DEFAULT 0,
+        cached_tokens BIGINT NOT NULL DEFAULT 0,
+        latency_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+        PRIMARY KEY (guild_id, day, user_id, call_type)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS llm_jobs (
+        id BIGSERIAL PRIMARY KEY,
+        kind TEXT NOT NULL,
+        guild_id BIGINT,
+        idempotency_key TEXT UNIQUE,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL DEFAULT 3,
+        run_after DOUBLE PRECISION NOT NULL,
+        lease_owner TEXT,
+        lease_until DOUBLE PRECISION,
+        last_error TEXT,
+        created_ts BIGINT NOT NULL,
+        updated_ts BIGINT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_llm_jobs_ready ON llm_jobs (status, run_after)",
+    "CREATE INDEX IF NOT EXISTS idx_projects_guild_created ON projects (guild_id, created_ts)",
+    "CREATE INDEX IF NOT EXISTS idx_projects_guild_archived ON projects (guild_id, archived_ts)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_project ON tasks (project_id, created_ts)",
+    "CREATE INDEX IF NOT EXISTS idx_ideas_guild_created ON ideas (guild_id, created_ts)",
+    "CREATE INDEX IF NOT EXISTS idx_history_created ON conversation_history (created_ts)",
+    "CREATE INDEX IF NOT EXISTS idx_history_context ON conversation_history (user_id, guild_id, channel_id, created_ts)",
+]
+
+# Guild export records: (record type, query with $1 = guild_id, $2 = last id, $3 = batch size)
+EXPORT_QUERIES = [
+    ('project', "SELECT * FROM projects WHERE guild_id = $1 AND id > $2 ORDER BY id LIMIT $3"),
+    ('task', """
+        SELECT t.* FROM tasks t JOIN projects p ON p.id = t.project_id
+        WHERE p.guild_id = $1 AND t.id > $2 ORDER BY t.id LIMIT $3
+    """),
+    ('idea', "SELECT * FROM ideas WHERE guild_id = $1 AND id > $2 ORDER BY id LIMIT $3"),
+    ('memory', "SELECT * FROM user_memories WHERE guild_id = $1 AND id > $2 ORDER BY id LIMIT $3"),
+]
+IMPORT_TABLES = {'project': 'projects', 'task': 'tasks', 'idea': 'ideas', 'memory': 'user_memories'}
+
+# Version bumps return the new version so the in-memory cache stays current
+BUMP_VERSION = """
+    INSERT INTO guild_versions (guild_id, version) VALUES ($1, 1)
+    ON CONFLICT (guild_id) DO UPDATE SET version = guild_versions.version + 1
+    RETURNING version
+"""
+BUMP_VERSION_FOR_PROJECT = """
+    INSERT INTO guild_versions (guild_id, version)
+    SELECT guild_id, 1 FROM projects WHERE id = $1
+    ON CONFLICT (guild_id) DO UPDATE SET version = guild_versions.version + 1
+    RETURNING guild_id, version
+"""
+BUMP_VERSION_FOR_TASKS = """
+    INSERT INTO guild_versions (guild_id, version)
+    SELECT DISTINCT guild_id, 1 FROM projects
+    WHERE id IN (SELECT project_id FROM tasks WHERE id = ANY($1::bigint[]))
+    ON CONFLICT (guild_id) DO UPDATE SET version = guild_versions.version + 1
+    RETURNING guild_id, version
+"""
+
+
+class PostgresStorage(Storage):
+    """
+    PostgreSQL storage over an asyncpg connection pool. Every query goes through
+    asyncpg's per-connection statement cache, so each distinct statement is parsed and
+    planned once per pooled connection and then runs as a prepared statement.
+    """
+
+    def __init__(self, dsn: str, min_size: int = 2, max_size: int = 10, statement_cache_size: int = 256):
+        super().__init__()
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_cache_size = statement_cache_size
+        self.pool: Optional[asyncpg.Pool] = None
+
+    async def init(self):
+        """Open the pool and create the schema"""
+        self.pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            statement_cache_size=self.statement_cache_size
+        )
+        async with self._acquire() as conn:
+            # Serialise schema creation across shard processes starting together
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock(hashtext('brrr_schema'))")
+                for statement in SCHEMA:
+                    await conn.execute(statement)
+        logger.info(f"PostgreSQL pool ready ({self.min_size}-{self.max_size} connections)")
+
+    async def close(self):
+        if self.pool:
+            await self.pool.close()
+
+    # ============ UNIT OF WORK METHODS ============
+
+    @asynccontextmanager
+    async def transaction(self, guild_id: Optional[int] = None):
+        """Run the current task's calls on one pooled connection in one transaction"""
+        if self._current_unit(self.dsn) is not None:
+            yield
+            return
+        async with self.pool.acquire() as conn:
+            unit, token = self._begin_unit(self.dsn, conn)
+            committed = False
+            try:
+                async with conn.transaction():
+                    yield
+                committed = True
+            finally:
+                self._end_unit(unit, token, committed)
+
+    @asynccontextmanager
+    async def _acquire(self):
+        """A connection for several statements - the unit of work's, inside one"""
+        unit = self._current_unit(self.dsn)
+        if unit is not None:
+            # Methods' own conn.transaction() blocks become savepoints
+            yield unit.conn
+            return
+        async with self.pool.acquire() as conn:
+            yield conn
+
+    def _executor(self):
+        """Where single statements run - the unit of work's connection, or any pooled one"""
+        unit = self._current_unit(self.dsn)
+        return unit.conn if unit is not None else self.pool
+
+    # ============ DATA VERSION METHODS ============
+
+    async def get_guild_version(self, guild_id: int) -> int:
+        if guild_id not in self._versions:
+            version = await self._executor().fetchval(
+                "SELECT version FROM guild_versions WHERE guild_id = $1", guild_id
+            )
+            # Our own writes may have landed while we were reading
+            self._versions.setdefault(guild_id, version or 0)
+        return self._versions[guild_id]
+
+    async def _bump_version(self, conn, guild_id: int):
+        self._set_version(guild_id, await conn.fetchval(BUMP_VERSION, guild_id))
+
+    async def _bump_version_for_project(self, conn, project_id: int):
+        for row in await conn.fetch(BUMP_VERSION_FOR_PROJECT, project_id):
+            self._set_version(row['guild_id'], row['version'])
+
+    async def _bump_version_for_tasks(self, conn, task_ids: List[int]):
+        for row in await conn.fetch(BUMP_VERSION_FOR_TASKS, list(task_ids)):
+            self._set_version(row['guild_id'], row['version'])
+
+    # ============ BOT STATE METHODS ============
+
+    async def get_state(self, key: str) -> Optional[str]:
+        return await self._executor().fetchval("SELECT value FROM bot_state WHERE key = $1", key)
+
+    async def set_state(self, key: str, value: str) -> bool:
+        await self._executor().execute("""
+            INSERT INTO bot_state (key, value, updated_at) VALUES ($1, $2, $3)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+        """, key, value, datetime.utcnow().isoformat())
+        return True
+
+    # ============ PROJECT METHODS ============
+
+    async def create_project(self, guild_id: int, title: str, description: str = None,
+                             owners: List[int] = None, thread_id: int = None,
+                             tags: List[str] = None, template: str = None) -> int:
+        now, now_ts = utc_now()
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                project_id = await conn.fetchval("""
+                    INSERT INTO projects (guild_id, title, description, owners, thread_id, tags, template,
+                                          created_at, created_ts)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                    RETURNING id
+                """, guild_id, title, description, json.dumps(owners or []), thread_id,
+                    json.dumps(tags or []), template, now, now_ts)
+                await self._bump_version(conn, guild_id)
+        return project_id
+
+    async def get_project(self, project_id: int) -> Optional[Dict[str, Any]]:
+        row = await self._executor().fetchrow("SELECT * FROM projects WHERE id = $1", project_id)
+        return self._row_to_project(row) if row else None
+
+    async def get_guild_projects(self, guild_id: int, status: str = None) -> List[Dict[str, Any]]:
+        if status:
+            rows = await self._executor().fetch(
+                "SELECT * FROM projects WHERE guild_id = $1 AND status = $2 ORDER BY created_ts DESC",
+                guild_id, status
+            )
+        else:
+            rows = await self._executor().fetch(
+                "SELECT * FROM projects WHERE guild_id = $1 ORDER BY created_ts DESC", guild_id
+            )
+        return [self._row_to_project(row) for row in rows]
+
+    async def update_project(self, project_id: int, **kwargs) -> bool:
+        if not kwargs:
+            return False
+        for key in ['owners', 'tags']:
+            if key in kwargs and isinstance(kwargs[key], list):
+                kwargs[key] = json.dumps(kwargs[key])
+
+        set_clause = ", ".join(f"{k} = ${i}" for i, k in enumerate(kwargs, start=2))
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    f"UPDATE projects SET {set_clause} WHERE id = $1", project_id, *kwargs.values()
+                )
+                await self._bump_version_for_project(conn, project_id)
+        return True
+
+    async def get_projects_archived_since(self, guild_id: int, since: datetime) -> List[Dict[str, Any]]:
+        rows = await self._executor().fetch(
+            "SELECT * FROM projects WHERE guild_id = $1 AND archived_ts >= $2 ORDER BY archived_ts DESC",
+            guild_id, to_epoch(since)
+        )
+        return [self._row_to_project(row) for row in rows]
+
+    @staticmethod
+    def _row_to_project(row) -> Dict[str, Any]:
+        return {
+            'id': row['id'],
+            'guild_id': row['guild_id'],
+            'title': row['title'],
+            'description': row['description'],
+            'owners': json.loads(row['owners']),
+            'status': row['status'],
+            'thread_id': row['thread_id'],
+            'created_at': row['created_at'],
+            'archived_at': row['archived_at'],
+            'tags': json.loads(row['tags']),
+            'template': row['template']
+        }
+
+    # ============ TASK METHODS ============
+
+    async def create_task(self, project_id: int, label: str, created_by: int = None) -> int:
+        now, now_ts = utc_now()
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                task_id = await conn.fetchval("""
+                    INSERT INTO tasks (project_id, label, created_by, created_at, created_ts)
+                    VALUES ($1, $2, $3, $4, $5)
+                    RETURNING id
+                """, project_id, label, created_by, now, now_ts)
+                await self._bump_version_for_project(conn, project_id)
+        return task_id
+
+    async def create_tasks(self, project_id: int, tasks: Iterable[Union[str, Tuple[str, bool]]],
+                           created_by: int = None) -> List[int]:
+        labels, done = [], []
+        for task in tasks:
+            label, is_done = (task, False) if isinstance(task, str) else task
+            labels.append(label)
+            done.append(int(is_done))
+        if not labels:
+            return []
+
+        now, now_ts = utc_now()
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                # One statement for the whole list; ids are assigned in array order
+                rows = await conn.fetch("""
+                    INSERT INTO tasks (project_id, label, is_done, created_by, created_at, created_ts)
+                    SELECT $1, label, is_done, $4, $5, $6
+                    FROM unnest($2::text[], $3::int[]) WITH ORDINALITY AS t(label, is_done, n)
+                    ORDER BY n
+                    RETURNING id
+                """, project_id, labels, done, created_by, now, now_ts)
+                await self._bump_version_for_project(conn, project_id)
+        return sorted(row['id'] for row in rows)
+
+    async def get_project_tasks(self, project_id: int) -> List[Dict[str, Any]]:
+        rows = await self._executor().fetch(
+            "SELECT * FROM tasks WHERE project_id = $1 ORDER BY created_ts, id", project_id
+        )
+        return [dict(row) for row in rows]
+
+    async def toggle_task(self, task_id: int) -> Optional[Dict[str, Any]]:
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                row = await conn.fetchrow(
+                    "UPDATE tasks SET is_done = 1 - is_done WHERE id = $1 RETURNING *", task_id
+                )
+                if row:
+                    await self._bump_version_for_project(conn, row['project_id'])
+        return dict(row) if row else None
+
+    async def toggle_tasks(self, task_ids: List[int]) -> List[Dict[str, Any]]:
+        if not task_ids:
+            return []
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch(
+                    "UPDATE tasks SET is_done = 1 - is_done WHERE id = ANY($1::bigint[]) RETURNING *",
+                    list(task_ids)
+                )
+                await self._bump_version_for_tasks(conn, task_ids)
+        return [dict(row) for row in rows]
+
+    async def delete_task(self, task_id: int) -> bool:
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                await self._bump_version_for_tasks(conn, [task_id])
+                await conn.execute("DELETE FROM tasks WHERE id = $1", task_id)
+        return True
+
+    # ============ IDEA METHODS ============
+
+    async def create_idea(self, guild_id: int, author_id: int, title: str,
+                          description: str = None, tags: List[str] = None) -> int:
+        now, now_ts = utc_now()
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                idea_id = await conn.fetchval("""
+                    INSERT INTO ideas (guild_id, author_id, title, description, tags, created_at, created_ts)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7)
+                    RETURNING id
+                """, guild_id, author_id, title, description, json.dumps(tags or []), now, now_ts)
+                await self._bump_version(conn, guild_id)
+        return idea_id
+
+    async def get_guild_ideas(self, guild_id: int, unused_only: bool = False) -> List[Dict[str, Any]]:
+        if unused_only:
+            rows = await self._executor().fetch(
+                "SELECT * FROM ideas WHERE guild_id = $1 AND used_project_id IS NULL ORDER BY created_ts DESC",
+                guild_id
+            )
+        else:
+            rows = await self._executor().fetch(
+                "SELECT * FROM ideas WHERE guild_id = $1 ORDER BY created_ts DESC", guild_id
+            )
+        return [{**dict(row), 'tags': json.loads(row['tags'])} for row in rows]
+
+    async def mark_idea_used(self, idea_id: int, project_id: int) -> bool:
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("UPDATE ideas SET used_project_id = $1 WHERE id = $2", project_id, idea_id)
+                await self._bump_version_for_project(conn, project_id)
+        return True
+
+    async def delete_idea(self, idea_id: int) -> bool:
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                guild_id = await conn.fetchval("DELETE FROM ideas WHERE id = $1 RETURNING guild_id", idea_id)
+                if guild_id is not None:
+                    await self._bump_version(conn, guild_id)
+        return guild_id is not None
+
+    # ============ GUILD CONFIG METHODS ============
+
+    async def get_guild_config(self, guild_id: int) -> Dict[str, Any]:
+        # Insert-if-missing and read in one round trip
+        row = await self._executor().fetchrow("""
+            WITH inserted AS (
+                INSERT INTO guild_config (guild_id) VALUES ($1)
+                ON CONFLICT (guild_id) DO NOTHING
+                RETURNING *
+            )
+            SELECT * FROM inserted UNION ALL SELECT * FROM guild_config WHERE guild_id = $1
+        """, guild_id)
+        return {
+            'guild_id': row['guild_id'],
+            'projects_channel_id': row['projects_channel_id'],
+            'admin_roles': json.loads(row['admin_roles']),
+            'thread_mode': row['thread_mode'],
+            'dashboard_channel_id': row['dashboard_channel_id'],
+            'dashboard_message_id': row['dashboard_message_id']
+        }
+
+    async def update_guild_config(self, guild_id: int, **kwargs) -> bool:
+        if 'admin_roles' in kwargs and isinstance(kwargs['admin_roles'], list):
+            kwargs['admin_roles'] = json.dumps(kwargs['admin_roles'])
+
+        set_clause = ", ".join(f"{k} = ${i}" for i, k in enumerate(kwargs, start=2))
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    f"UPDATE guild_config SET {set_clause} WHERE guild_id = $1", guild_id, *kwargs.values()
+                )
+                await self._bump_version(conn, guild_id)
+        return True
+
+    async def get_dashboards(self) -> Dict[int, Tuple[int, int]]:
+        rows = await self._executor().fetch("""
+            SELECT guild_id, dashboard_channel_id, dashboard_message_id FROM guild_config
+            WHERE dashboard_message_id IS NOT NULL
+        """)
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    # ============ USER MEMORY METHODS ============
+
+    async def set_memory(self, user_id: int, guild_id: int, key: str, value: str,
+                         context: str = None) -> bool:
+        await self.set_memories(guild_id, [(user_id, key, value, context)])
+        return True
+
+    async def set_memories(self, guild_id: int, memories: List[Tuple[int, str, str, Optional[str]]]) -> int:
+        if not memories:
+            return 0
+        now, now_ts = utc_now()
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany("""
+                    INSERT INTO user_memories (user_id, guild_id, memory_key, memory_value, context,
+                                               created_at, updated_at, created_ts, updated_ts)
+                    VALUES ($1, $2, $3, $4, $5, $6, $6, $7, $7)
+                    ON CONFLICT (user_id, guild_id, memory_key) DO UPDATE SET
+                        memory_value = excluded.memory_value,
+                        context = excluded.context,
+                        updated_at = excluded.updated_at,
+                        updated_ts = excluded.updated_ts
+                """, [(user_id, guild_id, key, value, context, now, now_ts)
+                      for user_id, key, value, context in memories])
+        return len(memories)
+
+    async def get_memory(self, user_id: int, guild_id: int, key: str) -> Optional[str]:
+        return await self._executor().fetchval(
+            "SELECT memory_value FROM user_memories WHERE user_id = $1 AND guild_id = $2 AND memory_key = $3",
+            user_id, guild_id, key
+        )
+
+    async def get_all_memories(self, user_id: int, guild_id: int) -> Dict[str, Dict[str, Any]]:
+        rows = await self._executor().fetch(
+            "SELECT memory_key, memory_value, context, updated_at FROM user_memories "
+            "WHERE user_id = $1 AND guild_id = $2",
+            user_id, guild_id
+        )
+        return {row['memory_key']: {
+            'value': row['memory_value'],
+            'context': row['context'],
+            'updated_at': row['updated_at']
+        } for row in rows}
+
+    async def delete_memory(self, user_id: int, guild_id: int, key: str) -> bool:
+        await self._executor().execute(
+            "DELETE FROM user_memories WHERE user_id = $1 AND guild_id = $2 AND memory_key = $3",
+            user_id, guild_id, key
+        )
+        return True
+
+    async def clear_user_memories(self, user_id: int, guild_id: int) -> bool:
+        await self._executor().execute(
+            "DELETE FROM user_memories WHERE user_id = $1 AND guild_id = $2", user_id, guild_id
+        )
+        return True
+
+    # ============ LLM USAGE METHODS ============
+
+    async def add_usage(self, guild_id: int, rows: List[Tuple[str, int, str, int, int, int, int, float]]) -> int:
+        if not rows:
+            return 0
+        await self._executor().executemany("""
+            INSERT INTO llm_usage (guild_id, day, user_id, call_type, calls, prompt_tokens,
+                                   completion_tokens, cached_tokens, latency_ms)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+            ON CONFLICT (guild_id, day, user_id, call_type) DO UPDATE SET
+                calls = llm_usage.calls + excluded.calls,
+                prompt_tokens = llm_usage.prompt_tokens + excluded.prompt_tokens,
+                completion_tokens = llm_usage.completion_tokens + excluded.completion_tokens,
+                cached_tokens = llm_usage.cached_tokens + excluded.cached_tokens,
+                latency_ms = llm_usage.latency_ms + excluded.latency_ms
+        """, [(guild_id, *row) for row in rows])
+        return len(rows)
+
+    async def get_usage(self, guild_id: int, since_day: str) -> List[Dict[str, Any]]:
+        rows = await self._executor().fetch(
+            "SELECT * FROM llm_usage WHERE guild_id = $1 AND day >= $2 ORDER BY day",
+            guild_id, since_day
+        )
+        return [dict(row) for row in rows]
+
+    # ============ JOB QUEUE METHODS ============
+
+    async def enqueue_job(self, kind: str, guild_id: Optional[int], payload: Dict[str, Any],
+                          idempotency_key: Optional[str] = None, max_attempts: int = 3) -> Tuple[int, bool]:
+        _, now_ts = utc_now()
+        async with self._acquire() as conn:
+            job_id = await conn.fetchval("""
+                INSERT INTO llm_jobs (kind, guild_id, idempotency_key, payload, max_attempts, run_after,
+                                      created_ts, updated_ts)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $7)
+                ON CONFLICT (idempotency_key) DO NOTHING
+                RETURNING id
+            """, kind, guild_id, idempotency_key, json.dumps(payload), max_attempts, time.time(), now_ts)
+            if job_id is not None:
+                return job_id, True
+            return await conn.fetchval("SELECT id FROM llm_jobs WHERE idempotency_key = $1", idempotency_key), False
+
+    async def claim_jobs(self, owner: str, kinds: List[str], limit: int = 1, lease_seconds: float = 120,
+                         shards: Optional[Tuple[int, List[int]]] = None) -> List[Dict[str, Any]]:
+        if not kinds:
+            return []
+        now = time.time()
+        _, now_ts = utc_now()
+        # A NULL shard count matches every guild; a guild's shard is (guild_id >> 22) % shard_count
+        shard_count, shard_ids = shards if shards is not None else (None, [])
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                # Abandoned by a dead worker with no attempts left
+                await conn.execute("""
+                    UPDATE llm_jobs SET status = 'failed', lease_owner = NULL,
+                        last_error = COALESCE(last_error, 'lease expired'), updated_ts = $1
+                    WHERE status = 'running' AND lease_until < $2 AND attempts >= max_attempts
+                      AND kind = ANY($3)
+                      AND ($4::int IS NULL OR guild_id IS NULL OR (guild_id >> 22) % $4 = ANY($5::int[]))
+                """, now_ts, now, kinds, shard_count, shard_ids)
+                # SKIP LOCKED lets concurrent workers claim different jobs without waiting
+                rows = await conn.fetch("""
+                    UPDATE llm_jobs SET status = 'running', lease_owner = $1, lease_until = $2,
+                        attempts = attempts + 1, updated_ts = $3
+                    WHERE id IN (
+                        SELECT id FROM llm_jobs
+                        WHERE kind = ANY($4)
+                          AND ($7::int IS NULL OR guild_id IS NULL OR (guild_id >> 22) % $7 = ANY($8::int[]))
+                          AND ((status = 'queued' AND run_after <= $5) OR (status = 'running' AND lease_until < $5))
+                        ORDER BY run_after LIMIT $6
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING *
+                """, owner, now + lease_seconds, now_ts, kinds, now, limit, shard_count, shard_ids)
+        return [{**dict(row), 'payload': json.loads(row['payload'])} for row in rows]
+
+    async def finish_job(self, job_id: int, owner: str, error: Optional[str] = None,
+                         retry_at: Optional[float] = None) -> bool:
+        _, now_ts = utc_now()
+        new_status = 'done' if error is None else 'queued' if retry_at is not None else 'failed'
+        status = await self._executor().execute("""
+            UPDATE llm_jobs SET status = $1, last_error = $2, run_after = COALESCE($3, run_after),
+                lease_owner = NULL, lease_until = NULL, updated_ts = $4
+            WHERE id = $5 AND lease_owner = $6 AND status = 'running'
+        """, new_status, error, retry_at, now_ts, job_id, owner)
+        # Status is e.g. "UPDATE 1"
+        return int(status.split()[-1]) > 0
+
+    async def get_job_counts(self) -> Dict[str, int]:
+        rows = await self._executor().fetch("SELECT status, COUNT(*)::int FROM llm_jobs GROUP BY status")
+        return {row[0]: row[1] for row in rows}
+
+    # ============ WEEKLY SNAPSHOT METHODS ============
+
+    async def snapshot_week(self, guild_id: int, when: datetime = None) -> Dict[str, Any]:
+        week, start, end = iso_week(when)
+        now = datetime.utcnow().isoformat()
+
+        async with self._acquire() as conn:
+            # Active projects, plus anything archived during the week
+            projects = await conn.fetch("""
+                SELECT p.id, p.status, COALESCE(SUM(t.is_done), 0)::int, COUNT(t.id)::int,
+                       (p.created_ts >= $2 AND p.created_ts < $3)::int,
+                       COALESCE((p.archived_ts >= $2 AND p.archived_ts < $3)::int, 0)
+                FROM projects p LEFT JOIN tasks t ON t.project_id = p.id
+                WHERE p.guild_id = $1 AND (p.status = 'active' OR (p.archived_ts >= $2 AND p.archived_ts < $3))
+                GROUP BY p.id
+            """, guild_id, start, end)
+            ideas_added = await conn.fetchval(
+                "SELECT COUNT(*)::int FROM ideas WHERE guild_id = $1 AND created_ts >= $2 AND created_ts < $3",
+                guild_id, start, end
+            )
+
+            active = [p for p in projects if p[1] == 'active']
+            guild_row = {
+                'guild_id': guild_id,
+                'week': week,
+                'project_id': 0,
+                'tasks_done': sum(p[2] for p in active),
+                'tasks_total': sum(p[3] for p in active),
+                'active_projects': len(active),
+                'projects_created': sum(p[4] for p in projects),
+                'projects_archived': sum(p[5] for p in projects),
+                'ideas_added': ideas_added,
+                'updated_at': now
+            }
+
+            rows = [tuple(guild_row.values())] + [
+                (guild_id, week, p[0], p[2], p[3], int(p[1] == 'active'), p[4], p[5], 0, now)
+                for p in projects
+            ]
+            await conn.executemany("""
+                INSERT INTO weekly_snapshots
+                    (guild_id, week, project_id, tasks_done, tasks_total, active_projects,
+                     projects_created, projects_archived, ideas_added, updated_at)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+                ON CONFLICT (guild_id, project_id, week) DO UPDATE SET
+                    tasks_done = excluded.tasks_done,
+                    tasks_total = excluded.tasks_total,
+                    active_projects = excluded.active_projects,
+                    projects_created = excluded.projects_created,
+                    projects_archived = excluded.projects_archived,
+                    ideas_added = excluded.ideas_added,
+                    updated_at = excluded.updated_at
+            """, rows)
+        return guild_row
+
+    async def get_weekly_snapshots(self, guild_id: int, weeks: int = DEFAULT_TREND_WEEKS,
+                                   project_id: int = 0) -> List[Dict[str, Any]]:
+        rows = await self._executor().fetch("""
+            SELECT * FROM weekly_snapshots
+            WHERE guild_id = $1 AND project_id = $2
+            ORDER BY week DESC LIMIT $3
+        """, guild_id, project_id, weeks)
+        return [dict(row) for row in rows]
+
+    # ============ BACKUP / EXPORT METHODS ============
+
+    async def backup(self, target_path: str, source_path: str = None, pages: int = 256,
+                     progress: Callable[[int, int, int], None] = None):
+        # data_files() is empty, so /admin backup never gets here
+        raise NotImplementedError("PostgreSQL data isn't kept in local files - back it up on the server with pg_dump")
+
+    async def iter_guild_export(self, guild_id: int, batch_size: int = 500) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        async with self._acquire() as conn:
+            for record_type, query in EXPORT_QUERIES:
+                last_id = 0
+                while True:
+                    rows = await conn.fetch(query, guild_id, last_id, batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield record_type, dict(row)
+                    last_id = rows[-1]['id']
+
+    async def import_guild_records(self, guild_id: int, records: AsyncIterable[Tuple[str, Dict[str, Any]]],
+                                   batch_size: int = 500) -> Dict[str, int]:
+        counts: Dict[str, int] = {record_type: 0 for record_type in IMPORT_TABLES}
+        counts['skipped'] = 0
+        # exported project id -> new project id
+        project_ids: Dict[int, int] = {}
+        columns: Dict[str, set] = {}
+        pending = 0
+
+        async with self._acquire() as conn:
+            for table in IMPORT_TABLES.values():
+                rows = await conn.fetch(
+                    "SELECT column_name FROM information_schema.columns WHERE table_name = $1", table
+                )
+                columns[table] = {row['column_name'] for row in rows} - {'id'}
+
+            transaction = conn.transaction()
+            await transaction.start()
+            try:
+                async for record_type, data in records:
+                    table = IMPORT_TABLES.get(record_type)
+                    if table is None or (record_type == 'task' and data.get('project_id') not in project_ids):
+                        counts['skipped'] += 1
+                        continue
+
+                    row = {k: v for k, v in data.items() if k in columns[table]}
+                    if 'guild_id' in columns[table]:
+                        row['guild_id'] = guild_id
+                    if record_type == 'task':
+                        row['project_id'] = project_ids[data['project_id']]
+                    if record_type == 'idea' and row.get('used_project_id') is not None:
+                        row['used_project_id'] = project_ids.get(row['used_project_id'])
+
+                    placeholders = ', '.join(f"${i}" for i in range(1, len(row) + 1))
+                    query = f"INSERT INTO {table} ({', '.join(row)}) VALUES ({placeholders})"
+                    if record_type == 'memory':
+                        updates = ', '.join(f"{k} = excluded.{k}" for k in row)
+                        query += f" ON CONFLICT (user_id, guild_id, memory_key) DO UPDATE SET {updates}"
+                    new_id = await conn.fetchval(query + " RETURNING id", *row.values())
+                    if record_type == 'project':
+                        project_ids[data['id']] = new_id
+                    counts[record_type] += 1
+
+                    pending += 1
+                    if pending >= batch_size:
+                        await transaction.commit()
+                        transaction = conn.transaction()
+                        await transaction.start()
+                        pending = 0
+
+                await self._bump_version(conn, guild_id)
+            except BaseException:
+                await transaction.rollback()
+                raise
+            await transaction.commit()
+        return counts
+
+    # ============ CONVERSATION HISTORY METHODS ============
+
+    async def add_message(self, user_id: int, guild_id: int, channel_id: int,
+                          role: str, content: str) -> int:
+        now, now_ts = utc_now()
+        return await self._executor().fetchval("""
+            INSERT INTO conversation_history (user_id, guild_id, channel_id, role, content, created_at, created_ts)
+            VALUES ($1, $2, $3, $4, $5, $6, $7)
+            RETURNING id
+        """, user_id, guild_id, channel_id, role, content, now, now_ts)
+
+    async def get_recent_messages(self, user_id: int, guild_id: int, channel_id: int,
+                                  limit: int = 20) -> List[Dict[str, str]]:
+        rows = await self._executor().fetch("""
+            SELECT role, content FROM conversation_history
+            WHERE user_id = $1 AND guild_id = $2 AND channel_id = $3
+            ORDER BY created_ts DESC, id DESC LIMIT $4
+        """, user_id, guild_id, channel_id, limit)
+        return [{'role': row['role'], 'content': row['content']} for row in reversed(rows)]
+
+    async def get_messages_older_than(self, cutoff: datetime, limit: int = 1000) -> List[Dict[str, Any]]:
+        rows = await self._executor().fetch("""
+            SELECT * FROM conversation_history
+            WHERE created_ts < $1
+            ORDER BY created_ts LIMIT $2
+        """, to_epoch(cutoff), limit)
+        return [dict(row) for row in rows]
+
+    async def prune_old_messages(self, days: int = 7) -> int:
+        cutoff = to_epoch(datetime.utcnow() - timedelta(days=days))
+        status = await self._executor().execute("DELETE FROM conversation_history WHERE created_ts < $1", cutoff)
+        # Status is e.g. "DELETE 42"
+        return int(status.split()[-1])
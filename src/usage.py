@@ -0,0 +1,151 @@
+"""
+BRRR Bot - LLM Usage Ledger
+Token and latency totals per guild, user and call type, rolled up in memory and
+flushed to storage periodically, and the daily token budget guilds are held to
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.metrics import metrics
+from src.storage import Storage
+
+logger = logging.getLogger('brrr.usage')
+
+# How far a guild has been degraded by its daily token budget
+BUDGET_NORMAL = 0
+BUDGET_SHORT_CONTEXT = 1
+BUDGET_CHEAP_MODEL = 2
+BUDGET_EXHAUSTED = 3
+
+
+def usage_day(when: Optional[datetime] = None) -> str:
+    """The ledger's day bucket (UTC) for a moment"""
+    return (when or datetime.utcnow()).strftime('%Y-%m-%d')
+
+
+class UsageLedger:
+    """
+    Totals every LLM call into (day, guild, user, call type) rows in memory and writes
+    them with one upsert per guild every flush_interval seconds.
+
+    With a daily_budget (prompt + completion tokens per guild per UTC day), guilds past
+    short_context_at of it get less chat history, past cheap_model_at get cheap_model,
+    and at the budget itself get no LLM calls until the next day.
+    """
+
+    def __init__(self, db: Storage, daily_budget: int = 0, cheap_model: Optional[str] = None,
+                 short_context_at: float = 0.5, cheap_model_at: float = 0.8, flush_interval: float = 60.0):
+        self.db = db
+        self.daily_budget = daily_budget
+        self.cheap_model = cheap_model
+        self.short_context_at = short_context_at
+        self.cheap_model_at = cheap_model_at
+        self.flush_interval = flush_interval
+        # (day, guild_id, user_id, call_type) -> [calls, prompt, completion, cached, latency_ms]
+        self._pending: Dict[Tuple[str, int, int, str], List[float]] = {}
+        # (day, guild_id) -> tokens used that day, loaded from storage on first use
+        self._used: Dict[Tuple[str, int], int] = {}
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._worker = asyncio.create_task(self._run(), name="usage-ledger")
+
+    async def stop(self):
+        """Cancel the flusher and write out whatever is still pending"""
+        if self._worker:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        await self.flush()
+
+    def record(self, call_type: str, owners: Sequence[Tuple[int, int]], prompt_tokens: int,
+               completion_tokens: int, cached_tokens: int, latency_ms: float):
+        """
+        Add one call to the ledger. A call made for several (guild_id, user_id) owners -
+        a batched memory extraction - splits its tokens between them and counts once for each.
+        """
+        day = usage_day()
+        share = len(owners)
+        for i, (guild_id, user_id) in enumerate(owners):
+            # The first owner also takes the remainders, so the shares add up to the call
+            prompt, completion, cached = (
+                tokens // share + (tokens % share if i == 0 else 0)
+                for tokens in (prompt_tokens, completion_tokens, cached_tokens)
+            )
+            row = self._pending.setdefault((day, guild_id, user_id, call_type), [0, 0, 0, 0, 0.0])
+            row[0] += 1
+            row[1] += prompt
+            row[2] += completion
+            row[3] += cached
+            row[4] += latency_ms
+            if (day, guild_id) in self._used:
+                self._used[(day, guild_id)] += prompt + completion
+        metrics.set_gauge('usage.pending_rows', len(self._pending))
+
+    async def tokens_today(self, guild_id: int) -> int:
+        """Prompt + completion tokens a guild has used today, flushed or not"""
+        day = usage_day()
+        key = (day, guild_id)
+        if key not in self._used:
+            rows = await self.db.get_usage(guild_id, day)
+            stored = sum(row['prompt_tokens'] + row['completion_tokens'] for row in rows)
+            pending = sum(
+                values[1] + values[2] for (d, g, _, _), values in self._pending.items()
+                if d == day and g == guild_id
+            )
+            # Yesterday's counters are never consulted again
+            self._used = {k: v for k, v in self._used.items() if k[0] == day}
+            self._used[key] = int(stored + pending)
+        return self._used[key]
+
+    async def budget_level(self, guild_id: int) -> int:
+        """How far the guild's LLM calls should be degraded right now"""
+        if not self.daily_budget:
+            return BUDGET_NORMAL
+        used = await self.tokens_today(guild_id) / self.daily_budget
+        if used >= 1:
+            level = BUDGET_EXHAUSTED
+        elif used >= self.cheap_model_at and self.cheap_model:
+            level = BUDGET_CHEAP_MODEL
+        elif used >= self.short_context_at:
+            level = BUDGET_SHORT_CONTEXT
+        else:
+            level = BUDGET_NORMAL
+        if level:
+            metrics.incr(f'usage.degraded.{level}')
+        return level
+
+    def model_for(self, level: int) -> Optional[str]:
+        """Model override for a budget level - None keeps the call type's route"""
+        return self.cheap_model if level >= BUDGET_CHEAP_MODEL else None
+
+    async def flush(self) -> int:
+        """Write pending totals to storage, one upsert per guild. Returns rows written."""
+        pending, self._pending = self._pending, {}
+        by_guild: Dict[int, List[Tuple[str, int, str, int, int, int, int, float]]] = {}
+        for (day, guild_id, user_id, call_type), (calls, prompt, completion, cached, latency) in pending.items():
+            by_guild.setdefault(guild_id, []).append(
+                (day, user_id, call_type, calls, prompt, completion, cached, latency)
+            )
+
+        written = 0
+        for guild_id, rows in by_guild.items():
+            try:
+                written += await self.db.add_usage(guild_id, rows)
+            except Exception as e:
+                # Keep the totals for the next flush rather than losing them
+                logger.error(f"Failed to flush {len(rows)} usage row(s) for guild {guild_id}: {e}")
+                for day, user_id, call_type, *values in rows:
+                    row = self._pending.setdefault((day, guild_id, user_id, call_type), [0, 0, 0, 0, 0.0])
+                    for i, value in enumerate(values):
+                        row[i] += value
+        metrics.set_gauge('usage.pending_rows', len(self._pending))
+        return written
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
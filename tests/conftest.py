@@ -0,0 +1,27 @@
+"""
+Shared fixtures. pytest-asyncio isn't a dependency, so each test builds an async
+scenario and drives it to completion with `run` in a fresh event loop.
+"""
+
+import asyncio
+
+import pytest
+
+from src.database import Database
+
+
+@pytest.fixture
+def run():
+    """Runs a coroutine to completion in a new event loop"""
+    return asyncio.run
+
+
+@pytest.fixture
+def make_db(tmp_path):
+    """Opens an initialised SQLite Database in tmp_path - await it inside the test's event loop"""
+    async def make(**kwargs) -> Database:
+        kwargs.setdefault('cold_path', None)
+        db = Database(str(tmp_path / 'brrr.db'), **kwargs)
+        await db.init()
+        return db
+    return make
@@ -0,0 +1,27 @@
+"""A connection that dies part-way through a batched migration, for testing resumption"""
+
+import aiosqlite
+
+
+class CrashingConnection:
+    """Passes calls through to a connection, but fails the commit after `commits` of them"""
+
+    def __init__(self, db: aiosqlite.Connection, commits: int):
+        self.db = db
+        self.commits = commits
+        # Parameter lists of every executemany() - what each batch wrote
+        self.batches = []
+
+    async def execute(self, *args):
+        return await self.db.execute(*args)
+
+    async def executemany(self, sql, rows):
+        rows = list(rows)
+        self.batches.append(rows)
+        return await self.db.executemany(sql, rows)
+
+    async def commit(self):
+        if self.commits == 0:
+            raise RuntimeError("process killed")
+        self.commits -= 1
+        await self.db.commit()
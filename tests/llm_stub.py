@@ -0,0 +1,50 @@
+"""A stub OpenAI-compatible chat completions server for LLM client tests"""
+
+import asyncio
+import json
+
+from aiohttp import web
+
+
+class StubServer:
+    """
+    Answers every completion after a per-model delay (seconds, or a callable returning them),
+    reporting per-model token usage, and keeps the raw request bodies it was sent. Models
+    without an entry take 10ms and report 10/5 tokens. The reply is the model's name
+    unless replies has content for it.
+    """
+
+    def __init__(self):
+        self.delays = {'a': 0.01, 'b': 0.01}
+        self.usage = {'a': (11, 5), 'b': (7, 3)}
+        self.replies = {}
+        self.bodies = []
+        self.url = None
+        self._runner = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        self.bodies.append(body)
+        model = json.loads(body)['model']
+        delay = self.delays.get(model, 0.01)
+        await asyncio.sleep(delay() if callable(delay) else delay)
+        prompt, completion = self.usage.get(model, (10, 5))
+        return web.json_response({
+            "choices": [{"message": {"content": self.replies.get(model, model)}}],
+            "usage": {"prompt_tokens": prompt, "completion_tokens": completion}
+        })
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post('/v1/chat/completions', self.handle)
+        # Don't wait for the stalled handlers of cancelled requests on the way out
+        self._runner = web.AppRunner(app, shutdown_timeout=0.1)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}/v1"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
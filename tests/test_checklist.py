@@ -0,0 +1,48 @@
+"""Checklist import: parsing pasted or uploaded lines, and which attachments are accepted"""
+
+from types import SimpleNamespace
+
+from src.cogs.projects import MAX_IMPORT_BYTES, checklist_file_problem, parse_checklist
+
+
+def _file(filename: str, content_type: str = None, size: int = 100):
+    return SimpleNamespace(filename=filename, content_type=content_type, size=size)
+
+
+def test_markdown_checkboxes():
+    assert list(parse_checklist(["- [x] done", "* [ ] todo", "+ [X] also done", "- plain bullet"])) == [
+        ('done', True), ('todo', False), ('also done', True), ('plain bullet', False)
+    ]
+
+
+def test_numbered_lines():
+    assert list(parse_checklist(["1. first", "2) second", "10. [x] tenth"])) == [
+        ('first', False), ('second', False), ('tenth', True)
+    ]
+
+
+def test_blank_and_heading_lines_are_skipped():
+    lines = ["# Sprint 1", "", "   ", "## Backend", "write the API", "- [ ]   ", "  * [x] indented  "]
+    assert list(parse_checklist(lines)) == [('write the API', False), ('indented', True)]
+
+
+def test_long_labels_are_cut():
+    ((label, _),) = parse_checklist(["x" * 500])
+    assert len(label) == 200
+
+
+def test_text_attachments_are_accepted():
+    assert checklist_file_problem(_file("tasks.txt")) is None
+    assert checklist_file_problem(_file("TASKS.MD")) is None
+    assert checklist_file_problem(_file("tasks", "text/plain; charset=utf-8")) is None
+
+
+def test_other_attachments_are_rejected():
+    assert checklist_file_problem(_file("photo.png", "image/png"))
+    assert checklist_file_problem(_file("tasks.pdf", "application/pdf"))
+    assert checklist_file_problem(_file("tasks"))
+
+
+def test_oversized_attachments_are_rejected():
+    assert checklist_file_problem(_file("tasks.md", "text/markdown", MAX_IMPORT_BYTES + 1))
+    assert checklist_file_problem(_file("tasks.md", "text/markdown", MAX_IMPORT_BYTES)) is None
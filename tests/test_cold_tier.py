@@ -0,0 +1,153 @@
+"""Cold-tier moves across the main file and per-guild files"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def make_tiered_db(make_db, tmp_path):
+    """A database with a cold file and one file per guild"""
+    return lambda: make_db(cold_path=str(tmp_path / 'brrr_cold.db'), guild_db_dir=str(tmp_path / 'guilds'))
+
+
+def _cold_rows(tmp_path, sql):
+    with sqlite3.connect(tmp_path / 'brrr_cold.db') as conn:
+        return conn.execute(sql).fetchall()
+
+
+def test_history_from_two_guild_files_is_kept(run, make_tiered_db, tmp_path):
+    async def scenario():
+        db = await make_tiered_db()
+        # Each guild file numbers its own history, so both rows get id 1
+        await db.add_message(1, 111, 10, 'user', 'hello from guild 111')
+        await db.add_message(2, 222, 20, 'user', 'hello from guild 222')
+        soon = datetime.utcnow() + timedelta(minutes=1)
+        moved = await db.move_to_cold(archived_before=soon, history_before=soon)
+        await db.close()
+        return moved
+
+    assert run(scenario()) == (0, 2)
+    rows = _cold_rows(tmp_path, "SELECT guild_id, content FROM conversation_history ORDER BY guild_id")
+    assert rows == [(111, 'hello from guild 111'), (222, 'hello from guild 222')]
+
+
+def test_interrupted_move_is_not_copied_twice(run, make_tiered_db, tmp_path):
+    async def scenario():
+        db = await make_tiered_db()
+        project_id = await db.create_project(111, 'Old project')
+        await db.create_tasks(project_id, ['one', 'two'])
+        await db.archive_project(project_id)
+        await db.add_message(1, 111, 10, 'user', 'old message')
+        soon = datetime.utcnow() + timedelta(minutes=1)
+        await db.move_to_cold(archived_before=soon, history_before=soon)
+
+        # Put the hot rows back as if the cold copy had committed but the hot delete hadn't
+        with sqlite3.connect(tmp_path / 'brrr_cold.db') as cold:
+            project = cold.execute("SELECT * FROM projects").fetchall()
+            tasks = cold.execute("SELECT * FROM tasks").fetchall()
+            history = cold.execute("SELECT * FROM conversation_history").fetchall()
+        with sqlite3.connect(db.guild_pool.path(111)) as hot:
+            hot.executemany(f"INSERT INTO projects VALUES ({', '.join('?' * len(project[0]))})", project)
+            hot.executemany(f"INSERT INTO tasks VALUES ({', '.join('?' * len(tasks[0]))})", tasks)
+            hot.executemany(
+                f"INSERT INTO conversation_history VALUES ({', '.join('?' * len(history[0]))})", history
+            )
+
+        moved = await db.move_to_cold(archived_before=soon, history_before=soon)
+        await db.close()
+        return moved
+
+    assert run(scenario()) == (1, 1)
+    assert _cold_rows(tmp_path, "SELECT COUNT(*) FROM projects") == [(1,)]
+    assert _cold_rows(tmp_path, "SELECT COUNT(*) FROM tasks") == [(2,)]
+    assert _cold_rows(tmp_path, "SELECT COUNT(*) FROM conversation_history") == [(1,)]
+
+
+def test_identical_history_rows_are_both_moved(run, make_tiered_db, tmp_path):
+    async def scenario():
+        db = await make_tiered_db()
+        await db.add_message(1, 111, 10, 'user', 'ok')
+        # The same message sent twice within one timestamp tick
+        with sqlite3.connect(db.guild_pool.path(111)) as hot:
+            columns = ', '.join(row[1] for row in hot.execute("PRAGMA table_info(conversation_history)")
+                                if row[1] != 'id')
+            hot.execute(f"INSERT INTO conversation_history ({columns}) SELECT {columns} FROM conversation_history")
+        soon = datetime.utcnow() + timedelta(minutes=1)
+        moved = await db.move_to_cold(archived_before=soon, history_before=soon)
+        await db.close()
+        return moved
+
+    assert run(scenario()) == (0, 2)
+    assert _cold_rows(tmp_path, "SELECT content FROM conversation_history") == [('ok',), ('ok',)]
+
+
+def test_row_changed_after_an_interrupted_copy_still_moves(run, make_tiered_db, tmp_path):
+    async def scenario():
+        db = await make_tiered_db()
+        project_id = await db.create_project(111, 'Old project')
+        await db.create_tasks(project_id, ['one'])
+        await db.archive_project(project_id)
+        soon = datetime.utcnow() + timedelta(minutes=1)
+        await db.move_to_cold(archived_before=soon, history_before=soon)
+
+        # Restore the hot rows as if the delete hadn't committed, then tick the task off
+        with sqlite3.connect(tmp_path / 'brrr_cold.db') as cold:
+            project = cold.execute("SELECT * FROM projects").fetchall()
+            tasks = cold.execute("SELECT * FROM tasks").fetchall()
+        with sqlite3.connect(db.guild_pool.path(111)) as hot:
+            hot.executemany(f"INSERT INTO projects VALUES ({', '.join('?' * len(project[0]))})", project)
+            hot.executemany(f"INSERT INTO tasks VALUES ({', '.join('?' * len(tasks[0]))})", tasks)
+            hot.execute("UPDATE tasks SET is_done = 1")
+
+        moved = await db.move_to_cold(archived_before=soon, history_before=soon)
+        again = await db.move_to_cold(archived_before=soon, history_before=soon)
+        await db.close()
+        return moved, again
+
+    assert run(scenario()) == ((1, 0), (0, 0))
+    assert _cold_rows(tmp_path, "SELECT COUNT(*) FROM projects") == [(1,)]
+    assert _cold_rows(tmp_path, "SELECT label, is_done FROM tasks") == [('one', 1)]
+
+
+def test_moving_projects_bumps_guild_versions(run, make_tiered_db):
+    async def scenario():
+        db = await make_tiered_db()
+        project_id = await db.create_project(111, 'Old project')
+        await db.archive_project(project_id)
+        before = await db.get_guild_version(111)
+        notified = []
+        db.add_write_listener(notified.append)
+        soon = datetime.utcnow() + timedelta(minutes=1)
+        await db.move_to_cold(archived_before=soon, history_before=soon)
+        # Read back from disk, not from this process's cache
+        with sqlite3.connect(db.guild_pool.path(111)) as conn:
+            (stored,) = conn.execute("SELECT version FROM guild_versions WHERE guild_id = 111").fetchone()
+        after = await db.get_guild_version(111)
+        await db.close()
+        return before, after, stored, notified
+
+    before, after, stored, notified = run(scenario())
+    assert after == stored == before + 1
+    assert notified == [111]
+
+
+def test_move_is_limited_to_owned_shards(run, make_db, tmp_path):
+    # (guild_id >> 22) % shard_count picks the shard
+    ours, theirs = 4 << 22, 5 << 22
+
+    async def scenario():
+        db = await make_db(cold_path=str(tmp_path / 'brrr_cold.db'))
+        for guild_id in (ours, theirs):
+            await db.archive_project(await db.create_project(guild_id, 'Old project'))
+            await db.add_message(1, guild_id, 10, 'user', 'old message')
+        soon = datetime.utcnow() + timedelta(minutes=1)
+        moved = await db.move_to_cold(archived_before=soon, history_before=soon, shards=(2, [0]))
+        left = await db.get_guild_projects(theirs), await db.get_guild_projects(ours)
+        return moved, left
+
+    moved, (theirs_left, ours_left) = run(scenario())
+    assert moved == (1, 1)
+    assert len(theirs_left) == 1 and ours_left == []
+    assert _cold_rows(tmp_path, "SELECT guild_id FROM conversation_history") == [(ours,)]
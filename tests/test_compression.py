@@ -0,0 +1,88 @@
+"""Compressed history and descriptions: pack/unpack round trips and the resumable backfill"""
+
+import sqlite3
+
+import aiosqlite
+
+from src.database import pack_text, unpack_text
+
+from db_faults import CrashingConnection
+
+CHATTY = "Let's plan the week: finish the parser, write the docs and ship the release. " * 20
+
+
+def test_short_text_is_stored_as_is():
+    assert pack_text("hello", 512) == "hello"
+    assert pack_text(CHATTY[:511], 512) == CHATTY[:511]
+
+
+def test_long_text_round_trips_through_a_blob():
+    packed = pack_text(CHATTY, 512)
+    assert isinstance(packed, bytes) and len(packed) < len(CHATTY)
+    assert unpack_text(packed) == CHATTY
+
+
+def test_non_ascii_threshold_counts_bytes():
+    text = "ü" * 300  # 600 UTF-8 bytes
+    assert isinstance(pack_text(text, 512), bytes)
+    assert unpack_text(pack_text(text, 512)) == text
+
+
+def test_none_and_disabled_compression():
+    assert pack_text(None, 512) is None
+    assert unpack_text(None) is None
+    assert pack_text(CHATTY, None) == CHATTY
+    assert pack_text(CHATTY, 0) == CHATTY
+    assert unpack_text("plain") == "plain"
+
+
+def test_blob_in_text_column_reads_back(run, make_db, tmp_path):
+    async def scenario():
+        db = await make_db()
+        project_id = await db.create_project(1, "Big", CHATTY)
+        await db.add_message(1, 1, 1, 'user', CHATTY)
+        await db.add_message(1, 1, 1, 'assistant', "short")
+        return (await db.get_project(project_id))['description'], await db.get_recent_messages(1, 1, 1)
+
+    description, messages = run(scenario())
+    assert description == CHATTY
+    assert [m['content'] for m in messages] == [CHATTY, "short"]
+    with sqlite3.connect(tmp_path / 'brrr.db') as conn:
+        assert conn.execute("SELECT typeof(content) FROM conversation_history ORDER BY id").fetchall() == [
+            ('blob',), ('text',)
+        ]
+        assert conn.execute("SELECT typeof(description) FROM projects").fetchall() == [('blob',)]
+
+
+def test_interrupted_compression_resumes_without_compressing_twice(run, make_db, tmp_path):
+    path = tmp_path / 'brrr.db'
+    contents = [f"{n}: {CHATTY}" if n % 3 else f"short {n}" for n in range(30)]
+
+    async def scenario():
+        # Written before compression was turned on
+        db = await make_db(compress_threshold=None)
+        for content in contents:
+            await db.add_message(1, 1, 1, 'user', content)
+        db.compress_threshold = 512
+
+        async with aiosqlite.connect(path) as conn:
+            first = CrashingConnection(conn, commits=2)
+            try:
+                await db._compress_existing(first, batch_size=4)
+            except RuntimeError:
+                pass
+        async with aiosqlite.connect(path) as conn:
+            second = CrashingConnection(conn, commits=-1)
+            await db._compress_existing(second, batch_size=4)
+        return first.batches, second.batches, await db.get_recent_messages(1, 1, 1, limit=100)
+
+    first, second, messages = run(scenario())
+    # Row ids each run wrote: the rerun starts after the last committed batch
+    first_ids = [row_id for batch in first[:2] for _, row_id in batch]
+    second_ids = [row_id for batch in second for _, row_id in batch]
+    assert first_ids and second_ids
+    assert not set(first_ids) & set(second_ids)
+    assert [m['content'] for m in messages] == contents
+    with sqlite3.connect(path) as conn:
+        types = [t for (t,) in conn.execute("SELECT typeof(content) FROM conversation_history ORDER BY id")]
+    assert types == ['blob' if n % 3 else 'text' for n in range(30)]
@@ -0,0 +1,81 @@
+"""Live dashboard: bursts of writes are folded into one message edit"""
+
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from src.dashboard import DashboardManager
+from src.render_cache import RenderCache
+from src.storage import iso_week
+
+
+class FakeWeekly:
+    """Renders the overview from live data so a stale edit would show"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def build_week_embed(self, guild_id, week_num):
+        projects = await self.db.get_guild_projects(guild_id)
+        return discord.Embed(title=f"Week {week_num}", description=f"{len(projects)} project(s)")
+
+    async def build_summary_embed(self, guild_id, weeks):
+        return discord.Embed(title="Summary")
+
+
+class FakeOutbound:
+    def __init__(self):
+        self.edits = []
+
+    async def edit(self, message, **kwargs):
+        self.edits.append((message.id, kwargs['embeds']))
+
+
+def _bot(db):
+    channel = SimpleNamespace(id=10, get_partial_message=lambda message_id: SimpleNamespace(id=message_id))
+    weekly = FakeWeekly(db)
+    return SimpleNamespace(
+        db=db, render_cache=RenderCache(), outbound=FakeOutbound(),
+        get_cog=lambda name: weekly, get_channel=lambda channel_id: channel
+    )
+
+
+def test_writes_inside_the_debounce_window_make_one_edit(run, make_db):
+    async def scenario():
+        db = await make_db()
+        bot = _bot(db)
+        dashboards = DashboardManager(bot, min_interval=0.2)
+        dashboards._dashboards[1] = (10, 20)
+        db.add_write_listener(dashboards.notify)
+
+        for n in range(3):
+            project_id = await db.create_project(1, f"Project {n}")
+            await db.create_tasks(project_id, ['a', 'b'])
+        # Another guild's writes don't touch this dashboard
+        await db.create_project(2, "Elsewhere")
+        assert len(dashboards._pending) == 1
+
+        await asyncio.sleep(1.3)
+        return bot.outbound.edits, dashboards._rendered[1], await db.get_guild_version(1)
+
+    edits, rendered, version = run(scenario())
+    ((message_id, (overview, _)),) = edits
+    assert message_id == 20
+    # The one edit shows every write in the burst
+    assert overview.description == "3 project(s)"
+    assert rendered == (version, iso_week()[0])
+
+
+def test_unchanged_data_is_not_re_edited(run, make_db):
+    async def scenario():
+        db = await make_db()
+        bot = _bot(db)
+        dashboards = DashboardManager(bot)
+        dashboards._dashboards[1] = (10, 20)
+        await db.create_project(1, "Project")
+        await dashboards.refresh(1)
+        await dashboards.refresh(1)
+        return bot.outbound.edits
+
+    assert len(run(scenario())) == 1
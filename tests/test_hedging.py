@@ -0,0 +1,116 @@
+"""Hedged chat requests against a stub OpenAI-compatible server"""
+
+import asyncio
+import itertools
+import time
+
+from src.llm import LLMClient
+from src.metrics import metrics
+from src.model_router import HedgePolicy, ModelRouter, parse_routes
+from src.providers import Provider, Providers
+from src.usage import UsageLedger
+
+from llm_stub import StubServer
+
+
+def _request_tasks():
+    return [task for task in asyncio.all_tasks() if task.get_coro().__qualname__ == 'LLMClient._request']
+
+
+async def _client(server: StubServer, ledger: UsageLedger = None, **hedge) -> LLMClient:
+    providers = Providers([Provider('requesty', server.url, 'key')], 'requesty')
+    router = ModelRouter(parse_routes('chat=a|b', 'a'), min_calls=5)
+    policy = HedgePolicy(**{'percentile': 95, 'budget': 0.5, **hedge})
+    return LLMClient(providers, 'a', router=router, hedge=policy, ledger=ledger)
+
+
+def test_budget_is_a_share_of_calls_seen():
+    policy = HedgePolicy(budget=0.1, window=200)
+    taken = [policy.take() for _ in range(50)]
+    # The first call can't hedge, and the share never passes the budget on the way up
+    assert taken[0] is False
+    for seen in range(1, len(taken) + 1):
+        assert sum(taken[:seen]) <= 0.1 * seen
+    assert sum(taken) == 5
+
+
+def test_slow_primary_is_hedged_and_cancelled(run, make_db):
+    async def scenario():
+        ledger = UsageLedger(await make_db())
+        async with StubServer() as server:
+            llm = await _client(server, ledger)
+            # Build up latency history on the primary - nothing hedges without it
+            for _ in range(5):
+                assert (await llm.chat([{"role": "user", "content": "hi"}])).content == 'a'
+            ledger._pending.clear()
+            won_before = metrics.counters.get('llm.hedge.won', 0)
+
+            server.delays['a'] = 5.0
+            started = time.monotonic()
+            reply = await llm.chat([{"role": "user", "content": "hi"}], guild_id=1, user_id=2)
+            elapsed = time.monotonic() - started
+            await asyncio.sleep(0.05)
+            leftover = _request_tasks()
+            await llm.close()
+        return reply, elapsed, leftover, metrics.counters['llm.hedge.won'] - won_before, ledger._pending
+
+    reply, elapsed, leftover, won, pending = run(scenario())
+    assert reply.content == 'b'
+    assert elapsed < 1.0
+    # The slow primary was cancelled rather than left running (and paid for) in the background
+    assert leftover == []
+    assert won == 1
+    ((_, guild_id, user_id, call_type), (calls, prompt, completion, _, _)), = pending.items()
+    assert (guild_id, user_id, call_type) == (1, 2, 'chat')
+    assert (calls, prompt, completion) == (1, 7, 3)
+
+
+def test_losing_hedge_is_cancelled(run):
+    async def scenario():
+        async with StubServer() as server:
+            llm = await _client(server)
+            for _ in range(5):
+                await llm.chat([{"role": "user", "content": "hi"}])
+            fired_before = metrics.counters.get('llm.hedge.fired', 0)
+
+            # Slow enough to hedge, but the hedge is slower still
+            server.delays.update({'a': 0.3, 'b': 5.0})
+            reply = await llm.chat([{"role": "user", "content": "hi"}])
+            await asyncio.sleep(0.05)
+            leftover = _request_tasks()
+            await llm.close()
+        return reply, metrics.counters.get('llm.hedge.fired', 0) - fired_before, leftover
+
+    reply, fired, leftover = run(scenario())
+    assert reply.content == 'a'
+    assert fired == 1
+    assert leftover == []
+
+
+def test_hedging_cuts_tail_latency(run):
+    async def scenario():
+        async with StubServer() as server:
+            # Every fifth call on the primary stalls - a long tail on a fast median
+            slow_every_fifth = itertools.cycle([0.02, 0.02, 0.02, 0.02, 0.3])
+            server.delays['a'] = lambda: next(slow_every_fifth)
+            # Every other call is held out unhedged, so both sides see the same stalls
+            llm = await _client(server, percentile=75, holdout=0.5)
+            for _ in range(10):
+                await llm.chat([{"role": "user", "content": "hi"}])
+            for name in ('llm.hedge.latency_ms', 'llm.hedge.unhedged_ms'):
+                metrics._samples.pop(name, None)
+
+            for _ in range(40):
+                await llm.chat([{"role": "user", "content": "hi"}])
+            await llm.close()
+        return {
+            name: (metrics.percentile(name, 50), metrics.percentile(name, 99))
+            for name in ('llm.hedge.latency_ms', 'llm.hedge.unhedged_ms')
+        }
+
+    latency = run(scenario())
+    (hedged_p50, hedged_p99), (unhedged_p50, unhedged_p99) = latency.values()
+    assert unhedged_p99 >= 300
+    assert hedged_p99 < 150
+    # The median isn't made worse to get there
+    assert hedged_p50 < 100 and unhedged_p50 < 100
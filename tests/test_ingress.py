@@ -0,0 +1,145 @@
+"""Coalescing of rapid-fire mentions in the message ingress"""
+
+import asyncio
+from types import SimpleNamespace
+
+from src.ingress import MessageIngress
+from src.metrics import metrics
+
+
+def _message(message_id: int, author_id: int = 1, channel_id: int = 10):
+    return SimpleNamespace(id=message_id, author=SimpleNamespace(id=author_id), channel=SimpleNamespace(id=channel_id))
+
+
+def _saved():
+    return metrics.counters.get('coalesce.calls_saved', 0)
+
+
+def test_messages_within_the_window_share_one_call(run):
+    async def scenario():
+        batches = []
+
+        async def handler(batch):
+            batches.append([m.id for m in batch.messages])
+
+        ingress = MessageIngress(handler, workers=2, coalesce_window=0.05)
+        ingress.start()
+        before = _saved()
+        for n in range(3):
+            ingress.submit(_message(n))
+        await asyncio.sleep(0.2)
+        await ingress.stop()
+        return batches, _saved() - before
+
+    batches, saved = run(scenario())
+    assert batches == [[0, 1, 2]]
+    assert saved == 2
+
+
+def test_superseded_call_is_not_counted_as_saved(run):
+    async def scenario():
+        batches = []
+        started = asyncio.Event()
+        calls = []
+
+        async def llm_call():
+            calls.append(1)
+            started.set()
+            # Only the first call stalls
+            await asyncio.sleep(5 if len(calls) == 1 else 0)
+            return 'reply'
+
+        async def handler(batch):
+            if await batch.run_supersedable(llm_call()) is not None:
+                batches.append([m.id for m in batch.messages])
+
+        ingress = MessageIngress(handler, workers=1, coalesce_window=0.01)
+        ingress.start()
+        before = _saved()
+        ingress.submit(_message(1))
+        await started.wait()
+        started.clear()
+        ingress.submit(_message(2))
+        await asyncio.sleep(0.1)
+        await ingress.stop()
+        return batches, len(calls), _saved() - before
+
+    batches, calls, saved = run(scenario())
+    # Both messages are answered together, but the first call was already running
+    # (and paid for) when it was cancelled
+    assert batches == [[1, 2]]
+    assert calls == 2
+    assert saved == 0
+
+
+def test_channel_is_handled_in_order_by_one_worker_at_a_time(run):
+    async def scenario():
+        handled = []
+        active = {}
+        overlaps = []
+
+        async def handler(batch):
+            channel_id = batch.last.channel.id
+            active[channel_id] = active.get(channel_id, 0) + 1
+            overlaps.append(active[channel_id])
+            await asyncio.sleep(0.01)
+            handled.append((channel_id, batch.last.id))
+            active[channel_id] -= 1
+
+        ingress = MessageIngress(handler, workers=4)
+        ingress.start()
+        # Different authors, so nothing is coalesced
+        for n in range(5):
+            ingress.submit(_message(n, author_id=n, channel_id=10))
+            ingress.submit(_message(100 + n, author_id=n, channel_id=20))
+        await asyncio.sleep(0.3)
+        await ingress.stop()
+        return handled, overlaps
+
+    handled, overlaps = run(scenario())
+    assert [m for c, m in handled if c == 10] == [0, 1, 2, 3, 4]
+    assert [m for c, m in handled if c == 20] == [100, 101, 102, 103, 104]
+    assert max(overlaps) == 1
+
+
+def test_busy_channel_goes_to_the_back_of_the_line(run):
+    async def scenario():
+        handled = []
+
+        async def handler(batch):
+            handled.append(batch.last.id)
+
+        ingress = MessageIngress(handler, workers=1)
+        for n in range(3):
+            ingress.submit(_message(n, author_id=n, channel_id=10))
+        ingress.submit(_message(100, channel_id=20))
+        ingress.start()
+        await asyncio.sleep(0.1)
+        await ingress.stop()
+        return handled
+
+    assert run(scenario()) == [0, 100, 1, 2]
+
+
+def test_full_channel_queue_drops_and_failures_dont_stall_it(run):
+    async def scenario():
+        handled = []
+
+        async def handler(batch):
+            if batch.last.id == 0:
+                raise RuntimeError("boom")
+            handled.append(batch.last.id)
+
+        ingress = MessageIngress(handler, workers=1, max_queue_per_channel=2)
+        accepted = [ingress.submit(_message(n, author_id=n)) for n in range(3)]
+        ingress.start()
+        await asyncio.sleep(0.1)
+        ingress.submit(_message(3, author_id=3))
+        await asyncio.sleep(0.1)
+        await ingress.stop()
+        return accepted, handled, ingress._queues
+
+    accepted, handled, queues = run(scenario())
+    assert accepted == [True, True, False]
+    assert handled == [1, 3]
+    assert queues == {}
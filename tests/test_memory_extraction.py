@@ -0,0 +1,86 @@
+"""Structured memory extraction: schema validation and what happens when the model strays"""
+
+import json
+
+from src.llm import ChatTurn, LLMClient, Memory
+from src.metrics import metrics
+from src.providers import Provider, Providers
+
+from llm_stub import StubServer
+
+COUNTERS = ('llm.memory.batches', 'llm.memory.parsed', 'llm.memory.malformed',
+            'llm.memory.saved', 'llm.memory.rejected')
+
+
+def _counts():
+    return {name: metrics.counters[name] for name in COUNTERS}
+
+
+def _parse(content, turn_count=2):
+    before = _counts()
+    results = LLMClient._parse_extraction(content, turn_count)
+    return results, {name: count - before[name] for name, count in _counts().items()}
+
+
+def _turns(*memories):
+    return json.dumps({"turns": [{"turn": turn, "memories": items} for turn, items in memories]})
+
+
+def test_valid_response_is_split_per_turn():
+    results, counts = _parse(_turns(
+        (2, [{"key": "Timezone", "value": " UTC+2 ", "context": None}]),
+        (1, [{"key": "skill_python", "value": "advanced", "context": "wrote a compiler"}]),
+    ))
+    assert results == [[Memory('skill_python', 'advanced', 'wrote a compiler')], [Memory('timezone', 'UTC+2')]]
+    assert counts == {'llm.memory.batches': 1, 'llm.memory.parsed': 1, 'llm.memory.malformed': 0,
+                      'llm.memory.saved': 2, 'llm.memory.rejected': 0}
+
+
+def test_malformed_responses_yield_no_memories():
+    fenced = '```json\n{"turns": []}\n```'
+    for content in ('not json', '{"memories": []}', '{"turns": {"turn": 1}}', '[1, 2]', fenced):
+        results, counts = _parse(content)
+        assert results == [[], []]
+        assert (counts['llm.memory.malformed'], counts['llm.memory.parsed']) == (1, 0), content
+
+
+def test_invalid_turns_and_memories_are_rejected():
+    results, counts = _parse(_turns(
+        (0, [{"key": "a", "value": "b", "context": None}]),
+        (3, [{"key": "a", "value": "b", "context": None}]),
+        ("1", [{"key": "a", "value": "b", "context": None}]),
+        (1, [
+            {"key": "favourite-editor!", "value": "vim", "context": None},
+            {"key": "bio", "value": "x" * 501, "context": None},
+            {"key": "mood", "value": "   ", "context": None},
+            {"key": "editor", "value": "helix", "context": 7},
+            {"key": "editor", "value": "helix", "context": None},
+        ]),
+    ))
+    assert results == [[Memory('editor', 'helix')], []]
+    assert counts['llm.memory.saved'] == 1
+    # Three bad turn numbers, four bad memories
+    assert counts['llm.memory.rejected'] == 7
+
+
+def test_extraction_through_json_mode_fallback(run):
+    async def scenario():
+        async with StubServer() as local:
+            local.replies['qwen'] = _turns((1, [{"key": "editor", "value": "vim", "context": None}]))
+            local.replies['broken'] = "Sure! Here are the memories: editor=vim"
+            providers = Providers([Provider('local', local.url, json_schema=False)], 'local')
+            llm = LLMClient(providers, 'qwen')
+            turns = [ChatTurn(1, 1, "Alice", "I use vim", "nice", {}), ChatTurn(2, 1, "Bob", "hi", "hey", {})]
+            llm.router.routes['memory'].primary = 'qwen'
+            parsed = await llm.extract_memories(turns)
+            llm.router.routes['memory'].primary = 'broken'
+            before = metrics.counters['llm.memory.malformed']
+            malformed = await llm.extract_memories(turns)
+            await llm.close()
+        return parsed, malformed, metrics.counters['llm.memory.malformed'] - before, json.loads(local.bodies[0])
+
+    parsed, malformed, malformed_count, body = run(scenario())
+    assert body['response_format'] == {"type": "json_object"}
+    assert parsed == [[Memory('editor', 'vim')], []]
+    assert malformed == [[], []]
+    assert malformed_count == 1
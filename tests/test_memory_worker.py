@@ -0,0 +1,109 @@
+"""Background memory extraction: batching, bulk writes and the flush on shutdown"""
+
+import asyncio
+import time
+
+from src.llm import ChatTurn, Memory
+from src.memory_worker import MemoryExtractor
+from src.metrics import metrics
+
+
+class FakeLLM:
+    """Remembers each turn's message as its 'said' memory, after a delay"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batches = []
+
+    async def extract_memories(self, turns):
+        self.batches.append([turn.message for turn in turns])
+        await asyncio.sleep(self.delay)
+        return [[Memory('said', turn.message)] for turn in turns]
+
+
+def _turn(message, user_id=1, guild_id=1, known=None):
+    return ChatTurn(user_id, guild_id, f"user{user_id}", message, "ok", known or {})
+
+
+def test_turns_are_extracted_in_batches_and_written_in_bulk(run, make_db):
+    async def scenario():
+        db = await make_db()
+        writes = []
+        set_memories = db.set_memories
+
+        async def counting_set_memories(guild_id, rows):
+            writes.append((guild_id, len(rows)))
+            return await set_memories(guild_id, rows)
+        db.set_memories = counting_set_memories
+
+        llm = FakeLLM()
+        extractor = MemoryExtractor(llm, db, batch_size=3, max_delay=0.2)
+        extractor.start()
+        # Same user twice in the first batch, the later turn wins; turn 'd' is already known
+        for turn in (_turn('a'), _turn('b'), _turn('c', user_id=2, guild_id=2),
+                     _turn('d', known={'said': 'd'}), _turn('e', user_id=3), _turn('f', user_id=4)):
+            extractor.submit(turn)
+        extractor.submit(_turn('g', user_id=5))
+        await asyncio.sleep(0.1)
+        early = list(llm.batches)
+        await asyncio.sleep(0.3)
+        await extractor.stop()
+        said = {user_id: await db.get_memory(user_id, guild_id, 'said')
+                for user_id, guild_id in ((1, 1), (2, 2), (3, 1), (4, 1), (5, 1))}
+        return early, llm.batches, writes, said
+
+    early, batches, writes, said = run(scenario())
+    # Full batches go straight away, the remainder once max_delay has passed
+    assert early == [['a', 'b', 'c'], ['d', 'e', 'f']]
+    assert batches == [['a', 'b', 'c'], ['d', 'e', 'f'], ['g']]
+    assert writes == [(1, 1), (2, 1), (1, 2), (1, 1)]
+    assert said == {1: 'b', 2: 'c', 3: 'e', 4: 'f', 5: 'g'}
+
+
+def test_queued_turns_are_flushed_on_shutdown(run, make_db):
+    async def scenario():
+        db = await make_db()
+        llm = FakeLLM()
+        extractor = MemoryExtractor(llm, db, batch_size=8, max_delay=60)
+        extractor.start()
+        for n in range(3):
+            extractor.submit(_turn(f'm{n}', user_id=n))
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        await extractor.stop()
+        return time.monotonic() - started, llm.batches, await db.get_memory(2, 1, 'said')
+
+    elapsed, batches, memory = run(scenario())
+    # No waiting out the 60s batch window
+    assert elapsed < 1
+    assert batches == [['m0', 'm1', 'm2']]
+    assert memory == 'm2'
+
+
+def test_shutdown_gives_up_on_a_stuck_flush(run, make_db):
+    async def scenario():
+        db = await make_db()
+        llm = FakeLLM(delay=60)
+        extractor = MemoryExtractor(llm, db, batch_size=1, max_delay=0, flush_timeout=0.2)
+        extractor.start()
+        extractor.submit(_turn('stuck'))
+        for n in range(2):
+            extractor.submit(_turn(f'queued{n}'))
+        before = metrics.counters['memory.dropped']
+        started = time.monotonic()
+        await extractor.stop()
+        return time.monotonic() - started, metrics.counters['memory.dropped'] - before, llm.batches
+
+    elapsed, dropped, batches = run(scenario())
+    assert elapsed < 1
+    assert batches == [['stuck']]
+    assert dropped == 2
+
+
+def test_full_backlog_drops_turns(run, make_db):
+    async def scenario():
+        db = await make_db()
+        extractor = MemoryExtractor(FakeLLM(), db, max_pending=2)
+        return [extractor.submit(_turn(str(n))) for n in range(3)]
+
+    assert run(scenario()) == [True, True, False]
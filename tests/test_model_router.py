@@ -0,0 +1,109 @@
+"""Route parsing and latency/error-driven failover, on synthetic call outcomes"""
+
+import pytest
+
+from src import model_router
+from src.model_router import CALL_TYPES, ModelHealth, ModelRouter, Route, parse_routes
+
+
+class Clock:
+    """Stands in for time.monotonic so samples can age out without waiting"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(model_router.time, 'monotonic', clock)
+    return clock
+
+
+def _router(**kwargs) -> ModelRouter:
+    return ModelRouter(parse_routes('chat=a|b', 'a'), **{'max_p95_ms': 1000, 'min_calls': 5, **kwargs})
+
+
+def test_parse_routes():
+    routes = parse_routes(' chat = fast | slow , plan=big ', 'default', {'memory': Route('cheap', 'default')})
+    assert routes['chat'] == Route('fast', 'slow')
+    assert routes['plan'] == Route('big')
+    assert routes['memory'] == Route('cheap', 'default')
+    assert routes['retro'] == Route('default')
+    assert set(routes) == set(CALL_TYPES)
+    assert parse_routes('', 'default') == {call_type: Route('default') for call_type in CALL_TYPES}
+
+
+@pytest.mark.parametrize('spec', ['chitchat=a', 'chat=', 'chat'])
+def test_bad_routes_are_rejected(spec):
+    with pytest.raises(ValueError):
+        parse_routes(spec, 'default')
+
+
+def test_health_percentiles_and_error_rate(clock):
+    health = ModelHealth(window_seconds=60)
+    assert health.p95() is None and health.error_rate() == 0.0
+    for latency in range(1, 101):
+        health.record(latency * 10, ok=latency % 4 != 0)
+    assert health.count() == 100
+    assert health.percentile(50) == 510
+    assert health.p95() == 950
+    assert health.error_rate() == 0.25
+
+
+def test_primary_is_kept_until_it_has_enough_calls(clock):
+    router = _router()
+    for _ in range(4):
+        router.record('chat', 'a', 5000, ok=False)
+    assert router.models_for('chat') == ['a', 'b']
+
+
+def test_slow_primary_fails_over(clock):
+    router = _router()
+    for latency in [100] * 20 + [3000]:
+        router.record('chat', 'a', latency, ok=True)
+    # One slow call in 21 is past the 95th percentile
+    assert router.models_for('chat') == ['a', 'b']
+    router.record('chat', 'a', 3000, ok=True)
+    assert router.models_for('chat') == ['b', 'a']
+    assert router.status()['chat']['failed_over'] is True
+
+
+def test_failing_primary_fails_over(clock):
+    router = _router(max_error_rate=0.3)
+    for n in range(10):
+        router.record('chat', 'a', 100, ok=n % 3 != 0)
+    # 4 of 10 failed
+    assert router.models_for('chat') == ['b', 'a']
+
+
+def test_no_failover_onto_an_unhealthy_fallback(clock):
+    router = _router()
+    for model in ('a', 'b'):
+        for _ in range(5):
+            router.record('chat', model, 100, ok=False)
+    assert router.models_for('chat') == ['a', 'b']
+
+
+def test_primary_recovers_once_its_samples_age_out(clock):
+    router = _router(window_seconds=300)
+    for _ in range(5):
+        router.record('chat', 'a', 100, ok=False)
+    assert router.models_for('chat') == ['b', 'a']
+
+    clock.now += 200
+    # Still within the window - stays on the fallback
+    assert router.models_for('chat') == ['b', 'a']
+    clock.now += 101
+    assert router.models_for('chat') == ['a', 'b']
+    assert router.status()['chat']['failed_over'] is False
+
+
+def test_route_without_fallback_never_fails_over(clock):
+    router = ModelRouter(parse_routes('chat=a|a', 'a'), min_calls=1)
+    router.record('chat', 'a', 100, ok=False)
+    assert router.models_for('chat') == ['a']
+    assert router.models_for('plan') == ['a']
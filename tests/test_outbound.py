@@ -0,0 +1,56 @@
+"""Send scheduler: per-channel pacing and forgetting idle channels"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from src.outbound import SendScheduler, split_text
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.sent = []
+
+    async def send(self, **kwargs):
+        self.sent.append((time.monotonic(), kwargs.get('content')))
+        await asyncio.sleep(0)
+        return SimpleNamespace(channel=self, content=kwargs.get('content'))
+
+
+def test_split_text_keeps_code_blocks_closed():
+    text = "```python\n" + "\n".join(f"print({n})" for n in range(400)) + "\n```"
+    chunks = split_text(text, limit=500)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 500 and chunk.count("```") % 2 == 0 for chunk in chunks)
+    assert all(chunk.startswith("```python\n") for chunk in chunks)
+
+
+def test_channel_stays_under_its_rate(run):
+    async def scenario():
+        scheduler = SendScheduler(rate=3, window=0.2)
+        channel = FakeChannel(1)
+        await asyncio.gather(*(scheduler.send_text(channel, f"message {n}") for n in range(7)))
+        return channel.sent
+
+    sent = run(scenario())
+    assert len(sent) == 7
+    times = [ts for ts, _ in sent]
+    # Any rate + 1 consecutive sends span at least one window
+    assert all(times[i + 3] - times[i] >= 0.2 - 0.01 for i in range(len(times) - 3))
+
+
+def test_idle_channels_are_forgotten(run):
+    async def scenario():
+        scheduler = SendScheduler(rate=5, window=0.5)
+        await asyncio.gather(*(scheduler.send_text(FakeChannel(n), "hi") for n in range(100)))
+        tracked = len(scheduler._locks)
+        await asyncio.sleep(0.6)
+        # The next send sweeps channels that have gone quiet
+        await scheduler.send_text(FakeChannel(1000), "hi")
+        return tracked, set(scheduler._locks), set(scheduler._sent), scheduler._users
+
+    tracked, locks, sent, users = run(scenario())
+    assert tracked == 100
+    assert locks <= {1000} and sent <= {1000}
+    assert users == {}
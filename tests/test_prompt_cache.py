@@ -0,0 +1,45 @@
+"""The chat system prompt stays a byte-stable prefix across guilds, users and turns"""
+
+import json
+
+from src.llm import CHAT_SYSTEM_PROMPT, LLMClient
+from src.providers import Provider, Providers
+
+from llm_stub import StubServer
+
+
+def test_leading_system_block_is_byte_identical(run):
+    async def scenario():
+        async with StubServer() as server:
+            llm = LLMClient(Providers([Provider('requesty', server.url, 'key')], 'requesty'), 'a')
+            await llm.chat(
+                [{"role": "user", "content": "what should I build this week?"}],
+                user_memories={'language': 'python', 'editor': 'vim'}, user_name="Alice",
+                guild_id=111, user_id=1
+            )
+            await llm.chat(
+                [
+                    {"role": "user", "content": "hey"},
+                    {"role": "assistant", "content": "hey! what's up?"},
+                    {"role": "user", "content": "help me plan a rust CLI"}
+                ],
+                user_memories={'timezone': 'UTC+2'}, user_name="Bob",
+                guild_id=222, user_id=2
+            )
+            await llm.close()
+        return server.bodies
+
+    first, second = run(scenario())
+    # The request body opens with the static system message, down to the byte
+    prefix = json.dumps({"messages": [{"role": "system", "content": CHAT_SYSTEM_PROMPT}]})[:-2].encode()
+    assert first.startswith(prefix)
+    assert second.startswith(prefix)
+    # Everything per user or turn comes after it
+    assert json.loads(first)['messages'][1] != json.loads(second)['messages'][1]
+
+
+def test_context_block_ignores_memory_order():
+    llm = LLMClient(Providers([Provider('requesty', 'http://localhost/v1')], 'requesty'))
+    forwards = llm._build_context_prompt({'editor': 'vim', 'language': 'python'}, "Alice")
+    backwards = llm._build_context_prompt({'language': 'python', 'editor': 'vim'}, "Alice")
+    assert forwards == backwards
@@ -0,0 +1,94 @@
+"""Provider resolution for 'provider:model' names, and structured-output downgrades"""
+
+import json
+
+import pytest
+
+from src.llm import EXTRACTION_RESPONSE_FORMAT, ChatTurn, LLMClient
+from src.providers import Provider, Providers
+
+from llm_stub import StubServer
+
+STRUCTURED = {
+    "messages": [{"role": "user", "content": "what do you know about me?"}],
+    "response_format": EXTRACTION_RESPONSE_FORMAT
+}
+
+
+def _providers(local: Provider = None) -> Providers:
+    return Providers(
+        [Provider('requesty', 'http://hosted/v1', 'key'), local or Provider('local', 'http://localhost:8080/v1')],
+        'requesty'
+    )
+
+
+def test_local_prefix_picks_the_local_provider():
+    provider, model = _providers().resolve('local:qwen2.5-7b-instruct')
+    assert (provider.name, model) == ('local', 'qwen2.5-7b-instruct')
+
+
+def test_other_names_go_to_the_default_provider():
+    providers = _providers()
+    # Slashes and unknown prefixes are part of the hosted model's name
+    for name in ('openai/gpt-4o-mini', 'anthropic:claude', 'local:'):
+        provider, model = providers.resolve(name)
+        assert (provider.name, model) == ('requesty', name)
+
+
+def test_local_can_be_the_default():
+    providers = Providers([Provider('local', 'http://localhost:8080/v1')], 'local')
+    provider, model = providers.resolve('qwen2.5-7b-instruct')
+    assert (provider.name, model) == ('local', 'qwen2.5-7b-instruct')
+
+
+def test_unknown_default_is_rejected():
+    with pytest.raises(ValueError):
+        Providers([Provider('local', 'http://localhost:8080/v1')], 'requesty')
+
+
+def test_schema_support_keeps_the_request():
+    body = Provider('requesty', 'http://hosted/v1').shape(STRUCTURED, 'm')
+    assert body == {**STRUCTURED, "model": 'm'}
+
+
+def test_json_mode_only_gets_the_schema_in_the_prompt():
+    body = Provider('local', 'http://localhost/v1', json_schema=False).shape(STRUCTURED, 'm')
+    assert body['response_format'] == {"type": "json_object"}
+    assert body['messages'][:-1] == STRUCTURED['messages']
+    instruction = body['messages'][-1]
+    assert instruction['role'] == 'system'
+    assert json.dumps(EXTRACTION_RESPONSE_FORMAT['json_schema']['schema']) in instruction['content']
+
+
+def test_prompt_only_without_json_mode():
+    body = Provider('local', 'http://localhost/v1', json_schema=False, json_mode=False).shape(STRUCTURED, 'm')
+    assert 'response_format' not in body
+    assert 'JSON schema' in body['messages'][-1]['content']
+    # The caller's payload is left alone
+    assert len(STRUCTURED['messages']) == 1 and 'response_format' in STRUCTURED
+
+
+def test_plain_requests_are_not_touched():
+    payload = {"messages": [{"role": "user", "content": "hi"}]}
+    assert Provider('local', 'http://localhost/v1', json_schema=False).shape(payload, 'm') == {**payload, "model": 'm'}
+
+
+def test_requests_reach_the_resolved_server(run):
+    async def scenario():
+        async with StubServer() as hosted, StubServer() as local:
+            providers = Providers(
+                [Provider('requesty', hosted.url, 'key'), Provider('local', local.url, json_schema=False)], 'requesty'
+            )
+            llm = LLMClient(providers, 'openai/gpt-4o-mini')
+            await llm.chat([{"role": "user", "content": "hi"}])
+            await llm.chat([{"role": "user", "content": "hi"}], model='local:qwen2.5-7b-instruct')
+            llm.router.routes['memory'].primary = 'local:qwen2.5-7b-instruct'
+            await llm.extract_memories([ChatTurn(1, 1, "Alice", "I use vim", "nice", {})])
+            await llm.close()
+        return [json.loads(body) for body in hosted.bodies], [json.loads(body) for body in local.bodies]
+
+    hosted, local = run(scenario())
+    assert [body['model'] for body in hosted] == ['openai/gpt-4o-mini']
+    assert [body['model'] for body in local] == ['qwen2.5-7b-instruct', 'qwen2.5-7b-instruct']
+    # The local server doesn't enforce schemas, so extraction falls back to JSON mode
+    assert local[1]['response_format'] == {"type": "json_object"}
@@ -0,0 +1,102 @@
+"""Render cache: LRU eviction and invalidation by the guild data version"""
+
+from types import SimpleNamespace
+
+from src.cogs.projects import Projects
+from src.cogs.weekly import Weekly
+from src.metrics import metrics
+from src.render_cache import RenderCache
+
+
+def _counts():
+    return metrics.counters['render_cache.hits'], metrics.counters['render_cache.misses']
+
+
+def _delta(before):
+    hits, misses = _counts()
+    return hits - before[0], misses - before[1]
+
+
+def _interaction(guild_id, sent):
+    async def send_message(*args, **kwargs):
+        sent.append(kwargs.get('embed'))
+    return SimpleNamespace(guild=SimpleNamespace(id=guild_id), response=SimpleNamespace(send_message=send_message))
+
+
+def test_least_recently_used_entry_is_evicted(run):
+    async def scenario():
+        cache = RenderCache(max_entries=2)
+        renders = []
+
+        async def get(name):
+            async def render():
+                renders.append(name)
+                return name
+            return await cache.get_or_render('cmd', 1, 0, (name,), render)
+
+        await get('a')
+        await get('b')
+        await get('a')  # 'b' is now the least recently used
+        await get('c')
+        await get('a')
+        await get('b')
+        return renders
+
+    assert run(scenario()) == ['a', 'b', 'c', 'b']
+
+
+def test_version_change_misses_and_rerenders(run):
+    async def scenario():
+        cache = RenderCache()
+        renders = []
+
+        async def render():
+            renders.append(len(renders))
+            return len(renders)
+
+        first = await cache.get_or_render('cmd', 1, 5, (), render)
+        again = await cache.get_or_render('cmd', 1, 5, (), render)
+        bumped = await cache.get_or_render('cmd', 1, 6, (), render)
+        return first, again, bumped
+
+    assert run(scenario()) == (1, 1, 2)
+
+
+def test_write_invalidates_project_status_and_week_summary(run, make_db):
+    async def scenario():
+        db = await make_db()
+        bot = SimpleNamespace(db=db, render_cache=RenderCache(), jobs=None)
+        projects, weekly = Projects(bot), Weekly(bot)
+        sent = []
+
+        async def status():
+            await projects.project_status.callback(projects, _interaction(1, sent), 'active')
+
+        async def summary():
+            await weekly.week_summary.callback(weekly, _interaction(1, sent), 4)
+
+        project_id = await db.create_project(1, "Launch")
+        await status()
+        await summary()
+        before = _counts()
+        await status()
+        await summary()
+        warm = _delta(before)
+
+        version = await db.get_guild_version(1)
+        await db.create_tasks(project_id, ['ship it'])
+        bumped = await db.get_guild_version(1)
+
+        before = _counts()
+        await status()
+        await summary()
+        after_write = _delta(before)
+        return warm, version, bumped, after_write, sent
+
+    warm, version, bumped, after_write, sent = run(scenario())
+    assert warm == (2, 0)
+    assert bumped > version
+    assert after_write == (0, 2)
+    # The re-rendered status shows the new task
+    assert "0/1 complete" in sent[-2].fields[0].value
+    assert sent[1].to_dict() == sent[3].to_dict()
@@ -0,0 +1,292 @@
+"""
+Behaviour every Storage backend must share. Runs against SQLite (one file, and per-guild
+files) always, and against PostgreSQL when DATABASE_URL points at a server - each test
+gets a schema of its own there, dropped afterwards.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.storage import iso_week
+
+
+DATABASE_URL = os.getenv('DATABASE_URL', '')
+HAS_POSTGRES = DATABASE_URL.startswith(('postgres://', 'postgresql://'))
+
+
+@asynccontextmanager
+async def _sqlite(make_db, guild_db_dir):
+    db = await make_db(guild_db_dir=guild_db_dir)
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+@asynccontextmanager
+async def _postgres():
+    import asyncpg
+    from src.storage_postgres import PostgresStorage
+
+    schema = f"brrr_test_{uuid.uuid4().hex[:12]}"
+    admin = await asyncpg.connect(DATABASE_URL)
+    await admin.execute(f"CREATE SCHEMA {schema}")
+    # asyncpg passes unknown DSN parameters on as server settings
+    separator = '&' if '?' in DATABASE_URL else '?'
+    db = PostgresStorage(f"{DATABASE_URL}{separator}search_path={schema}", min_size=1, max_size=8)
+    try:
+        await db.init()
+        yield db
+    finally:
+        await db.close()
+        await admin.execute(f"DROP SCHEMA {schema} CASCADE")
+        await admin.close()
+
+
+@pytest.fixture(params=[
+    'sqlite',
+    'sqlite_guild_files',
+    pytest.param('postgres', marks=pytest.mark.skipif(not HAS_POSTGRES, reason="DATABASE_URL not set")),
+])
+def open_storage(request, make_db, tmp_path):
+    """Opens a fresh, initialised backend - use inside the test's event loop"""
+    if request.param == 'postgres':
+        return _postgres
+    guild_db_dir = str(tmp_path / 'guilds') if request.param == 'sqlite_guild_files' else None
+    return lambda: _sqlite(make_db, guild_db_dir)
+
+
+def test_projects_and_bulk_tasks(run, open_storage):
+    async def scenario():
+        async with open_storage() as db:
+            before = await db.get_guild_version(1)
+            project_id = await db.create_project(1, "Bot", "A Discord bot", owners=[7], tags=['python'])
+            task_ids = await db.create_tasks(project_id, ['design', ('scaffold', True), 'ship'], created_by=7)
+            tasks = await db.get_project_tasks(project_id)
+            toggled = await db.toggle_tasks(task_ids[:2])
+            project = await db.get_project(project_id)
+            after = await db.get_guild_version(1)
+            return before, after, task_ids, tasks, toggled, project
+
+    before, after, task_ids, tasks, toggled, project = run(scenario())
+    assert task_ids == sorted(task_ids) and len(set(task_ids)) == 3
+    # Bulk inserts keep the list order
+    assert [(t['id'], t['label'], t['is_done']) for t in tasks] == [
+        (task_ids[0], 'design', 0), (task_ids[1], 'scaffold', 1), (task_ids[2], 'ship', 0)
+    ]
+    assert sorted((t['id'], t['is_done']) for t in toggled) == [(task_ids[0], 1), (task_ids[1], 0)]
+    assert project['owners'] == [7] and project['tags'] == ['python']
+    assert project['description'] == "A Discord bot"
+    assert after > before
+
+
+def test_thousands_of_bulk_tasks_keep_their_order(run, open_storage):
+    count = 5000
+
+    async def scenario():
+        async with open_storage() as db:
+            project_id = await db.create_project(1, "Big checklist")
+            labels = (f"task {n}" if n % 3 else (f"task {n}", True) for n in range(count))
+            task_ids = await db.create_tasks(project_id, labels)
+            return task_ids, await db.get_project_tasks(project_id)
+
+    task_ids, tasks = run(scenario())
+    assert len(task_ids) == len(tasks) == count
+    assert task_ids == sorted(set(task_ids))
+    assert [t['id'] for t in tasks] == task_ids
+    assert [(t['label'], t['is_done']) for t in tasks] == [(f"task {n}", int(n % 3 == 0)) for n in range(count)]
+
+
+def test_transaction_commits_joined_calls_together(run, open_storage):
+    async def scenario():
+        async with open_storage() as db:
+            async with db.transaction(1):
+                project_id = await db.create_project(1, "Together")
+                # A nested unit of work joins the outer one
+                async with db.transaction(1):
+                    await db.create_tasks(project_id, ['one', 'two'])
+            return await db.get_guild_projects(1), await db.get_project_tasks(project_id)
+
+    projects, tasks = run(scenario())
+    assert [p['title'] for p in projects] == ["Together"]
+    assert [t['label'] for t in tasks] == ['one', 'two']
+
+
+def test_transaction_rolls_back_every_joined_call(run, open_storage):
+    async def scenario():
+        async with open_storage() as db:
+            with pytest.raises(RuntimeError):
+                async with db.transaction(1):
+                    project_id = await db.create_project(1, "Doomed")
+                    await db.create_tasks(project_id, ['one'])
+                    raise RuntimeError("abort")
+            return await db.get_guild_projects(1), await db.get_project_tasks(project_id)
+
+    projects, tasks = run(scenario())
+    assert projects == []
+    assert tasks == []
+
+
+def test_concurrent_claims_never_share_a_job(run, open_storage):
+    jobs = 60
+
+    async def scenario():
+        async with open_storage() as db:
+            for n in range(jobs):
+                await db.enqueue_job('work', 1, {'n': n})
+
+            async def claimer(owner):
+                claimed = []
+                while True:
+                    batch = await db.claim_jobs(owner, ['work'], limit=3)
+                    if not batch:
+                        return claimed
+                    for job in batch:
+                        claimed.append(job['payload']['n'])
+                        assert await db.finish_job(job['id'], owner)
+
+            results = await asyncio.gather(*(claimer(f"worker-{i}") for i in range(5)))
+            return results, await db.get_job_counts()
+
+    results, counts = run(scenario())
+    claimed = [n for result in results for n in result]
+    assert sorted(claimed) == list(range(jobs))
+    assert counts == {'done': jobs}
+
+
+
+def test_bulk_insert_and_claim_throughput(run, open_storage, request):
+    """
+    Rough timings per backend, printed with -s. The floors are far below what either
+    backend manages - they only catch order-of-magnitude regressions.
+    """
+    tasks, jobs, workers = 10000, 400, 4
+
+    async def scenario():
+        async with open_storage() as db:
+            project_id = await db.create_project(1, "Benchmark")
+            started = time.perf_counter()
+            await db.create_tasks(project_id, (f"task {n}" for n in range(tasks)))
+            inserted = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for n in range(jobs):
+                await db.enqueue_job('work', 1, {'n': n})
+            enqueued = time.perf_counter() - started
+
+            async def claimer(owner):
+                while batch := await db.claim_jobs(owner, ['work']):
+                    for job in batch:
+                        await db.finish_job(job['id'], owner)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(claimer(f"worker-{i}") for i in range(workers)))
+            claimed = time.perf_counter() - started
+            return inserted, enqueued, claimed, await db.get_job_counts()
+
+    inserted, enqueued, claimed, counts = run(scenario())
+    print(
+        f"\n{request.node.callspec.id}: {tasks / inserted:,.0f} bulk tasks/s, {jobs / enqueued:,.0f} enqueues/s, "
+        f"{jobs / claimed:,.0f} claim+finish/s over {workers} workers"
+    )
+    assert counts == {'done': jobs}
+    assert tasks / inserted > 2000
+    assert jobs / enqueued > 50
+    assert jobs / claimed > 50
+
+
+def test_claims_follow_shard_ownership(run, open_storage):
+    async def scenario():
+        async with open_storage() as db:
+            # (guild_id >> 22) % shard_count picks the shard
+            await db.enqueue_job('work', 4 << 22, {})
+            await db.enqueue_job('work', 5 << 22, {})
+            await db.enqueue_job('work', None, {})
+            odd = await db.claim_jobs('odd', ['work'], limit=10, shards=(2, [1]))
+            even = await db.claim_jobs('even', ['work'], limit=10, shards=(2, [0]))
+            return odd, even
+
+    odd, even = run(scenario())
+    # Jobs for no guild go to whoever asks first
+    assert sorted(job['guild_id'] or 0 for job in odd) == [0, 5 << 22]
+    assert [job['guild_id'] for job in even] == [4 << 22]
+
+
+def test_export_import_in_batches(run, open_storage):
+    async def scenario():
+        async with open_storage() as db:
+            project_id = await db.create_project(1, "Exported", "x" * 2000)
+            await db.create_tasks(project_id, ['a', ('b', True), 'c'])
+            idea_id = await db.create_idea(1, 7, "An idea")
+            await db.mark_idea_used(idea_id, project_id)
+            await db.set_memory(7, 1, 'language', 'python')
+
+            records = db.iter_guild_export(1, batch_size=2)
+            counts = await db.import_guild_records(2, records, batch_size=2)
+
+            (imported,) = await db.get_guild_projects(2)
+            tasks = await db.get_project_tasks(imported['id'])
+            (idea,) = await db.get_guild_ideas(2)
+            return counts, project_id, imported, tasks, idea, await db.get_memory(7, 2, 'language')
+
+    counts, project_id, imported, tasks, idea, memory = run(scenario())
+    assert counts == {'project': 1, 'task': 3, 'idea': 1, 'memory': 1, 'skipped': 0}
+    assert imported['id'] != project_id
+    assert imported['description'] == "x" * 2000
+    assert [(t['label'], t['is_done']) for t in tasks] == [('a', 0), ('b', 1), ('c', 0)]
+    assert idea['used_project_id'] == imported['id']
+    assert memory == 'python'
+
+
+def test_usage_rows_add_up(run, open_storage):
+    async def scenario():
+        async with open_storage() as db:
+            await db.add_usage(1, [('2026-10-19', 7, 'chat', 1, 100, 20, 50, 300.0)])
+            await db.add_usage(1, [('2026-10-19', 7, 'chat', 2, 150, 30, 0, 500.0)])
+            return await db.get_usage(1, '2026-10-19')
+
+    (row,) = run(scenario())
+    assert (row['calls'], row['prompt_tokens'], row['completion_tokens'], row['cached_tokens']) == (3, 250, 50, 50)
+
+
+def test_memories(run, open_storage):
+    async def scenario():
+        async with open_storage() as db:
+            await db.set_memory(7, 1, 'editor', 'vim')
+            await db.set_memories(1, [(7, 'editor', 'helix', None), (7, 'timezone', 'UTC+2', 'said so')])
+            memories = await db.get_all_memories(7, 1)
+            await db.delete_memory(7, 1, 'timezone')
+            return memories, await db.get_memory(7, 1, 'timezone'), await db.get_all_memories(7, 2)
+
+    memories, deleted, other_guild = run(scenario())
+    assert {key: data['value'] for key, data in memories.items()} == {'editor': 'helix', 'timezone': 'UTC+2'}
+    assert deleted is None
+    assert other_guild == {}
+
+
+def test_weekly_snapshot_is_upserted(run, open_storage):
+    async def scenario():
+        async with open_storage() as db:
+            project_id = await db.create_project(1, "Bot")
+            task_ids = await db.create_tasks(project_id, ['design', 'ship'])
+            last_week = datetime.utcnow() - timedelta(days=7)
+            await db.snapshot_week(1, when=last_week)
+            first = await db.snapshot_week(1)
+            await db.toggle_tasks(task_ids[:1])
+            second = await db.snapshot_week(1)
+            guild_rows = await db.get_weekly_snapshots(1, weeks=4)
+            project_rows = await db.get_weekly_snapshots(1, weeks=4, project_id=project_id)
+            return iso_week()[0], iso_week(last_week)[0], first, second, guild_rows, project_rows
+
+    week, previous, first, second, guild_rows, project_rows = run(scenario())
+    assert (first['tasks_done'], second['tasks_done']) == (0, 1)
+    # One row per week, newest first, holding the latest counts
+    assert [row['week'] for row in guild_rows] == [week, previous]
+    assert (guild_rows[0]['tasks_done'], guild_rows[0]['tasks_total']) == (1, 2)
+    assert [(row['week'], row['tasks_done']) for row in project_rows] == [(week, 1), (previous, 0)]
@@ -0,0 +1,84 @@
+"""Checklist buttons: clicks are batched into one write and re-rendered from the database"""
+
+import asyncio
+from types import SimpleNamespace
+
+from src.cogs.projects import TaskToggleView, build_checklist_embed
+
+
+class FakeMessage:
+    def __init__(self):
+        self.edits = []
+
+    async def edit(self, **kwargs):
+        self.edits.append(kwargs)
+
+
+def _interaction(message):
+    async def edit_message(**kwargs):
+        pass
+    return SimpleNamespace(message=message, response=SimpleNamespace(edit_message=edit_message))
+
+
+async def _view(db, batch_delay=0.1):
+    project_id = await db.create_project(1, "Launch")
+    await db.create_tasks(project_id, ['write', 'test', 'ship'])
+    tasks = await db.get_project_tasks(project_id)
+
+    writes = []
+    toggle_tasks = db.toggle_tasks
+
+    async def counting_toggle_tasks(task_ids):
+        writes.append(list(task_ids))
+        return await toggle_tasks(task_ids)
+    db.toggle_tasks = counting_toggle_tasks
+
+    view = TaskToggleView(tasks, project_id, db, "Launch", batch_delay=batch_delay)
+    return view, tasks, writes
+
+
+def _click(view, task_id, message):
+    callback = view._make_callback(task_id)
+    return callback(_interaction(message))
+
+
+def test_double_click_in_one_batch_cancels_out(run, make_db):
+    async def scenario():
+        db = await make_db()
+        view, tasks, writes = await _view(db)
+        message = FakeMessage()
+
+        await _click(view, tasks[0]['id'], message)
+        await _click(view, tasks[0]['id'], message)
+        await asyncio.sleep(0.3)
+        return view, writes, message, await db.get_project_tasks(view.project_id)
+
+    view, writes, message, stored = run(scenario())
+    assert writes == []
+    assert not any(t['is_done'] for t in stored)
+    assert [t['is_done'] for t in view.tasks] == [t['is_done'] for t in stored]
+    assert len(message.edits) == 1
+
+
+def test_batched_clicks_commit_once_and_render_from_the_database(run, make_db):
+    async def scenario():
+        db = await make_db()
+        view, tasks, writes = await _view(db)
+        message = FakeMessage()
+
+        for task in (tasks[0], tasks[1], tasks[2], tasks[1]):
+            await _click(view, task['id'], message)
+        # Until the batch is committed only the buttons have changed
+        assert not any(t['is_done'] for t in await db.get_project_tasks(view.project_id))
+        await asyncio.sleep(0.3)
+        return tasks, view, writes, message, await db.get_project_tasks(view.project_id)
+
+    tasks, view, writes, message, stored = run(scenario())
+    assert writes == [[tasks[0]['id'], tasks[2]['id']]]
+    assert [t['is_done'] for t in stored] == [True, False, True]
+    assert view.tasks == stored
+
+    [edit] = message.edits
+    expected = build_checklist_embed("Launch", stored)
+    assert edit['embed'].to_dict() == expected.to_dict()
+    assert [item.label[0] for item in edit['view'].children] == ['✅', '⬜', '✅']
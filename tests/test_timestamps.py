@@ -0,0 +1,101 @@
+"""Epoch timestamp columns: the range queries use their indexes, and the backfill resumes cleanly"""
+
+import sqlite3
+
+import aiosqlite
+
+from src.database import TIMESTAMP_COLUMNS
+
+from db_faults import CrashingConnection
+
+# The WHERE / ORDER BY shapes of the Database range helpers, and the index each should use
+RANGE_QUERIES = [
+    # get_projects_archived_since
+    ("SELECT * FROM projects WHERE guild_id = 1 AND archived_ts >= 0 ORDER BY archived_ts DESC",
+     'idx_projects_guild_archived'),
+    # get_guild_projects
+    ("SELECT * FROM projects WHERE guild_id = 1 ORDER BY created_ts DESC", 'idx_projects_guild_created'),
+    # get_project_tasks
+    ("SELECT * FROM tasks WHERE project_id = 1 ORDER BY created_ts, id", 'idx_tasks_project'),
+    # get_guild_ideas
+    ("SELECT * FROM ideas WHERE guild_id = 1 ORDER BY created_ts DESC", 'idx_ideas_guild_created'),
+    # get_messages_older_than and the cold-tier history batches
+    ("SELECT * FROM conversation_history WHERE created_ts < 0 ORDER BY created_ts LIMIT 10",
+     'idx_history_created'),
+    # get_recent_messages
+    ("SELECT role, content FROM conversation_history WHERE user_id = 1 AND guild_id = 1 AND channel_id = 1 "
+     "ORDER BY created_ts DESC, id DESC LIMIT 20", 'idx_history_context'),
+]
+
+
+def _missing_timestamps(path) -> int:
+    with sqlite3.connect(path) as conn:
+        return sum(
+            conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {text} IS NOT NULL AND {epoch} IS NULL").fetchone()[0]
+            for table, text, epoch in TIMESTAMP_COLUMNS
+        )
+
+
+def test_range_queries_use_the_timestamp_indexes(run, make_db, tmp_path):
+    async def scenario():
+        db = await make_db()
+        # Enough rows that a table scan isn't free
+        for guild_id in range(1, 51):
+            project_id = await db.create_project(guild_id, f"Project {guild_id}")
+            await db.create_tasks(project_id, [f"task {n}" for n in range(5)])
+            await db.add_message(1, guild_id, 1, 'user', 'hi')
+
+    run(scenario())
+    with sqlite3.connect(tmp_path / 'brrr.db') as conn:
+        conn.execute("ANALYZE")
+        for sql, index in RANGE_QUERIES:
+            plan = " / ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+            assert f"USING INDEX {index}" in plan or f"USING COVERING INDEX {index}" in plan, (sql, plan)
+            # The ORDER BY comes straight off the index
+            assert "TEMP B-TREE" not in plan, (sql, plan)
+
+
+def test_interrupted_backfill_resumes_until_nothing_is_missing(run, make_db, tmp_path):
+    path = tmp_path / 'brrr.db'
+
+    async def scenario():
+        db = await make_db()
+        for n in range(12):
+            project_id = await db.create_project(1, f"Project {n}")
+            await db.create_tasks(project_id, ['a', 'b'])
+            if n % 2:
+                await db.archive_project(project_id)
+            await db.add_message(1, 1, 1, 'user', f"message {n}")
+            await db.set_memory(1, 1, f"key {n}", 'value')
+
+        # Rows from before migration 2, with only the text timestamps
+        async with aiosqlite.connect(path) as conn:
+            for table, _, epoch in TIMESTAMP_COLUMNS:
+                await conn.execute(f"UPDATE {table} SET {epoch} = NULL")
+            # Text SQLite can't parse still gets a value, so it isn't retried forever
+            await conn.execute(
+                "INSERT INTO ideas (guild_id, author_id, title, created_at) VALUES (1, 1, 'odd', 'not a date')"
+            )
+            await conn.commit()
+        missing = _missing_timestamps(path)
+
+        async with aiosqlite.connect(path) as conn:
+            try:
+                await db._backfill_timestamps(CrashingConnection(conn, commits=5), batch_size=4)
+            except RuntimeError:
+                pass
+        interrupted = _missing_timestamps(path)
+
+        async with aiosqlite.connect(path) as conn:
+            await db._backfill_timestamps(conn, batch_size=4)
+        return missing, interrupted
+
+    missing, interrupted = run(scenario())
+    assert 0 < interrupted < missing
+    assert _missing_timestamps(path) == 0
+    with sqlite3.connect(path) as conn:
+        # Resumed batches fill the same values a single pass would
+        assert conn.execute(
+            "SELECT COUNT(*) FROM conversation_history WHERE created_ts != CAST(strftime('%s', created_at) AS INTEGER)"
+        ).fetchone() == (0,)
+        assert conn.execute("SELECT created_ts FROM ideas").fetchall() == [(0,)]
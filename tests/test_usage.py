@@ -0,0 +1,46 @@
+"""Usage ledger totals and the daily budget gate on memory extraction"""
+
+from src.llm import ChatTurn, LLMClient
+from src.memory_worker import MemoryExtractor
+from src.providers import Provider, Providers
+from src.usage import BUDGET_EXHAUSTED, UsageLedger
+
+from llm_stub import StubServer
+
+
+def test_shared_call_splits_add_up_to_the_call(run, make_db):
+    async def scenario():
+        ledger = UsageLedger(await make_db())
+        owners = [(1, 10), (1, 11), (2, 20)]
+        ledger.record('memory', owners, prompt_tokens=100, completion_tokens=11, cached_tokens=7, latency_ms=50)
+        await ledger.flush()
+        return await ledger.db.get_usage(1, '2000-01-01') + await ledger.db.get_usage(2, '2000-01-01')
+
+    rows = run(scenario())
+    assert len(rows) == 3
+    assert sum(row['prompt_tokens'] for row in rows) == 100
+    assert sum(row['completion_tokens'] for row in rows) == 11
+    assert sum(row['cached_tokens'] for row in rows) == 7
+    assert all(row['calls'] == 1 for row in rows)
+
+
+def test_memory_extraction_skips_guilds_over_budget(run, make_db):
+    async def scenario():
+        ledger = UsageLedger(await make_db(), daily_budget=100)
+        ledger.record('chat', [(1, 10)], prompt_tokens=90, completion_tokens=20, cached_tokens=0, latency_ms=50)
+        async with StubServer() as server:
+            llm = LLMClient(Providers([Provider('requesty', server.url, 'key')], 'requesty'), 'a')
+            extractor = MemoryExtractor(llm, ledger.db, ledger=ledger)
+            turns = [
+                ChatTurn(user_id=uid, guild_id=gid, user_name="user", message="I use vim", reply="nice", known={})
+                for gid, uid in ((1, 10), (2, 20))
+            ]
+            await extractor._process(turns)
+            await llm.close()
+        return await ledger.budget_level(1), server.bodies
+
+    level, bodies = run(scenario())
+    assert level == BUDGET_EXHAUSTED
+    # One extraction call, for the guild still within its budget
+    (body,) = bodies
+    assert b"Turn 2" not in body and b"I use vim" in body
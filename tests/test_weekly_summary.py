@@ -0,0 +1,62 @@
+"""/week summary: rendered from the snapshot table, with the trend oldest first"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from src.cogs.weekly import Weekly
+from src.storage import iso_week
+
+
+async def _weekly(db):
+    snapshots = []
+    snapshot_week = db.snapshot_week
+
+    async def counting_snapshot_week(guild_id, when=None):
+        snapshots.append(guild_id)
+        return await snapshot_week(guild_id, when)
+    db.snapshot_week = counting_snapshot_week
+    return Weekly(SimpleNamespace(db=db, jobs=None)), snapshots
+
+
+def test_summary_renders_the_trend_oldest_first(run, make_db):
+    async def scenario():
+        db = await make_db()
+        project_id = await db.create_project(1, "Bot")
+        task_ids = await db.create_tasks(project_id, ['a', 'b', 'c', 'd', 'e'])
+        now = datetime.utcnow()
+        await db.snapshot_week(1, when=now - timedelta(days=14))
+        await db.toggle_tasks(task_ids[:3])
+        await db.snapshot_week(1, when=now - timedelta(days=7))
+        await db.toggle_tasks(task_ids[3:])
+
+        weekly, _ = await _weekly(db)
+        return now, await weekly.build_summary_embed(1, weeks=4)
+
+    now, embed = run(scenario())
+    assert embed.title == f"📈 Weekly Progress Summary ({iso_week(now)[0]})"
+    fields = {field.name: field.value for field in embed.fields}
+    assert fields["Tasks Done"] == "5/5"
+    assert fields["Completion Rate"] == "100.0%"
+    assert fields["📊 Last 2 Week(s)"].splitlines() == [
+        f"`{iso_week(now - timedelta(days=14))[0]}` ⬜⬜⬜⬜⬜ 0/5 • 🆕 0 • 📦 0",
+        f"`{iso_week(now - timedelta(days=7))[0]}` 🟩🟩🟩⬜⬜ 3/5 • 🆕 0 • 📦 0",
+    ]
+
+
+def test_snapshot_is_only_rewritten_after_a_write(run, make_db):
+    async def scenario():
+        db = await make_db()
+        project_id = await db.create_project(1, "Bot")
+        weekly, snapshots = await _weekly(db)
+
+        await weekly.build_summary_embed(1)
+        await weekly.build_summary_embed(1)
+        unchanged = len(snapshots)
+        await db.create_tasks(project_id, ['ship'])
+        embed = await weekly.build_summary_embed(1)
+        return unchanged, len(snapshots), embed
+
+    unchanged, after_write, embed = run(scenario())
+    assert (unchanged, after_write) == (1, 2)
+    assert {field.name: field.value for field in embed.fields}["Tasks Done"] == "0/1"
+    assert all(not field.name.startswith("📊") for field in embed.fields)